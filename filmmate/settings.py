@@ -101,6 +101,24 @@ DATABASES = {
     }
 }
 
+# Cache shared by all workers (chat intent cache etc.). Uses Redis when
+# REDIS_URL is set, otherwise a database table: `python manage.py createcachetable`.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'filmmate_cache',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        }
+    }
+
 AUTH_USER_MODEL = 'users.CustomUser'
 
 # django-allauth settings
@@ -175,4 +193,82 @@ LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 DEFAULT_POSTER_URL="/static/images/default-image.jpg"
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
-TMDB_IMAGE_BASE = 'https://image.tmdb.org/t/p/w500' 
\ No newline at end of file
+TMDB_IMAGE_BASE = 'https://image.tmdb.org/t/p/w500' 
+TMDB_API_BASE = os.getenv("TMDB_API_BASE", "https://api.themoviedb.org/3")
+# On-disk cache of TMDb API responses used by the ingestion commands
+TMDB_CACHE_DIR = BASE_DIR / ".cache" / "tmdb"
+# Locally cached, resized poster variants served by movies.views.poster
+POSTER_CACHE_DIR = BASE_DIR / ".cache" / "posters"
+POSTER_SIZES = {"thumb": 185, "detail": 500}
+# Only posters on these hosts are fetched and resized; others are linked as-is
+POSTER_ALLOWED_HOSTS = ("image.tmdb.org",)
+# Parsed chat intents are cached per normalized message (see movies/intent_cache.py)
+CHAT_INTENT_CACHE_TTL = 60 * 60 * 24
+# Chat LLM backend (see movies/llm.py): "ollama", or "stub" for offline load
+# tests. The model is loaded at server start and kept resident for KEEP_ALIVE.
+OLLAMA_HOST = os.getenv("OLLAMA_HOST")
+CHAT_LLM_BACKEND = os.getenv("CHAT_LLM_BACKEND", "ollama")
+CHAT_LLM_MODEL = os.getenv("CHAT_LLM_MODEL", "qwen3:4b")
+CHAT_LLM_KEEP_ALIVE = "30m"
+CHAT_LLM_WARM_UP = True
+CHAT_LLM_CONNECT_TIMEOUT = 5
+CHAT_LLM_STUB_LATENCY_MS = 300
+CHAT_LLM_STUB_TOKEN_MS = 20
+# Chat LLM limits (see movies/llm.py): concurrent calls, extra calls allowed
+# to queue, max seconds queued, and per-call deadlines. Excess load gets a
+# canned reply instead of waiting.
+CHAT_LLM_CONCURRENCY = 2
+CHAT_LLM_MAX_WAITING = 8
+CHAT_LLM_QUEUE_TIMEOUT = 5
+CHAT_LLM_PARSE_TIMEOUT = 15
+CHAT_LLM_REPLY_TIMEOUT = 30
+# How chat replies are written (see movies/replies.py): "template", "llm" or
+# "hybrid", and the result-listing size given to the model in tokens.
+CHAT_REPLY_MODE = os.getenv("CHAT_REPLY_MODE", "hybrid")
+CHAT_REPLY_TOKEN_BUDGET = 60
+# Embedding index over movie descriptions (see movies/semantic.py). The
+# "hashing" embedder needs no model; "ollama" uses SEMANTIC_EMBED_MODEL.
+# Chat keywords are ranked semantically when the index has been built.
+SEMANTIC_INDEX_DIR = BASE_DIR / ".cache" / "embeddings"
+SEMANTIC_EMBEDDER = os.getenv("SEMANTIC_EMBEDDER", "hashing")
+SEMANTIC_EMBED_MODEL = os.getenv("SEMANTIC_EMBED_MODEL", "nomic-embed-text")
+SEMANTIC_DIM = 256
+SEMANTIC_MIN_SCORE = 0.05
+CHAT_SEMANTIC_SEARCH = True
+# Item-item "Recommended for you" store (see movies/recommendations.py),
+# trained by `build_recommendations`; neighbours kept per movie
+RECOMMENDATIONS_DIR = BASE_DIR / ".cache" / "recommendations"
+RECOMMEND_NEIGHBORS = 30
+# Materialized friends feed (see movies/feed.py): users with this many
+# followers are pulled by readers instead of fanned out on write, pulls
+# happen at most every FEED_PULL_INTERVAL seconds per reader, and each feed
+# keeps its newest FEED_MAX_ENTRIES entries (trimmed once it passes them by
+# FEED_TRIM_SLACK)
+FEED_FANOUT_LIMIT = 500
+FEED_HIGH_FANOUT_TTL = 600
+FEED_PULL_INTERVAL = 60
+FEED_MAX_ENTRIES = 500
+FEED_TRIM_SLACK = 50
+# Cached friend-id sets (see users/friend_cache.py)
+FRIEND_CACHE_TTL = 60 * 60 * 24
+# Username autocomplete (see users/autocomplete.py): shared index lookups are
+# cached per prefix, ranked per-user suggestions for a shorter time
+AUTOCOMPLETE_CACHE_TTL = 60
+AUTOCOMPLETE_USER_CACHE_TTL = 30
+# "People you may know" entries stored per user (see users/suggestions.py)
+FRIEND_SUGGESTIONS = 10
+# Per-process latency histograms keep this many recent samples per stage;
+# served at /internal/metrics/ to staff or with this token (see movies/metrics.py)
+METRICS_WINDOW = 1024
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "movies": {"handlers": ["console"], "level": "WARNING"},
+        # One line per chat request with the time spent in each stage
+        "filmmate.metrics": {"handlers": ["console"], "level": os.getenv("METRICS_LOG_LEVEL", "INFO")},
+    },
+}
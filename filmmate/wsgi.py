@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'filmmate.settings')
 
 application = get_wsgi_application()
+
+# Load the chat model now rather than on the first chat message
+from django.conf import settings  # noqa: E402
+
+if settings.CHAT_LLM_WARM_UP:
+    from movies.llm import warm_up_in_background
+
+    warm_up_in_background()
@@ -1,7 +1,16 @@
 # movies/factories.py
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+
 from movies.models import Movie
 from genres.models import Genre
-from django.conf import settings
+
+# Result of creating one record: status is 'created' or 'duplicate'; movie is
+# the new Movie, or the existing one the record duplicates.
+MovieOutcome = namedtuple('MovieOutcome', ['status', 'movie'])
+
 
 class MovieFactory:
     """
@@ -9,34 +18,102 @@ class MovieFactory:
     Encapsulates creation logic so seeding and other modules can reuse it.
     """
 
+    @staticmethod
+    def poster_url(poster_path):
+        """Determine final poster URL"""
+        if poster_path:
+            return f"https://image.tmdb.org/t/p/w500{poster_path}"
+        return getattr(settings, "DEFAULT_POSTER_URL", "")
+
     @staticmethod
     def create_movie(title, year, director, description, genre_ids, genre_list, poster_path=None):
         """Create and return a Movie instance with genres and poster URL."""
+        outcome = MovieFactory.create_movies([{
+            'title': title,
+            'year': year,
+            'director': director,
+            'description': description,
+            'genre_ids': genre_ids,
+            'poster_path': poster_path,
+        }], genre_list)[0]
 
-        # Skip duplicates
-        if Movie.objects.filter(title=title, year=year).exists():
-            return None  # skip duplicates gracefully
+        # Skip duplicates gracefully
+        return outcome.movie if outcome.status == 'created' else None
 
-        # Determine final poster URL
-        if poster_path:
-            poster_url_to_save = f"https://image.tmdb.org/t/p/w500{poster_path}"
-        else:
-            poster_url_to_save = getattr(settings, "DEFAULT_POSTER_URL", "")
-
-        # Create movie instance
-        movie = Movie.objects.create(
-            title=title,
-            year=year,
-            director=director,
-            description=description,
-            poster=poster_url_to_save
-        )
-
-        # Assign genres from TMDb genre mapping
+    @staticmethod
+    def create_movies(records, genre_list, batch_size=1000):
+        """
+        Create many movies at once from dicts with the same keys as create_movie's
+        arguments. Returns one MovieOutcome per record, in input order.
+
+        Costs a handful of queries per call regardless of size: one duplicate
+        lookup, genre lookup/bulk insert, bulk insert of movies and of their
+        genre links.
+        """
+        records = list(records)
+        if not records:
+            return []
         genre_map = {g['id']: g['name'] for g in genre_list}
-        for genre_id in genre_ids:
-            name = genre_map.get(genre_id, 'Unknown')
-            genre_obj, _ = Genre.objects.get_or_create(name=name)
-            movie.genres.add(genre_obj)
 
-        return movie
+        with transaction.atomic():
+            # Resolve duplicates (against the DB and within the batch) with one query
+            keys = {(r['title'], r['year']) for r in records}
+            existing = {}
+            candidates = Movie.objects.filter(
+                title__in={title for title, _ in keys},
+                year__in={year for _, year in keys},
+            )
+            for movie in candidates:
+                existing.setdefault((movie.title, movie.year), movie)
+
+            outcomes = [None] * len(records)
+            to_create = []  # (index, Movie, genre names)
+            for i, record in enumerate(records):
+                key = (record['title'], record['year'])
+                if key in existing:
+                    outcomes[i] = MovieOutcome('duplicate', existing[key])
+                    continue
+                movie = Movie(
+                    title=record['title'],
+                    year=record['year'],
+                    director=record['director'],
+                    description=record['description'],
+                    poster=MovieFactory.poster_url(record.get('poster_path')),
+                )
+                existing[key] = movie
+                names = {genre_map.get(genre_id, 'Unknown') for genre_id in record.get('genre_ids', [])}
+                to_create.append((i, movie, names))
+                outcomes[i] = MovieOutcome('created', movie)
+
+            if not to_create:
+                return outcomes
+
+            genres = MovieFactory.genres_by_name(set().union(*(names for _, _, names in to_create)))
+
+            Movie.objects.bulk_create([movie for _, movie, _ in to_create], batch_size=batch_size)
+
+            # Assign genres with bulk-inserted through rows
+            Through = Movie.genres.through
+            links = [
+                Through(movie_id=movie.pk, genre_id=genres[name].pk)
+                for _, movie, names in to_create
+                for name in names
+            ]
+            Through.objects.bulk_create(links, batch_size=batch_size, ignore_conflicts=True)
+
+        return outcomes
+
+    @staticmethod
+    def genres_by_name(names):
+        """Map genre name -> Genre, creating the missing ones in bulk."""
+        if not names:
+            return {}
+        genres = {}
+        for genre in Genre.objects.filter(name__in=names).order_by('pk'):
+            genres.setdefault(genre.name, genre)
+        missing = [Genre(name=name) for name in names if name not in genres]
+        if missing:
+            Genre.objects.bulk_create(missing)
+            for genre in Genre.objects.filter(name__in=[g.name for g in missing]).order_by('pk'):
+                genres.setdefault(genre.name, genre)
+        return genres
@@ -0,0 +1,153 @@
+# movies/feed.py
+"""
+Materialized friends feed: FeedEntry rows per reader, written at event time.
+
+When someone watches or reviews a movie, one entry is inserted into the
+feed of every user that has them as a friend (fan-out on write), so a feed
+page is one indexed range scan instead of a scan over all friends' watches.
+
+Users followed by FEED_FANOUT_LIMIT or more people are not fanned out to,
+so one prolific, popular user cannot turn each watch into thousands of
+inserts. Instead their readers pull those events into their own feed when
+they read it (at most every FEED_PULL_INTERVAL seconds), which keeps the
+read itself a single range scan. New friends' recent events are pulled in
+the same way, and an unfriend removes them.
+
+Each feed keeps its newest FEED_MAX_ENTRIES entries. Writes count the
+entries of the feeds they touched (one grouped query) and trim those that
+passed the cap by more than FEED_TRIM_SLACK, so a feed never holds more
+than the two together and deletes come in batches rather than one row per
+event. `rebuild_feeds --trim-only` trims every feed to the cap.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from movies.models import FeedEntry, WatchedMovie
+from reviews.models import Review
+from users import friend_cache
+
+HIGH_FANOUT_KEY = 'feed:high-fanout:v1'
+PULLED_KEY = 'feed:pulled:v1:{}'
+CHUNK = 1000  # ids per IN (...) list
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _friendships():
+    return get_user_model().friends.through.objects
+
+
+def followers(user_id):
+    """Users that have `user_id` among their friends (whose feeds show them)."""
+    return _friendships().filter(to_customuser_id=user_id).values_list('from_customuser_id', flat=True)
+
+
+def high_fanout_ids():
+    """Ids of users with FEED_FANOUT_LIMIT or more followers (cached)."""
+    ids = cache.get(HIGH_FANOUT_KEY)
+    if ids is None:
+        ids = set(
+            _friendships().values('to_customuser_id').annotate(n=Count('id'))
+            .filter(n__gte=_setting('FEED_FANOUT_LIMIT', 500)).values_list('to_customuser_id', flat=True)
+        )
+        cache.set(HIGH_FANOUT_KEY, ids, _setting('FEED_HIGH_FANOUT_TTL', 600))
+    return ids
+
+
+def _entry(owner_id, event):
+    if isinstance(event, Review):
+        return FeedEntry(owner_id=owner_id, actor_id=event.user_id, movie_id=event.movie_id,
+                         review=event, created_at=event.date)
+    return FeedEntry(owner_id=owner_id, actor_id=event.user_id, movie_id=event.movie_id,
+                     watched=event, created_at=event.watched_at)
+
+
+def publish(event):
+    """Fan a new WatchedMovie or Review out to the actor's followers."""
+    if event.user_id in high_fanout_ids():
+        return  # readers pull these in (see pull_high_fanout)
+    owner_ids = list(followers(event.user_id))
+    FeedEntry.objects.bulk_create([_entry(owner_id, event) for owner_id in owner_ids],
+                                  ignore_conflicts=True, batch_size=1000)
+    trim(over_cap(owner_ids))
+
+
+def _recent_events(actor_ids, limit, since=None):
+    watches = WatchedMovie.objects.filter(user_id__in=actor_ids)
+    reviews = Review.objects.filter(user_id__in=actor_ids)
+    if since is not None:
+        watches, reviews = watches.filter(watched_at__gte=since), reviews.filter(date__gte=since)
+    return list(watches.order_by('-watched_at')[:limit]) + list(reviews.order_by('-date')[:limit])
+
+
+def backfill(owner_id, actor_ids):
+    """Copy recent events of `actor_ids` into `owner_id`'s feed."""
+    actor_ids = list(actor_ids)
+    if not actor_ids:
+        return
+    events = _recent_events(actor_ids, _setting('FEED_MAX_ENTRIES', 500))
+    FeedEntry.objects.bulk_create([_entry(owner_id, event) for event in events],
+                                  ignore_conflicts=True, batch_size=1000)
+    trim([owner_id])
+
+
+def friends_added(user_id, friend_ids):
+    """`user_id` now has `friend_ids` as friends: show their recent activity."""
+    backfill(user_id, friend_ids)
+
+
+def friends_removed(user_id, friend_ids):
+    FeedEntry.objects.filter(owner_id=user_id, actor_id__in=list(friend_ids)).delete()
+
+
+def pull_high_fanout(user):
+    """Bring events of the user's high-fanout friends into their feed, throttled."""
+    key = PULLED_KEY.format(user.pk)
+    if not cache.add(key, True, _setting('FEED_PULL_INTERVAL', 60)):
+        return
+    hubs = friend_cache.friends_among(user.pk, high_fanout_ids())
+    if not hubs:
+        return
+    newest = FeedEntry.objects.filter(owner=user, actor_id__in=hubs).aggregate(t=Max('created_at'))['t']
+    events = _recent_events(hubs, _setting('FEED_MAX_ENTRIES', 500), since=newest)
+    FeedEntry.objects.bulk_create([_entry(user.pk, event) for event in events],
+                                  ignore_conflicts=True, batch_size=1000)
+    if events:
+        trim([user.pk])
+
+
+def over_cap(owner_ids):
+    """Those of `owner_ids` whose feeds hold more than FEED_MAX_ENTRIES + FEED_TRIM_SLACK entries."""
+    limit = _setting('FEED_MAX_ENTRIES', 500) + _setting('FEED_TRIM_SLACK', 50)
+    owner_ids = list(owner_ids)
+    full = []
+    for i in range(0, len(owner_ids), CHUNK):
+        full += (
+            FeedEntry.objects.filter(owner_id__in=owner_ids[i:i + CHUNK]).values('owner_id')
+            .annotate(n=Count('id')).filter(n__gt=limit).values_list('owner_id', flat=True)
+        )
+    return full
+
+
+def trim(owner_ids):
+    """Drop entries beyond the newest FEED_MAX_ENTRIES of each feed."""
+    keep = _setting('FEED_MAX_ENTRIES', 500)
+    for owner_id in owner_ids:
+        boundary = list(
+            FeedEntry.objects.filter(owner_id=owner_id).order_by('-created_at', '-id')
+            .values_list('created_at', 'id')[keep:keep + 1]
+        )
+        if boundary:
+            created_at, entry_id = boundary[0]
+            FeedEntry.objects.filter(owner_id=owner_id, created_at__lte=created_at) \
+                .exclude(created_at=created_at, id__gt=entry_id).delete()
+
+
+def feed_for(user):
+    """The user's feed, newest first, ready for keyset pagination."""
+    pull_high_fanout(user)
+    return FeedEntry.objects.filter(owner=user).select_related('actor', 'movie', 'review')
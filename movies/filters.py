@@ -0,0 +1,103 @@
+# movies/filters.py
+"""
+Compile structured movie filters into one index-friendly queryset.
+
+Both the chat (filters parsed from a message) and the movies_all browse
+page (GET parameters) describe what they want as a dict:
+
+    {'genre': 'Comedy', 'director': 'Christopher Nolan', 'year': 2010,
+     'decade': 1990, 'year_gte': 2000, 'year_lte': 2009,
+     'rating_gte': 7.5, 'keywords': 'space'}
+
+and `apply_filters` turns it into WHERE clauses that the composite indexes
+on Movie can serve: rating ranges and the default "best first" order walk
+(-rating, -year, id), year and decade filters use (year, -rating), and
+director filters use (lower(director), -rating). Genres are matched with
+an EXISTS on the link table rather than a JOIN + DISTINCT, so the ordered
+index scan is not thrown away. Unknown keys and malformed values (LLM
+output is not always well typed) are ignored.
+
+With `semantic=True`, keywords are ranked by description embeddings
+(movies/semantic.py) instead of full-text matching, when that index exists.
+"""
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Lower
+
+from genres.models import Genre
+from movies.models import Movie
+from movies import semantic
+from movies.search import search_movies
+
+# "Best first": what chat results and the browse page's rating sort use
+BEST_FIRST = ['-rating', '-year', 'id']
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_text(value):
+    return value.strip() if isinstance(value, str) else ''
+
+
+def apply_filters(queryset, filters, semantic_keywords=False):
+    """Narrow a Movie queryset by a filters dict (see module docstring)."""
+    genre = _as_text(filters.get('genre'))
+    if genre:
+        # Genre names are not unique, so match every row with that name.
+        genre_ids = list(Genre.objects.filter(name__iexact=genre).values_list('id', flat=True))
+        queryset = queryset.filter(Exists(
+            Movie.genres.through.objects.filter(movie_id=OuterRef('pk'), genre_id__in=genre_ids)
+        ))
+
+    director = _as_text(filters.get('director'))
+    if director:
+        queryset = queryset.alias(director_lower=Lower('director')).filter(director_lower=director.lower())
+
+    year = _as_int(filters.get('year'))
+    decade = _as_int(filters.get('decade'))
+    if year is not None:
+        queryset = queryset.filter(year=year)
+    elif decade is not None:
+        queryset = queryset.filter(year__gte=decade, year__lte=decade + 9)
+    year_gte = _as_int(filters.get('year_gte'))
+    if year_gte is not None:
+        queryset = queryset.filter(year__gte=year_gte)
+    year_lte = _as_int(filters.get('year_lte'))
+    if year_lte is not None:
+        queryset = queryset.filter(year__lte=year_lte)
+
+    rating_gte = _as_float(filters.get('rating_gte'))
+    if rating_gte is not None:
+        queryset = queryset.filter(rating__gte=rating_gte)
+
+    keywords = _as_text(filters.get('keywords'))
+    if keywords:
+        # Ranked match; both annotate search_rank
+        if semantic_keywords and semantic.available():
+            queryset = semantic.semantic_search_movies(queryset, keywords)
+        else:
+            queryset = search_movies(queryset, keywords)
+
+    return queryset
+
+
+def filters_from_params(params):
+    """The filters dict for a movies_all request's GET parameters."""
+    return {
+        'keywords': params.get('q', ''),
+        'genre': params.get('genre', ''),
+        'director': params.get('director', ''),
+        'year': params.get('year', ''),
+        'rating_gte': params.get('min_rating', ''),
+    }
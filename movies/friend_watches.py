@@ -0,0 +1,93 @@
+# movies/friend_watches.py
+"""
+Incremental maintenance of FriendWatchCount: for every user, how many of
+their friends watched each movie.
+
+"Friends of u" are the users in `u.friends` (the forward rows of the
+friendship table; accepting a request adds both directions). So:
+
+- v watches m: +1 on (u, m) for every u that has v as a friend
+- u adds friend v: +1 on (u, m) for every m that v has watched
+
+and the reverse for unwatching and unfriending. Each event is two
+statements whatever its fan-out: an INSERT of missing rows at zero
+(ignoring conflicts, so concurrent writers cannot lose a row) and one
+UPDATE adding the delta. Decrements are clamped at zero (the column is
+unsigned, and a drifted row must not fail the request) and then delete
+rows that reached it.
+`rebuild_friend_watches` recomputes the table from scratch if it ever
+drifts (e.g. after a user is deleted mid-friendship).
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from movies.models import FriendWatchCount, WatchedMovie
+
+
+def _friends_with(user_id):
+    """Users that have `user_id` among their friends."""
+    return get_user_model().friends.through.objects.filter(to_customuser_id=user_id).values_list(
+        'from_customuser_id', flat=True
+    )
+
+
+CHUNK = 1000  # ids per IN (...) list
+
+
+def _apply(delta, user_ids, movie_ids):
+    """Add `delta` to every (user, movie) pair of the two id lists."""
+    user_ids, movie_ids = list(user_ids), list(movie_ids)
+    for i in range(0, len(user_ids), CHUNK):
+        for j in range(0, len(movie_ids), CHUNK):
+            _apply_chunk(delta, user_ids[i:i + CHUNK], movie_ids[j:j + CHUNK])
+
+
+def _apply_chunk(delta, user_ids, movie_ids):
+    if delta > 0:
+        FriendWatchCount.objects.bulk_create(
+            [FriendWatchCount(user_id=u, movie_id=m, count=0) for u in user_ids for m in movie_ids],
+            ignore_conflicts=True,
+            batch_size=1000,
+        )
+    rows = FriendWatchCount.objects.filter(user_id__in=user_ids, movie_id__in=movie_ids)
+    if delta > 0:
+        rows.update(count=F('count') + delta)
+    else:
+        rows.update(count=Greatest(F('count') + delta, 0))
+        rows.filter(count=0).delete()
+
+
+def watched(user_id, movie_id):
+    _apply(1, _friends_with(user_id), [movie_id])
+
+
+def unwatched(user_id, movie_id):
+    _apply(-1, _friends_with(user_id), [movie_id])
+
+
+def friends_added(user_id, friend_ids):
+    """`user_id` now has each of `friend_ids` as a friend."""
+    for friend_id in friend_ids:
+        _apply(1, [user_id], WatchedMovie.objects.filter(user_id=friend_id).values_list('movie_id', flat=True))
+
+
+def friends_removed(user_id, friend_ids):
+    for friend_id in friend_ids:
+        _apply(-1, [user_id], WatchedMovie.objects.filter(user_id=friend_id).values_list('movie_id', flat=True))
+
+
+def count_for(user, movie):
+    """How many of `user`'s friends watched `movie` (one indexed lookup)."""
+    if not user.is_authenticated:
+        return 0
+    return FriendWatchCount.objects.filter(user=user, movie=movie).values_list('count', flat=True).first() or 0
+
+
+def popular_among_friends(user, limit):
+    """The movies most watched by `user`'s friends, with `count` set on each row."""
+    if not user.is_authenticated:
+        return []
+    return list(
+        FriendWatchCount.objects.filter(user=user).select_related('movie').order_by('-count', 'movie')[:limit]
+    )
@@ -0,0 +1,69 @@
+# movies/intent_cache.py
+"""
+Cache of chat messages already parsed into search filters.
+
+Parsing a message costs a full LLM round trip, but the answer only depends
+on the message and the genre names offered to the model. Entries are keyed
+on a normalized form of the message (case, punctuation and spacing folded)
+plus a hash of the genre list, so a new genre automatically starts a fresh
+keyspace. They live in the shared Django cache, which bounds and expires
+them (CHAT_INTENT_CACHE_TTL). Hits and misses are counted in the per-process
+metrics (chat.intent_cache.hit/miss on the internal metrics view), so a
+lookup costs a single cache read.
+"""
+import hashlib
+import logging
+import re
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache
+
+from movies import metrics
+
+# Bumped whenever the parse prompt changes what it returns for a message
+KEY_PREFIX = 'chat:intent:v2'
+HITS = 'chat.intent_cache.hit'
+MISSES = 'chat.intent_cache.miss'
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s'-]+")
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_message(message):
+    """Fold a message so trivially different phrasings share an entry."""
+    text = unicodedata.normalize('NFKC', message).casefold()
+    text = _PUNCTUATION.sub(' ', text)
+    return _SPACES.sub(' ', text).strip()
+
+
+def genres_version(genres_list):
+    return hashlib.sha1('\n'.join(sorted(genres_list)).encode()).hexdigest()[:12]
+
+
+def cache_key(message, genres_list):
+    digest = hashlib.sha1(normalize_message(message).encode()).hexdigest()
+    return f'{KEY_PREFIX}:{genres_version(genres_list)}:{digest}'
+
+
+def get_filters(message, genres_list):
+    """Cached filters for `message`, or None. Counts the hit or miss."""
+    try:
+        filters = cache.get(cache_key(message, genres_list))
+    except Exception as e:
+        # The cache is an optimization; never let it break the chat.
+        logger.warning('Intent cache read failed: %s', e)
+        return None
+    metrics.incr(HITS if filters is not None else MISSES)
+    return filters
+
+
+def set_filters(message, genres_list, filters):
+    timeout = getattr(settings, 'CHAT_INTENT_CACHE_TTL', 60 * 60 * 24)
+    try:
+        cache.set(cache_key(message, genres_list), filters, timeout)
+    except Exception as e:
+        logger.warning('Intent cache write failed: %s', e)
+
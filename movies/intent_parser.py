@@ -0,0 +1,203 @@
+# movies/intent_parser.py
+"""
+Rule-based fast path for chat intents.
+
+Most chat messages are plain requests like "comedy from 2010" or "movies by
+Nolan". `parse_intent` recognises genres (from the Genre table plus a few
+aliases), directors (from an in-process index of Movie.director), years,
+decades and rating phrases, and returns the same filter dict the LLM would
+(plus "decade", e.g. 1990 for "the 90s").
+
+It is deliberately conservative: if any word is left over that is not a
+recognised entity or a filler word ("show me some good ..."), or two
+entities conflict, it returns None and the caller falls back to the LLM.
+"""
+import re
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+
+from movies.models import Movie
+
+MAX_NGRAM = 4
+HIGHLY_RATED = 8.0
+
+GREETINGS = {'hi', 'hello', 'hey', 'yo', 'thanks', 'thank', 'you', 'there', 'hiya'}
+
+FILLER = {
+    'a', 'an', 'the', 'some', 'any', 'me', 'i', 'im', "i'm", 'we', 'us', 'my', 'to', 'for', 'of', 'in',
+    'from', 'by', 'with', 'and', 'or', 'that', 'are', 'is', 'were', 'was', 'please', 'pls',
+    'show', 'give', 'find', 'recommend', 'suggest', 'list', 'get', 'want', 'need', 'like', 'would',
+    'looking', 'watch', 'see', 'can', 'could', 'you', 'what', 'whats', "what's", 'there',
+    'movie', 'movies', 'film', 'films', 'flick', 'flicks', 'something', 'anything', 'title', 'titles',
+    'good', 'great', 'nice', 'best', 'top', 'cool', 'fun', 'classic', 'classics',
+    'made', 'released', 'directed', 'director', 'directors', 'year', 'genre', 'recommendations',
+    'suggestions', 'ideas', 'one', 'ones', 'few', 'couple', 'new', 'old', 'era',
+}
+
+# Alias -> genre name (used only when that genre exists).
+GENRE_ALIASES = {
+    'sci-fi': 'science fiction', 'sci fi': 'science fiction', 'scifi': 'science fiction',
+    'animated': 'animation', 'cartoon': 'animation', 'cartoons': 'animation',
+    'romantic': 'romance', 'scary': 'horror', 'funny': 'comedy',
+    'thrilling': 'thriller',
+}
+
+DECADE_WORDS = {
+    'thirties': 1930, 'forties': 1940, 'fifties': 1950, 'sixties': 1960,
+    'seventies': 1970, 'eighties': 1980, 'nineties': 1990,
+}
+
+_NUMBER = r'(\d+(?:\.\d+)?)'
+RATING_PATTERNS = [
+    # "rated 8+", "rating above 7.5", "rated at least 8/10"
+    re.compile(r'\b(?:rated|rating|score)\s+(?:of\s+)?(?:at least|above|over|>=?|\+)?\s*' + _NUMBER
+               + r'\s*(?:\+|/\s*10|stars?|or (?:more|higher|better|above))?'),
+    # "at least 8 stars", "over 7/10"
+    re.compile(r'\b(?:at least|above|over|minimum(?: of)?)\s+' + _NUMBER + r'\s*(?:stars?|/\s*10)'),
+    # "8 stars", "4-star rating", "8+ stars", "7/10"
+    re.compile(r'\b' + _NUMBER + r'\s*\+?\s*-?\s*(?:stars?|/\s*10)(?:\s+(?:rating|rated|or (?:more|higher|better|above)))?'),
+]
+HIGHLY_RATED_PATTERN = re.compile(r'\b(?:highly|top|well|best)[\s-]rated\b')
+DECADE_PATTERN = re.compile(r"(?:\b(19|20)|'|\b)(\d)0'?s\b")
+YEAR_PATTERN = re.compile(r'\b((?:19|20)\d{2})\b')
+_PUNCTUATION = re.compile(r"[^\w\s'-]+")
+
+_index_lock = threading.Lock()
+_director_index = None  # (built_at, DirectorIndex)
+
+
+class DirectorIndex:
+    """
+    Lookup tables over the distinct Movie.director values: full names
+    (matched anywhere in a message) and surnames (matched only after "by"
+    or as a possessive, since many surnames are ordinary words).
+    """
+
+    def __init__(self, names):
+        self.full = {}
+        self.surnames = {}
+        for name in names:
+            key = name.casefold().strip()
+            parts = key.split()
+            if not parts or key == 'unknown':
+                continue
+            if len(parts) > 1:
+                self.full.setdefault(key, name)
+            self.surnames.setdefault(parts[-1], set()).add(name)
+
+    def by_surname(self, word):
+        names = self.surnames.get(word, ())
+        return next(iter(names)) if len(names) == 1 else None
+
+
+def director_index():
+    """Per-process director index, rebuilt every CHAT_DIRECTOR_INDEX_TTL seconds."""
+    global _director_index
+    ttl = getattr(settings, 'CHAT_DIRECTOR_INDEX_TTL', 600)
+    with _index_lock:
+        if _director_index is None or time.monotonic() - _director_index[0] > ttl:
+            names = Movie.objects.values_list('director', flat=True).distinct().iterator(chunk_size=5000)
+            _director_index = (time.monotonic(), DirectorIndex(names))
+        return _director_index[1]
+
+
+def _genre_lookup(genres_list):
+    lookup = {}
+    for name in genres_list:
+        key = name.casefold()
+        lookup[key] = name
+        lookup[key[:-1] + 'ies' if key.endswith('y') else key + 's'] = name
+    for alias, target in GENRE_ALIASES.items():
+        if target in lookup:
+            lookup.setdefault(alias, lookup[target])
+    return lookup
+
+
+class _NotConfident(Exception):
+    pass
+
+
+def _set(filters, key, value):
+    if filters.get(key, value) != value:
+        raise _NotConfident  # e.g. two different genres
+    filters[key] = value
+
+
+def _extract_numbers(text, filters):
+    """Pull rating, decade and year phrases out of `text`; returns the rest."""
+    for pattern in RATING_PATTERNS:
+        for match in pattern.finditer(text):
+            value = float(match.group(1))
+            if not 0 <= value <= 10:
+                raise _NotConfident
+            _set(filters, 'rating_gte', value)
+        text = pattern.sub(' ', text)
+    if HIGHLY_RATED_PATTERN.search(text):
+        filters.setdefault('rating_gte', HIGHLY_RATED)
+        text = HIGHLY_RATED_PATTERN.sub(' ', text)
+
+    for match in DECADE_PATTERN.finditer(text):
+        century, digit = match.group(1), int(match.group(2))
+        if century:
+            decade = int(century) * 100 + digit * 10
+        else:
+            decade = (2000 if digit < 3 else 1900) + digit * 10
+        _set(filters, 'decade', decade)
+    text = DECADE_PATTERN.sub(' ', text)
+
+    for match in YEAR_PATTERN.finditer(text):
+        _set(filters, 'year', int(match.group(1)))
+    return YEAR_PATTERN.sub(' ', text)
+
+
+def _names_director(tokens, raw, i):
+    # "by Nolan", "director Nolan" or "Nolan's"
+    return (i > 0 and tokens[i - 1] in ('by', 'director')) or raw[i].endswith("'s")
+
+
+def parse_intent(message, genres_list):
+    """
+    Filters for `message` ({} for a greeting), or None when the message
+    needs the LLM.
+    """
+    text = unicodedata.normalize('NFKC', message).casefold()
+    filters = {}
+    try:
+        text = _extract_numbers(text, filters)
+        raw = [t for t in _PUNCTUATION.sub(' ', text).split() if t.strip("'-")]
+        tokens = [t.removesuffix("'s").strip("'-") for t in raw]
+        if not filters and tokens and set(tokens) <= GREETINGS:
+            return {}
+
+        genres = _genre_lookup(genres_list)
+        directors = director_index()
+        leftover = []
+        i = 0
+        while i < len(tokens):
+            for n in range(min(MAX_NGRAM, len(tokens) - i), 0, -1):
+                phrase = ' '.join(tokens[i:i + n])
+                if phrase in genres:
+                    _set(filters, 'genre', genres[phrase])
+                elif phrase in directors.full:
+                    _set(filters, 'director', directors.full[phrase])
+                elif n == 1 and phrase in DECADE_WORDS:
+                    _set(filters, 'decade', DECADE_WORDS[phrase])
+                elif n == 1 and _names_director(tokens, raw, i) and directors.by_surname(phrase):
+                    _set(filters, 'director', directors.by_surname(phrase))
+                else:
+                    continue
+                i += n
+                break
+            else:
+                if tokens[i] not in FILLER:
+                    leftover.append(tokens[i])
+                i += 1
+    except _NotConfident:
+        return None
+
+    if leftover or not filters:
+        return None
+    return filters
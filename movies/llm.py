@@ -0,0 +1,228 @@
+# movies/llm.py
+"""
+Async access to the local Ollama model for the chat views.
+
+Every call goes through one process-wide gate: at most CHAT_LLM_CONCURRENCY
+calls run at once and at most CHAT_LLM_MAX_WAITING more may queue for a
+slot. Anything beyond that, or anything that waits longer than
+CHAT_LLM_QUEUE_TIMEOUT, is shed with LLMUnavailable straight away, and each
+call has its own deadline. Callers catch LLMUnavailable and answer with a
+canned reply, so a burst of chat users degrades the chat instead of tying
+up the server.
+
+Calls are served by a backend chosen with CHAT_LLM_BACKEND:
+
+- "ollama": the model CHAT_LLM_MODEL on OLLAMA_HOST, through one pooled
+  HTTP client per event loop. Every call passes CHAT_LLM_KEEP_ALIVE so the
+  model stays loaded, and `warm_up` loads it at server start.
+- "stub": a deterministic fake with configurable latency, for load-testing
+  the chat offline (see the benchmark_chat command).
+"""
+import asyncio
+import json
+import logging
+import threading
+import weakref
+from contextlib import asynccontextmanager
+
+import httpx
+import ollama
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailable(Exception):
+    """The model is overloaded, timed out or failed; use a fallback answer."""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class LLMGate:
+    """
+    Bounded admission plus a concurrency limit. Admission is counted across
+    threads, so it also holds when each request runs in its own event loop
+    (async views under WSGI); the semaphore is per loop because asyncio
+    primitives cannot be shared between loops.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    @property
+    def admitted(self):
+        return self._admitted
+
+    def has_capacity(self):
+        """True if a call started now would not have to queue."""
+        return self._admitted < _setting('CHAT_LLM_CONCURRENCY', 2)
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._semaphores:
+                self._semaphores[loop] = asyncio.Semaphore(_setting('CHAT_LLM_CONCURRENCY', 2))
+            return self._semaphores[loop]
+
+    @asynccontextmanager
+    async def slot(self):
+        limit = _setting('CHAT_LLM_CONCURRENCY', 2) + _setting('CHAT_LLM_MAX_WAITING', 8)
+        with self._lock:
+            if self._admitted >= limit:
+                raise LLMUnavailable('LLM queue is full')
+            self._admitted += 1
+        try:
+            semaphore = self._semaphore()
+            try:
+                await asyncio.wait_for(semaphore.acquire(), _setting('CHAT_LLM_QUEUE_TIMEOUT', 5))
+            except asyncio.TimeoutError:
+                raise LLMUnavailable('timed out waiting for an LLM slot')
+            try:
+                yield
+            finally:
+                semaphore.release()
+        finally:
+            with self._lock:
+                self._admitted -= 1
+
+
+gate = LLMGate()
+
+
+class OllamaBackend:
+    def __init__(self):
+        self.model = _setting('CHAT_LLM_MODEL', 'qwen3:4b')
+        self.host = _setting('OLLAMA_HOST', None)
+        self.keep_alive = _setting('CHAT_LLM_KEEP_ALIVE', '30m')
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _timeout(self):
+        # Only connecting is bounded here: generating can legitimately take a
+        # while, and the per-call deadlines (asyncio.wait_for) bound the total.
+        connect = _setting('CHAT_LLM_CONNECT_TIMEOUT', 5)
+        return httpx.Timeout(connect=connect, read=None, write=connect, pool=connect)
+
+    def _client(self):
+        # httpx connection pools belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if loop not in self._clients:
+            self._clients[loop] = ollama.AsyncClient(host=self.host, timeout=self._timeout())
+        return self._clients[loop]
+
+    async def chat(self, messages, options=None, json_mode=False):
+        response = await self._client().chat(
+            model=self.model, messages=messages, options=options,
+            format='json' if json_mode else None, keep_alive=self.keep_alive,
+        )
+        return response['message']['content']
+
+    async def stream(self, messages, options=None):
+        chunks = await self._client().chat(
+            model=self.model, messages=messages, options=options, stream=True, keep_alive=self.keep_alive,
+        )
+        async for chunk in chunks:
+            yield chunk['message']['content']
+
+    def warm_up(self):
+        # An empty prompt makes Ollama load the model without generating anything
+        ollama.Client(host=self.host, timeout=self._timeout()).generate(model=self.model, prompt='', keep_alive=self.keep_alive)
+
+
+class StubBackend:
+    """
+    Deterministic stand-in for the model: parse calls get a keywords filter
+    for the user's message, replies name the first listed movie. Latency is
+    CHAT_LLM_STUB_LATENCY_MS before the first token plus
+    CHAT_LLM_STUB_TOKEN_MS per token.
+    """
+
+    def __init__(self):
+        self.first_token = _setting('CHAT_LLM_STUB_LATENCY_MS', 300) / 1000
+        self.per_token = _setting('CHAT_LLM_STUB_TOKEN_MS', 20) / 1000
+
+    def _reply(self, messages, json_mode):
+        if json_mode:
+            words = messages[-1]['content'].split()[-3:]
+            return json.dumps({'keywords': ' '.join(words)})
+        listing = [line.strip() for line in messages[0]['content'].splitlines() if line.strip().startswith('1. ')]
+        if listing:
+            return f"You could start with {listing[0][3:].split(' (')[0]}, a solid pick from this list."
+        return "Sorry, nothing matched that. Try a different genre, director or year."
+
+    async def chat(self, messages, options=None, json_mode=False):
+        text = self._reply(messages, json_mode)
+        await asyncio.sleep(self.first_token + self.per_token * len(text.split()))
+        return text
+
+    async def stream(self, messages, options=None):
+        await asyncio.sleep(self.first_token)
+        for word in self._reply(messages, False).split(' '):
+            await asyncio.sleep(self.per_token)
+            yield word + ' '
+
+    def warm_up(self):
+        pass
+
+
+BACKENDS = {'ollama': OllamaBackend, 'stub': StubBackend}
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def backend():
+    """The configured backend instance (one per process)."""
+    name = _setting('CHAT_LLM_BACKEND', 'ollama')
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = BACKENDS[name]()
+        return _backends[name]
+
+
+def warm_up_in_background():
+    """Load the model in a background thread, so the first chat is not a cold start."""
+    def run():
+        try:
+            backend().warm_up()
+        except Exception as e:
+            logger.warning('LLM warm-up failed: %s', e)
+
+    threading.Thread(target=run, name='llm-warm-up', daemon=True).start()
+
+
+async def achat(messages, options=None, timeout=30, json_mode=False):
+    """One non-streaming chat completion; returns the reply text."""
+    async with gate.slot():
+        try:
+            return await asyncio.wait_for(backend().chat(messages, options, json_mode), timeout)
+        except asyncio.TimeoutError:
+            raise LLMUnavailable(f'no reply within {timeout}s')
+        except Exception as e:
+            raise LLMUnavailable(str(e)) from e
+
+
+async def astream(messages, options=None, timeout=30):
+    """
+    Yield reply chunks as they are generated. `timeout` bounds the whole
+    stream; the slot is held until the stream ends.
+    """
+    async with gate.slot():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        iterator = aiter(backend().stream(messages, options))
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(anext(iterator), max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        except asyncio.TimeoutError:
+            raise LLMUnavailable(f'reply not finished within {timeout}s')
+        except Exception as e:
+            raise LLMUnavailable(str(e)) from e
+        finally:
+            await iterator.aclose()  # release the HTTP stream if we stopped early
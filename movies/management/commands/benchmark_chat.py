@@ -0,0 +1,85 @@
+import asyncio
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+
+from movies import llm, metrics
+from movies.management.commands.benchmark_intent_parser import SAMPLE_MESSAGES
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the chat endpoints in-process with many concurrent users. '
+        'Uses the deterministic stub LLM backend by default, so no model is needed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=20, help='Simultaneous chat users.')
+        parser.add_argument('--endpoint', choices=['api', 'stream'], default='stream')
+        parser.add_argument('--backend', choices=sorted(llm.BACKENDS), default='stub')
+        parser.add_argument('--reply-mode', choices=['template', 'llm', 'hybrid'], default=None,
+                            help='Override CHAT_REPLY_MODE for the run.')
+
+    def handle(self, *args, **options):
+        overrides = {'CHAT_LLM_BACKEND': options['backend']}
+        if options['reply_mode']:
+            overrides['CHAT_REPLY_MODE'] = options['reply_mode']
+        with override_settings(**overrides):
+            llm.backend().warm_up()
+            metrics.reset()
+            results, elapsed = asyncio.run(self._run(options))
+
+        ok = [r for r in results if r[0] == 200]
+        first = [r[1] for r in ok]
+        total = [r[2] for r in ok]
+        self.stdout.write(
+            f"{len(results)} requests to chat/{options['endpoint']}/ with {options['concurrency']} "
+            f"concurrent users ({options['backend']} backend): {len(ok)} OK\n"
+            f"Throughput: {len(results) / elapsed:.1f} req/s\n"
+            f"Time to first byte: p50 {self._pct(first, 50):.0f} ms, p95 {self._pct(first, 95):.0f} ms\n"
+            f"Full response:      p50 {self._pct(total, 50):.0f} ms, p95 {self._pct(total, 95):.0f} ms"
+        )
+        snapshot = metrics.snapshot()
+        self.stdout.write('Stages:')
+        for name, h in snapshot['histograms'].items():
+            self.stdout.write(f"  {name:<20} n={h['count']:<5} p50 {h['p50_ms']:.1f} ms, p95 {h['p95_ms']:.1f} ms")
+        for name, count in snapshot['counters'].items():
+            self.stdout.write(f"  {name:<20} {count}")
+
+    async def _run(self, options):
+        client = AsyncClient()
+        url = f"/chat/{options['endpoint']}/"
+        queue = asyncio.Queue()
+        for i in range(options['requests']):
+            queue.put_nowait(SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)])
+        results = []
+
+        async def user():
+            while not queue.empty():
+                message = queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.post(url, json.dumps({'message': message}), content_type='application/json')
+                first_byte = None
+                if response.streaming:
+                    # For chat/stream/ the first event is the movie results
+                    async for _ in response.streaming_content:
+                        if first_byte is None:
+                            first_byte = time.perf_counter()
+                done = time.perf_counter()
+                first_byte = first_byte or done
+                results.append((response.status_code, (first_byte - started) * 1000, (done - started) * 1000))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(options['concurrency'])))
+        return results, time.perf_counter() - started
+
+    def _pct(self, values, pct):
+        if not values:
+            return 0.0
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100)[pct - 1]
@@ -0,0 +1,87 @@
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand, CommandError
+
+from genres.models import Genre
+from movies.intent_parser import director_index, parse_intent
+from movies.views import get_search_filters_from_ollama
+
+# A mix of plain filter requests and open-ended ones the rules should leave to the LLM.
+SAMPLE_MESSAGES = [
+    'comedy from 2010', 'movies by Nolan', 'good sci-fi from the 90s', 'show me some horror movies',
+    'anything by Christopher Nolan with a 4-star rating', 'dramas from the eighties', 'top rated thrillers',
+    'animated films from 2019', 'romance rated 8+', 'action movies from the 2000s', 'hi', 'hello!',
+    'a movie about space', 'something like Inception but funnier', 'a sad movie to watch after a breakup',
+    'films where the twist is the main character was dead', 'what should I watch tonight?',
+    'movies set in Tokyo', 'feel-good family comedy with dogs', 'who directed Dune?',
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure how often the rule-based chat parser avoids the LLM and how much latency that saves.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None, help='Chat messages to replay, one per line (default: built-in sample).')
+        parser.add_argument('--repeat', type=int, default=20, help='Timing runs per message.')
+        parser.add_argument('--llm', action='store_true',
+                            help='Also time the real Ollama parser on fallback messages (cache bypassed).')
+        parser.add_argument('--assumed-llm-ms', type=float, default=2000,
+                            help='LLM parse latency to assume when --llm is not given.')
+
+    def handle(self, *args, **options):
+        messages = SAMPLE_MESSAGES
+        if options['file']:
+            try:
+                with open(options['file'], encoding='utf-8') as f:
+                    messages = [line.strip() for line in f if line.strip()]
+            except OSError as e:
+                raise CommandError(f"Cannot read {options['file']}: {e}")
+
+        genres_list = list(Genre.objects.values_list('name', flat=True))
+        started = time.perf_counter()
+        director_index()
+        self.stdout.write(f'Director index built in {(time.perf_counter() - started) * 1000:.1f} ms')
+
+        fast, fallback, timings = [], [], []
+        for message in messages:
+            result = parse_intent(message, genres_list)
+            (fallback if result is None else fast).append(message)
+            for _ in range(options['repeat']):
+                t = time.perf_counter()
+                parse_intent(message, genres_list)
+                timings.append((time.perf_counter() - t) * 1000)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {message!r:60} -> {result}')
+
+        llm_ms = options['assumed_llm_ms']
+        if options['llm'] and fallback:
+            llm_ms = self._time_llm(fallback, genres_list)
+
+        share = len(fast) / len(messages) if messages else 0.0
+        rule_ms = statistics.mean(timings) if timings else 0.0
+        before = llm_ms
+        after = share * rule_ms + (1 - share) * (rule_ms + llm_ms)
+        self.stdout.write(
+            f'Fast path taken for {len(fast)}/{len(messages)} messages ({share:.0%}).\n'
+            f'Rule parser: mean {rule_ms:.3f} ms, p95 {self._p95(timings):.3f} ms per message.\n'
+            f"LLM parse: {llm_ms:.0f} ms{' (measured)' if options['llm'] and fallback else ' (assumed)'}.\n"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Expected parse latency per message: {before:.0f} ms -> {after:.0f} ms '
+            f'({before / after if after else float("inf"):.1f}x faster)'
+        ))
+
+    def _time_llm(self, messages, genres_list):
+        timings = []
+        for message in messages:
+            t = time.perf_counter()
+            async_to_sync(get_search_filters_from_ollama)(message, genres_list, use_cache=False)
+            timings.append((time.perf_counter() - t) * 1000)
+        return statistics.mean(timings)
+
+    def _p95(self, timings):
+        if len(timings) < 2:
+            return timings[0] if timings else 0.0
+        return statistics.quantiles(timings, n=20)[-1]
@@ -0,0 +1,62 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark item-item training time and memory on synthetic interactions '
+        '(popularity-skewed movies, varied user activity). No database access.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interactions', nargs='+', type=int, default=[1_000_000, 3_000_000],
+                            help='Interaction counts to train on.')
+        parser.add_argument('--movies', type=int, default=50_000)
+        parser.add_argument('--users', type=int, default=200_000)
+        parser.add_argument('--lookups', type=int, default=1000, help='User recommendation lookups to time.')
+
+    def handle(self, *args, **options):
+        np = recommendations.np
+        if np is None:
+            raise CommandError('NumPy is not installed; recommendations are unavailable.')
+        rng = np.random.default_rng(42)
+
+        for size in options['interactions']:
+            users = (rng.pareto(1.5, size) * options['users'] / 20).astype(np.int64) % options['users']
+            movies = (rng.zipf(1.3, size) - 1) % options['movies']
+            weights = np.where(rng.random(size) < 0.3, rng.integers(1, 11, size) / recommendations.REVIEW_SCALE, 1.0)
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            m = recommendations.Interactions(users, movies, weights)
+            matrix_s = time.perf_counter() - started
+            store = recommendations.train(m)
+            train_s = time.perf_counter() - started - matrix_s
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            dirty = m.movie_ids[rng.choice(m.n_items, size=min(100, m.n_items), replace=False)]
+            started = time.perf_counter()
+            recommendations.update(store, m, dirty)
+            update_s = time.perf_counter() - started
+
+            histories = []
+            for user in rng.choice(len(m.user_ids), size=options['lookups']):
+                lo, hi = m.user_indptr[user], m.user_indptr[user + 1]
+                items = m.user_items[lo:hi][:recommendations.HISTORY_LIMIT]
+                histories.append([(int(m.movie_ids[i]), 1.0) for i in items])
+            started = time.perf_counter()
+            for history in histories:
+                recommendations.recommend(history, 12, store=store)
+            lookup_ms = (time.perf_counter() - started) / len(histories) * 1000
+
+            self.stdout.write(
+                f"{size:>10,} interactions ({m.nnz:,} unique, {m.n_items:,} movies, {len(m.user_ids):,} users):\n"
+                f"  matrix {matrix_s:.1f}s + training {train_s:.1f}s, peak memory {peak / 1e6:.0f} MB "
+                f"(matrix {m.nbytes() / 1e6:.0f} MB, store {store.nbytes / 1e6:.1f} MB)\n"
+                f"  incremental update of 100 movies: {update_s:.2f}s; lookup: {lookup_ms:.2f} ms per user"
+            )
@@ -0,0 +1,88 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from movies.models import Movie
+from movies.search import search_movies
+
+WORDS = [
+    'dark', 'night', 'space', 'love', 'war', 'city', 'dream', 'lost', 'king', 'shadow',
+    'river', 'star', 'ghost', 'summer', 'storm', 'heart', 'road', 'secret', 'empire', 'fire',
+    'winter', 'island', 'machine', 'blood', 'silent', 'golden', 'last', 'wild', 'broken', 'time',
+]
+DIRECTORS = [
+    'Christopher Nolan', 'Greta Gerwig', 'Denis Villeneuve', 'Sofia Coppola', 'Bong Joon-ho',
+    'Kathryn Bigelow', 'Ridley Scott', 'Jordan Peele', 'Chloe Zhao', 'Wes Anderson',
+]
+# Filler vocabulary so descriptions are not made only of searchable words.
+FILLER = [f'w{i:04d}' for i in range(5000)]
+QUERIES = ['space', 'dark night', 'nolan', 'lost empire', 'silent storm', 'golden', 'ghost river']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark ranked movie search against the old title__icontains scan on synthetic catalogs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000, 1_000_000],
+                            help='Catalog sizes to measure at (movies).')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query per size.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the synthetic movies instead of rolling them back.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        self.stdout.write(f'Database backend: {connection.vendor}')
+
+        with transaction.atomic():
+            inserted = Movie.objects.count()
+            for size in sorted(options['sizes']):
+                if size > inserted:
+                    self._insert_synthetic(rng, size - inserted)
+                    inserted = size
+                    if connection.vendor == 'postgresql':
+                        with connection.cursor() as cursor:
+                            cursor.execute('ANALYZE movies_movie')
+
+                ranked = self._measure(lambda q: search_movies(Movie.objects.all(), q)
+                                       .order_by('-search_rank')[:20], options['repeat'])
+                scan = self._measure(lambda q: Movie.objects.filter(title__icontains=q)
+                                     .order_by('title')[:20], options['repeat'])
+                self.stdout.write(
+                    f'{size:>9,} movies | ranked search p50 {ranked[0]:7.2f} ms  p95 {ranked[1]:7.2f} ms'
+                    f' | icontains p50 {scan[0]:7.2f} ms  p95 {scan[1]:7.2f} ms'
+                )
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Done.'))
+
+    def _insert_synthetic(self, rng, count, batch_size=5000):
+        self.stdout.write(f'Inserting {count:,} synthetic movies...')
+        batch = []
+        for _ in range(count):
+            title = ' '.join(rng.sample(WORDS, rng.randint(1, 3))).title()
+            batch.append(Movie(
+                title=title,
+                year=rng.randint(1950, 2025),
+                director=rng.choice(DIRECTORS),
+                description=' '.join(rng.choices(FILLER, k=22) + rng.choices(WORDS, k=3)),
+            ))
+            if len(batch) >= batch_size:
+                Movie.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Movie.objects.bulk_create(batch)
+
+    def _measure(self, build_queryset, repeat):
+        timings = []
+        for query in QUERIES:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(build_queryset(query))
+                timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        return statistics.median(timings), p95
@@ -0,0 +1,69 @@
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies import semantic
+from movies.management.commands.benchmark_search import DIRECTORS, FILLER, WORDS
+
+QUERIES = [
+    'a movie about space', 'lost in the dark city', 'a ghost on the river', 'war and love',
+    'secret empire of machines', 'a golden summer road trip', 'storm over the island',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark top-k semantic search (queries/sec) on synthetic memory-mapped indexes. '
+        'Uses a temporary directory; the real index and database are not touched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000, 250_000],
+                            help='Index sizes to measure at (movies).')
+        parser.add_argument('--queries', type=int, default=200, help='Queries per size.')
+        parser.add_argument('--k', type=int, default=12)
+
+    def handle(self, *args, **options):
+        if semantic.np is None:
+            raise CommandError('NumPy is not installed; semantic search is unavailable.')
+        rng = random.Random(42)
+        embedder = semantic.embedder()
+        queries = [embedder.embed([QUERIES[i % len(QUERIES)]])[0] for i in range(options['queries'])]
+
+        with tempfile.TemporaryDirectory() as directory:
+            indexed = 0
+            for size in sorted(options['sizes']):
+                started = time.perf_counter()
+                while indexed < size:
+                    batch = min(5000, size - indexed)
+                    texts = [self._description(rng) for _ in range(batch)]
+                    semantic.append(list(range(indexed + 1, indexed + batch + 1)), texts, directory)
+                    indexed += batch
+                embed_s = time.perf_counter() - started
+                semantic.write_meta(directory, queries[0].shape[0])
+                index = semantic.SemanticIndex(directory)
+
+                index.search(queries[0], options['k'])  # page the file in
+                started = time.perf_counter()
+                for vector in queries:
+                    index.search(vector, options['k'])
+                elapsed = time.perf_counter() - started
+
+                self.stdout.write(
+                    f"{size:>9,} movies: {len(queries) / elapsed:8.1f} queries/s "
+                    f"({elapsed / len(queries) * 1000:.2f} ms each, top-{options['k']}); "
+                    f"{embed_s:.1f}s to embed and append the new rows"
+                )
+
+        started = time.perf_counter()
+        for i in range(options['queries']):
+            embedder.embed([QUERIES[i % len(QUERIES)]])
+        per_query = (time.perf_counter() - started) / options['queries'] * 1000
+        self.stdout.write(f"Query embedding ({embedder.name}): {per_query:.2f} ms each")
+
+    def _description(self, rng):
+        words = rng.sample(WORDS, 3) + rng.sample(FILLER, 12)
+        rng.shuffle(words)
+        return f"{rng.choice(DIRECTORS)} directs: {' '.join(words)}."
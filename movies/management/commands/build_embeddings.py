@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies import semantic
+from movies.models import Movie
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the semantic search index over movie descriptions. By default only '
+        'movies missing from the index are embedded and appended; --rebuild starts over.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Re-embed every movie into a fresh index.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if semantic.np is None:
+            raise CommandError('NumPy is not installed; semantic search is unavailable.')
+
+        directory = semantic.index_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        meta = semantic.read_meta(directory)
+        rebuild = options['rebuild'] or not semantic.available()
+        if not rebuild and meta and meta.get('embedder') != semantic.embedder().name:
+            raise CommandError(f"The index was built with the {meta.get('embedder')} embedder; run with --rebuild.")
+
+        movies = Movie.objects.order_by('id').only('id', 'title', 'description').iterator(chunk_size=5000)
+        if rebuild:
+            target = directory / 'build'
+            target.mkdir(exist_ok=True)
+            (target / semantic.VECTORS_FILE).unlink(missing_ok=True)
+            since = semantic.indexed_bytes()
+        else:
+            target = directory
+            indexed = set(semantic.get_index().ids.tolist())
+            movies = (m for m in movies if m.id not in indexed)
+
+        started = time.perf_counter()
+        done = 0
+        batch = []
+        for movie in movies:
+            batch.append(movie)
+            if len(batch) >= options['batch_size']:
+                done += self._append(batch, target)
+                batch = []
+        done += self._append(batch, target)
+
+        if rebuild:
+            dim = semantic.embedder().dim or (meta or {}).get('dim', 0)
+            built = target / semantic.VECTORS_FILE
+            if not built.exists():
+                built.touch()
+            semantic.replace_index(built, dim, since)
+            (target / semantic.LOCK_FILE).unlink(missing_ok=True)
+            target.rmdir()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Rebuilt' if rebuild else 'Updated'} the semantic index in {elapsed:.1f}s: "
+            f"{done} movies embedded, {len(semantic.get_index())} indexed."
+        ))
+
+    def _append(self, batch, directory):
+        semantic.append([m.id for m in batch], [semantic.movie_text(m) for m in batch], directory)
+        if batch:
+            self.stdout.write(f'  > embedded up to movie {batch[-1].id}')
+        return len(batch)
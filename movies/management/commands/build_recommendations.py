@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Train the item-item recommendation store from watches and reviews. '
+        'With --incremental only movies with interactions since the last run are updated.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true',
+                            help='Apply new watches/reviews to the existing store (run this often, '
+                                 'and a full build nightly so deletions are picked up).')
+
+    def handle(self, *args, **options):
+        if recommendations.np is None:
+            raise CommandError('NumPy is not installed; recommendations are unavailable.')
+
+        started = time.perf_counter()
+        meta = recommendations.read_meta()
+        if options['incremental'] and meta and recommendations.available():
+            since = meta.get('refreshed_at', meta['built_at'])
+            store, changed = recommendations.refresh(since)
+            elapsed = time.perf_counter() - started
+            if store is None:
+                self.stdout.write('No new watches or reviews since the last run.')
+                return
+            self.stdout.write(self.style.SUCCESS(
+                f'Updated {len(changed)} movies in {elapsed:.1f}s ({len(store)} movies in the store).'
+            ))
+            return
+
+        if options['incremental']:
+            self.stdout.write('No store yet; running a full build.')
+        store, m = recommendations.build()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Trained on {m.nnz} interactions from {len(m.user_ids)} users in {elapsed:.1f}s: '
+            f'{len(store)} movies x {store["neighbors"].shape[1]} neighbours ({store.nbytes / 1e6:.1f} MB).'
+        ))
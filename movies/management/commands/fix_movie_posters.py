@@ -1,87 +1,138 @@
-import requests
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from movies.models import Movie 
+from movies.models import Movie
+from movies.tmdb import TMDbClient, TMDbError
+
 
 class Command(BaseCommand):
     help = 'Fetches correct poster URLs for movies that have incorrect file paths.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent TMDb searches.')
+        parser.add_argument('--rate', type=float, default=40,
+                            help='Max TMDb requests per second across all workers (0 = unlimited).')
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Movies per batch; each batch is flushed with one bulk_update and checkpointed.')
+        parser.add_argument('--checkpoint', default=None,
+                            help='Checkpoint file (default: fix_movie_posters.json next to the TMDb cache).')
+        parser.add_argument('--restart', action='store_true', help='Ignore any existing checkpoint.')
+        parser.add_argument('--base-url', default=None, help='TMDb API base URL (e.g. the local stub server).')
+
     def handle(self, *args, **options):
         self.stdout.write("Starting poster URL fix-up script...")
 
         # --- Define API configuration ---
         try:
             API_KEY = settings.TMDB_API_KEY
-            IMAGE_BASE_URL = settings.TMDB_IMAGE_BASE
-            DEFAULT_URL = getattr(settings, 'DEFAULT_POSTER_URL', None)
+            self.image_base_url = settings.TMDB_IMAGE_BASE
+            self.default_url = getattr(settings, 'DEFAULT_POSTER_URL', None)
         except AttributeError as e:
             self.stdout.write(self.style.ERROR(
                 f"Missing setting: {e}. Make sure TMDB_API_KEY and TMDB_IMAGE_BASE are in your settings.py"
             ))
             return
 
-        SEARCH_URL = "https://api.themoviedb.org/3/search/movie"
+        client = TMDbClient(
+            api_key=API_KEY,
+            base_url=options['base_url'],
+            rate=options['rate'],
+            pool_size=options['workers'],
+        )
+
+        checkpoint_path = Path(options['checkpoint'] or Path(settings.TMDB_CACHE_DIR).parent / 'fix_movie_posters.json')
+        checkpoint = {} if options['restart'] else self._load_checkpoint(checkpoint_path)
+        last_id = checkpoint.get('last_id', 0)
+        fixed_count = checkpoint.get('fixed', 0)
+        failed_count = checkpoint.get('failed', 0)
+        if last_id:
+            self.stdout.write(f"Resuming after movie id {last_id} (checkpoint {checkpoint_path}).")
 
         # Find all movies that have the "bad" URL format.
         # This assumes your old ImageField saved files to a directory named 'posters'.
         # Adjust 'posters/' if your 'upload_to' path was different.
-        movies_to_fix = Movie.objects.filter(poster__startswith='posters/')
-        
-        if not movies_to_fix.exists():
+        movies_to_fix = Movie.objects.filter(poster__startswith='posters/', id__gt=last_id).order_by('id')
+
+        total = movies_to_fix.count()
+        if not total:
             self.stdout.write(self.style.SUCCESS("No movies with bad poster paths found. Everything looks good!"))
+            checkpoint_path.unlink(missing_ok=True)
             return
 
-        self.stdout.write(f"Found {movies_to_fix.count()} movies to fix.")
-        fixed_count = 0
-        failed_count = 0
+        self.stdout.write(f"Found {total} movies to fix.")
 
-        for movie in movies_to_fix:
-            self.stdout.write(f"--- Processing: {movie.title} ({movie.year}) ---")
-            
-            # 1. Search for the movie on TMDB
-            params = {
-                'api_key': API_KEY,
-                'query': movie.title,
-                'year': movie.year
-            }
-            
-            try:
-                response = requests.get(SEARCH_URL, params=params)
-                response.raise_for_status()  # Raise an error for bad responses (4xx or 5xx)
-                data = response.json()
-
-                if data.get('results'):
-                    # 2. Found results, get the poster_path from the first one
-                    first_result = data['results'][0]
-                    poster_path = first_result.get('poster_path')
-
-                    if poster_path:
-                        # 3. We found a poster! Build the full URL and save it.
-                        correct_url = f"{IMAGE_BASE_URL}{poster_path}"
-                        movie.poster = correct_url
-                        movie.save()
-                        self.stdout.write(self.style.SUCCESS(f"  > SUCCESS: Updated poster for {movie.title}"))
+        batch_size = options['batch_size']
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                batch = list(movies_to_fix.filter(id__gt=last_id).only('id', 'title', 'year', 'poster')[:batch_size])
+                if not batch:
+                    break
+
+                to_update = []
+                for movie, (poster, fixed) in zip(batch, pool.map(lambda m: self._resolve(client, m), batch)):
+                    if poster is not None:
+                        movie.poster = poster
+                        to_update.append(movie)
+                    if fixed:
                         fixed_count += 1
                     else:
-                        # 4. Movie exists but has no poster. Save default.
-                        self.stdout.write(self.style.WARNING(f"  > WARNING: No poster found on TMDB for {movie.title}."))
-                        movie.poster = DEFAULT_URL
-                        movie.save()
                         failed_count += 1
-                else:
-                    # 5. No results found for this movie. Save default.
-                    self.stdout.write(self.style.ERROR(f"  > ERROR: Could not find {movie.title} on TMDB."))
-                    movie.poster = DEFAULT_URL
-                    movie.save()
-                    failed_count += 1
-
-            except requests.RequestException as e:
-                self.stdout.write(self.style.ERROR(f"  > ERROR: API request failed for {movie.title}: {e}"))
-                failed_count += 1
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"  > ERROR: A non-API error occurred for {movie.title}: {e}"))
-                failed_count += 1
 
+                # Flush the batch, then move the checkpoint past it
+                Movie.objects.bulk_update(to_update, fields=['poster'])
+                last_id = batch[-1].id
+                self._save_checkpoint(checkpoint_path, {'last_id': last_id, 'fixed': fixed_count, 'failed': failed_count})
+                self.stdout.write(f"--- Checkpoint: up to movie id {last_id} ({fixed_count} fixed, {failed_count} failed) ---")
+
+        checkpoint_path.unlink(missing_ok=True)
         self.stdout.write(self.style.SUCCESS(f"\n--- Script Finished ---"))
         self.stdout.write(self.style.SUCCESS(f"Successfully fixed: {fixed_count}"))
         self.stdout.write(self.style.WARNING(f"Failed or no poster: {failed_count}"))
+
+    def _resolve(self, client, movie):
+        """
+        Look up one movie on TMDb. Returns (new poster URL or None to leave
+        it unchanged, whether a real poster was found).
+        """
+        try:
+            # 1. Search for the movie on TMDB
+            results = client.search_movie(movie.title, movie.year)
+        except TMDbError as e:
+            self.stdout.write(self.style.ERROR(f"  > ERROR: API request failed for {movie.title}: {e}"))
+            return None, False
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"  > ERROR: A non-API error occurred for {movie.title}: {e}"))
+            return None, False
+
+        if not results:
+            # No results found for this movie. Save default.
+            self.stdout.write(self.style.ERROR(f"  > ERROR: Could not find {movie.title} on TMDB."))
+            return self.default_url, False
+
+        # Found results, get the poster_path from the first one
+        poster_path = results[0].get('poster_path')
+        if not poster_path:
+            # Movie exists but has no poster. Save default.
+            self.stdout.write(self.style.WARNING(f"  > WARNING: No poster found on TMDB for {movie.title}."))
+            return self.default_url, False
+
+        self.stdout.write(self.style.SUCCESS(f"  > SUCCESS: Updated poster for {movie.title}"))
+        return f"{self.image_base_url}{poster_path}", True
+
+    def _load_checkpoint(self, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_checkpoint(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
@@ -0,0 +1,231 @@
+import csv
+import gzip
+import io
+import json
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from movies.factories import MovieFactory
+from movies.models import Movie
+
+UPDATE_FIELDS = ['director', 'description', 'poster']
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream a large JSONL or CSV movie dump from disk and upsert movies, genres and '
+        'genre links in batches (COPY on Postgres, bulk_create elsewhere).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Dump file (.jsonl, .csv, optionally .gz).')
+        parser.add_argument('--format', choices=['jsonl', 'csv'], default=None,
+                            help='File format (default: guessed from the extension).')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if '.csv' in path else 'jsonl')
+        batch_size = options['batch_size']
+        use_copy = connection.vendor == 'postgresql'
+        self.stdout.write(f"Importing {path} ({fmt}, {'COPY' if use_copy else 'bulk_create'}, batches of {batch_size})...")
+
+        self.skipped = 0
+        started = time.perf_counter()
+        total = 0
+        opener = gzip.open if path.endswith('.gz') else open
+        try:
+            with opener(path, 'rt', encoding='utf-8', newline='') as f:
+                records = (r for r in map(self._normalize, self._read(f, fmt)) if r)
+                while True:
+                    batch = list(islice(records, batch_size))
+                    if not batch:
+                        break
+                    with transaction.atomic():
+                        if use_copy:
+                            self._upsert_copy(batch)
+                        else:
+                            self._upsert_orm(batch)
+                    total += len(batch)
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(f'{total:,} rows imported ({total / elapsed:,.0f} rows/sec)')
+        except OSError as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {total:,} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/sec), '
+            f'{self.skipped:,} invalid rows skipped.'
+        ))
+
+    # --- Reading ---
+
+    def _read(self, f, fmt):
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+            return
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                self._skip(f'line {line_no}: invalid JSON')
+
+    def _normalize(self, raw):
+        """Map one dump row onto Movie fields; returns None for unusable rows."""
+        if not isinstance(raw, dict):
+            self._skip(f'not an object: {str(raw)[:80]}')
+            return None
+        try:
+            return self._fields(raw)
+        except (AttributeError, TypeError, ValueError) as e:
+            # Wrongly typed values (e.g. a number for a title) skip the row, not the import
+            self._skip(f'{e}: {str(raw)[:80]}')
+            return None
+
+    def _fields(self, raw):
+        title = str(raw.get('title') or '').strip()
+        year = raw.get('year') or str(raw.get('release_date') or '')[:4]
+        try:
+            year = int(year)
+        except (TypeError, ValueError):
+            year = None
+        if not title or year is None:
+            self._skip(f'missing title/year: {str(raw)[:80]}')
+            return None
+
+        genres = raw.get('genres') or []
+        if isinstance(genres, str):
+            genres = genres.split('|')
+        genres = {
+            str((g.get('name') if isinstance(g, dict) else g) or '').strip()
+            for g in genres
+        } - {''}
+
+        # No poster info keeps an existing movie's poster (new movies get the default)
+        poster = raw.get('poster') or (raw.get('poster_path') and MovieFactory.poster_url(raw['poster_path']))
+        return {
+            'title': title[:200],
+            'year': year,
+            'director': str(raw.get('director') or 'Unknown')[:100],
+            'description': str(raw.get('description') or raw.get('overview') or ''),
+            'poster': str(poster or '')[:255] or None,
+            'genres': genres,
+        }
+
+    def _skip(self, reason):
+        self.skipped += 1
+        if self.skipped <= 20:
+            self.stdout.write(self.style.WARNING(f'Skipping row ({reason})'))
+
+    # --- Generic path: one lookup, bulk_update + bulk_create per batch ---
+
+    def _upsert_orm(self, batch):
+        rows = {(r['title'], r['year']): r for r in batch}  # last occurrence wins
+        existing = {}
+        candidates = Movie.objects.filter(
+            title__in={title for title, _ in rows},
+            year__in={year for _, year in rows},
+        ).only('id', 'title', 'year', *UPDATE_FIELDS)
+        for movie in candidates:
+            existing.setdefault((movie.title, movie.year), movie)
+
+        to_update, to_create = [], []
+        for key, row in rows.items():
+            movie = existing.get(key)
+            if movie is None:
+                movie = Movie(title=row['title'], year=row['year'], poster=MovieFactory.poster_url(None))
+                to_create.append(movie)
+                existing[key] = movie
+            else:
+                to_update.append(movie)
+            movie.director = row['director']
+            movie.description = row['description']
+            movie.poster = row['poster'] or movie.poster
+
+        Movie.objects.bulk_update(to_update, UPDATE_FIELDS)
+        Movie.objects.bulk_create(to_create)
+
+        genres = MovieFactory.genres_by_name(set().union(*(r['genres'] for r in rows.values())))
+        Through = Movie.genres.through
+        Through.objects.bulk_create(
+            [
+                Through(movie_id=existing[key].pk, genre_id=genres[name].pk)
+                for key, row in rows.items()
+                for name in row['genres']
+            ],
+            ignore_conflicts=True,
+        )
+
+    # --- Postgres path: COPY into temp staging tables, then set-based SQL ---
+
+    def _upsert_copy(self, batch):
+        movie_rows = io.StringIO()
+        link_rows = io.StringIO()
+        movies_out = csv.writer(movie_rows)
+        links_out = csv.writer(link_rows)
+        for seq, r in enumerate(batch):
+            movies_out.writerow([seq, r['title'], r['year'], r['director'], r['description'], r['poster'] or ''])
+            for name in r['genres']:
+                links_out.writerow([r['title'], r['year'], name])
+
+        # Make sure every genre exists before linking (small set per batch).
+        MovieFactory.genres_by_name(set().union(*(r['genres'] for r in batch)))
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS import_movie_stage "
+                "(seq int, title text, year int, director text, description text, poster text) ON COMMIT DELETE ROWS"
+            )
+            cursor.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS import_link_stage "
+                "(title text, year int, genre text) ON COMMIT DELETE ROWS"
+            )
+            # In CSV an empty field means NULL; these columns are NOT NULL and may be empty
+            self._copy(
+                cursor,
+                "COPY import_movie_stage FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (title, director, description))",
+                movie_rows,
+            )
+            self._copy(cursor, "COPY import_link_stage FROM STDIN WITH (FORMAT csv)", link_rows)
+
+            # Last occurrence of a (title, year) within the batch wins.
+            cursor.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS import_movie_latest ON COMMIT DROP AS "
+                "SELECT DISTINCT ON (title, year) * FROM import_movie_stage ORDER BY title, year, seq DESC"
+            )
+            cursor.execute(
+                "UPDATE movies_movie m SET director = s.director, description = s.description, "
+                "poster = COALESCE(NULLIF(s.poster, ''), m.poster) "
+                "FROM import_movie_latest s WHERE m.title = s.title AND m.year = s.year"
+            )
+            cursor.execute(
+                "INSERT INTO movies_movie (title, year, director, description, poster, "
+                "rating, rating_sum, rating_count, rating_last_updated, semantic_hash) "
+                "SELECT s.title, s.year, s.director, s.description, COALESCE(NULLIF(s.poster, ''), %s), "
+                "0, 0, 0, NULL, '' "
+                "FROM import_movie_latest s WHERE NOT EXISTS ("
+                "SELECT 1 FROM movies_movie m WHERE m.title = s.title AND m.year = s.year)",
+                [MovieFactory.poster_url(None)],
+            )
+            cursor.execute(
+                "INSERT INTO movies_movie_genres (movie_id, genre_id) "
+                "SELECT DISTINCT m.id, g.id FROM import_link_stage l "
+                "JOIN movies_movie m ON m.title = l.title AND m.year = l.year "
+                "JOIN (SELECT name, MIN(id) AS id FROM genres_genre GROUP BY name) g ON g.name = l.genre "
+                "ON CONFLICT DO NOTHING"
+            )
+
+    def _copy(self, cursor, sql, buffer):
+        buffer.seek(0)
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):  # psycopg2
+            raw.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies import feed
+from movies.models import FeedEntry
+from users import friend_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild every materialized friends feed from recent watches and reviews, '
+        'or with --trim-only just enforce FEED_MAX_ENTRIES on each feed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trim-only', action='store_true')
+
+    def handle(self, *args, **options):
+        friendships = get_user_model().friends.through.objects
+        owner_ids = sorted(set(friendships.values_list('from_customuser_id', flat=True)))
+        if options['trim_only']:
+            before = FeedEntry.objects.count()
+            feed.trim(FeedEntry.objects.values_list('owner_id', flat=True).distinct())
+            self.stdout.write(self.style.SUCCESS(f'Trimmed {before - FeedEntry.objects.count()} feed entries.'))
+            return
+
+        hubs = feed.high_fanout_ids()
+        friend_sets = {}
+        for i, owner_id in enumerate(owner_ids, start=1):
+            if owner_id not in friend_sets:
+                friend_sets = friend_cache.friend_ids_many(owner_ids[i - 1:i + 499])
+            # High-fanout friends are pulled in when the owner reads the feed
+            friend_ids = friend_sets[owner_id] - hubs
+            with transaction.atomic():
+                FeedEntry.objects.filter(owner_id=owner_id).delete()
+                feed.backfill(owner_id, friend_ids)
+            if i % 500 == 0:
+                self.stdout.write(f'[{i}/{len(owner_ids)}] feeds rebuilt')
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(owner_ids)} feeds ({FeedEntry.objects.count()} entries).'
+        ))
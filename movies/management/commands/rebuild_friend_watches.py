@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from movies.models import FriendWatchCount, WatchedMovie
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the FriendWatchCount table ("N friends watched this") from friendships and watch history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        # A watch of movie m by v counts for every user u that has v as a friend
+        counts = (
+            WatchedMovie.objects.filter(user__friends_rel__isnull=False)
+            .values_list('user__friends_rel', 'movie_id')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+        with transaction.atomic():
+            FriendWatchCount.objects.all().delete()
+            rows = FriendWatchCount.objects.bulk_create(
+                (FriendWatchCount(user_id=user_id, movie_id=movie_id, count=n)
+                 for user_id, movie_id, n in counts.iterator(chunk_size=options['batch_size'])),
+                batch_size=options['batch_size'],
+            )
+        self.stdout.write(self.style.SUCCESS(f'Friend watch counts rebuilt: {len(rows)} rows.'))
@@ -1,6 +1,7 @@
-from django.core.management.base import BaseCommand
-from django.db.models import Avg
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Avg, Count, F, Q, Sum
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from movies.models import Movie
 from reviews.models import Review
@@ -9,19 +10,98 @@ from reviews.models import Review
 class Command(BaseCommand):
     help = 'Recalculate average movie ratings from user reviews and store in Movie.rating'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bulk', action='store_true',
+            help='Set-based mode: one GROUP BY query and one bulk UPDATE per batch of movies '
+                 'instead of two queries per movie.',
+        )
+        parser.add_argument(
+            '--since', nargs='?', const='auto', default=None, metavar='DATETIME',
+            help='Only touch movies whose reviews were added, edited, deleted or bulk-updated '
+                 'after DATETIME. Without a value, only those changed since their rating was last '
+                 'updated, i.e. by bulk updates the running counters missed.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Movies per batch in --bulk mode.')
+
     def handle(self, *args, **options):
         movies = Movie.objects.all()
+        if options['since']:
+            movies = self._changed_movies(movies, options['since'])
+
+        if options['bulk']:
+            return self._recalculate_bulk(movies, options['batch_size'])
+
         total = movies.count()
         self.stdout.write(f'Recalculating ratings for {total} movies...')
         for i, movie in enumerate(movies, start=1):
-            agg = Review.objects.filter(movie=movie).aggregate(avg_rating=Avg('rating'))
+            agg = Review.objects.filter(movie=movie).aggregate(
+                avg_rating=Avg('rating'), total=Sum('rating'), count=Count('id')
+            )
             avg = agg['avg_rating']
             if avg is None:
                 movie.rating = 0.0
             else:
                 # keep average on same 1-10 scale as Review
                 movie.rating = float(avg)
+            movie.rating_sum = agg['total'] or 0
+            movie.rating_count = agg['count']
             movie.rating_last_updated = timezone.now()
-            movie.save(update_fields=['rating', 'rating_last_updated'])
+            movie.save(update_fields=['rating', 'rating_sum', 'rating_count', 'rating_last_updated'])
             self.stdout.write(f'[{i}/{total}] {movie.title}: {movie.rating}')
         self.stdout.write('Done.')
+
+    def _changed_movies(self, movies, since):
+        # Movie.reviews_changed_at is stamped by every review save and delete
+        # (together with rating_last_updated, as the counters are applied) and
+        # by bulk updates (alone, see reviews/models.py).
+        if since == 'auto':
+            return movies.filter(
+                Q(reviews_changed_at__gt=F('rating_last_updated'))
+                | Q(reviews_changed_at__isnull=False, rating_last_updated__isnull=True)
+            )
+        cutoff = parse_datetime(since)
+        if cutoff is None:
+            raise CommandError(f'Invalid --since datetime: {since!r} (use ISO 8601, e.g. 2025-11-01T00:00)')
+        if timezone.is_naive(cutoff):
+            cutoff = timezone.make_aware(cutoff)
+        return movies.filter(reviews_changed_at__gt=cutoff)
+
+    def _recalculate_bulk(self, movies, batch_size):
+        total = movies.count()
+        self.stdout.write(f'Recalculating ratings for {total} movies in batches of {batch_size}...')
+        done = 0
+        batch = []
+        ids = movies.order_by('id').values_list('id', flat=True).iterator(chunk_size=batch_size)
+        for movie_id in ids:
+            batch.append(movie_id)
+            if len(batch) >= batch_size:
+                done += self._update_batch(batch)
+                self.stdout.write(f'[{done}/{total}] updated')
+                batch = []
+        if batch:
+            done += self._update_batch(batch)
+            self.stdout.write(f'[{done}/{total}] updated')
+        self.stdout.write('Done.')
+
+    def _update_batch(self, ids):
+        # One aggregate over the batch's reviews (served by the reviews.movie_id
+        # index), then one bulk UPDATE; movies without reviews get zeroes.
+        totals = {
+            row['movie']: (row['total'], row['count'])
+            for row in Review.objects.filter(movie_id__in=ids).order_by().values('movie')
+            .annotate(total=Sum('rating'), count=Count('id'))
+        }
+        now = timezone.now()
+        movies = []
+        for movie_id in ids:
+            rating_sum, rating_count = totals.get(movie_id, (0, 0))
+            movies.append(Movie(
+                id=movie_id,
+                rating_sum=rating_sum,
+                rating_count=rating_count,
+                rating=rating_sum / rating_count if rating_count else 0.0,
+                rating_last_updated=now,
+            ))
+        Movie.objects.bulk_update(movies, ['rating_sum', 'rating_count', 'rating', 'rating_last_updated'])
+        return len(movies)
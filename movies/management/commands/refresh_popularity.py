@@ -0,0 +1,37 @@
+import math
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies import popularity
+from movies.models import MoviePopularity, WatchedMovie
+from reviews.models import Review
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the MoviePopularity ranking table from all watch and review history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        scores = defaultdict(lambda: -math.inf)  # log2 scores, see movies/popularity.py
+
+        # Stream the activity tables; only (movie_id, timestamp) pairs are loaded.
+        events = 0
+        for movie_id, watched_at in WatchedMovie.objects.values_list('movie_id', 'watched_at').iterator(chunk_size=5000):
+            scores[movie_id] = popularity.log_add(scores[movie_id], popularity.log_weight(popularity.WATCH_WEIGHT, watched_at))
+            events += 1
+        for movie_id, date in Review.objects.values_list('movie_id', 'date').iterator(chunk_size=5000):
+            scores[movie_id] = popularity.log_add(scores[movie_id], popularity.log_weight(popularity.REVIEW_WEIGHT, date))
+            events += 1
+        self.stdout.write(f'Scored {events} events across {len(scores)} movies.')
+
+        with transaction.atomic():
+            MoviePopularity.objects.all().delete()
+            MoviePopularity.objects.bulk_create(
+                (MoviePopularity(movie_id=movie_id, score=score) for movie_id, score in scores.items()),
+                batch_size=options['batch_size'],
+            )
+        self.stdout.write(self.style.SUCCESS('Popularity ranking rebuilt.'))
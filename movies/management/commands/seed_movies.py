@@ -1,60 +1,102 @@
 # movies/management/commands/seed_movies.py
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
+
 from ...factories import MovieFactory
-import tmdbsimple as tmdb
-import os
+from ...tmdb import TMDbClient, TMDbError, director_from_credits
+
+PAGE_SIZE = 20  # TMDb returns 20 movies per /movie/popular page
 
-tmdb.API_KEY = os.getenv("TMDB_API_KEY")
 
 class Command(BaseCommand):
     help = "Seed movies and genres from TMDb API using MovieFactory"
 
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=150, help='Number of popular movies to seed.')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent TMDb requests.')
+        parser.add_argument('--rate', type=float, default=40,
+                            help='Max TMDb requests per second across all workers (0 = unlimited).')
+        parser.add_argument('--base-url', default=None,
+                            help='TMDb API base URL, e.g. http://127.0.0.1:8765/3 for the local stub server.')
+        parser.add_argument('--cache-dir', default=str(getattr(settings, 'TMDB_CACHE_DIR', '')),
+                            help='On-disk response cache (reruns are served from here).')
+        parser.add_argument('--no-cache', action='store_true', help='Do not read or write the response cache.')
+        parser.add_argument('--refresh-cache', action='store_true', help='Ignore cached responses but store new ones.')
+
     def handle(self, *args, **options):
+        started = time.perf_counter()
+        client = TMDbClient(
+            base_url=options['base_url'],
+            cache_dir=None if options['no_cache'] else (options['cache_dir'] or None),
+            rate=options['rate'],
+            pool_size=options['workers'],
+            refresh_cache=options['refresh_cache'],
+        )
+
         # Get TMDb genre mapping once
         try:
-            genre_list = tmdb.Genres().movie_list().get('genres', [])
-        except Exception as e:
+            genre_list = client.movie_genres()
+        except TMDbError as e:
             self.stdout.write(self.style.WARNING(f"Failed to fetch genres: {e}"))
             genre_list = []
 
-        # Fetch popular movies
-        try:
-            popular_movies = tmdb.Movies().popular().get('results', [])[:150]
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f"Failed to fetch popular movies: {e}"))
-            return
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            # Fetch popular movies, all pages in parallel
+            pages = range(1, math.ceil(options['count'] / PAGE_SIZE) + 1)
+            try:
+                results = [item for page in pool.map(client.popular_movies, pages) for item in page]
+            except TMDbError as e:
+                self.stdout.write(self.style.ERROR(f"Failed to fetch popular movies: {e}"))
+                return
 
-        for item in popular_movies:
-            title = item.get('title') or 'Untitled Movie'
+            popular_movies = []
+            seen = set()
+            for item in results:
+                if item.get('id') not in seen:
+                    seen.add(item.get('id'))
+                    popular_movies.append(item)
+            popular_movies = popular_movies[:options['count']]
+            self.stdout.write(f"Fetched {len(popular_movies)} movies, resolving directors...")
+
+            # Get director names, one credits call per movie, in parallel
+            directors = list(pool.map(self._fetch_director, [client] * len(popular_movies), popular_movies))
+
+        # Database writes stay on the main thread, as one batch
+        records = []
+        for item, director in zip(popular_movies, directors):
             release_date = item.get('release_date') or ''
-            year = int(release_date[:4]) if release_date else 0
-            description = item.get('overview') or 'No description available'
-            genre_ids = item.get('genre_ids', [])
-            poster_path = item.get('poster_path')
+            records.append({
+                'title': item.get('title') or 'Untitled Movie',
+                'year': int(release_date[:4]) if release_date else 0,
+                'director': director,
+                'description': item.get('overview') or 'No description available',
+                'genre_ids': item.get('genre_ids', []),
+                'poster_path': item.get('poster_path'),
+            })
 
-            # Get director name
-            director = 'Unknown'
-            try:
-                credits = tmdb.Movies(item['id']).credits()
-                for member in credits.get('crew', []):
-                    if member.get('job') == 'Director':
-                        director = member.get('name') or 'Unknown'
-                        break
-            except Exception as e:
-                self.stdout.write(self.style.WARNING(f"Failed to fetch director for {title}: {e}"))
-
-            # Create movie via factory
-            movie = MovieFactory.create_movie(
-                title=title,
-                year=year,
-                director=director,
-                description=description,
-                genre_ids=genre_ids,
-                genre_list=genre_list,
-                poster_path=poster_path
-            )
-
-            if movie:
-                self.stdout.write(self.style.SUCCESS(f"Movie '{movie.title}' added."))
+        # Create movies via factory
+        outcomes = MovieFactory.create_movies(records, genre_list)
+
+        for record, outcome in zip(records, outcomes):
+            if outcome.status == 'created':
+                self.stdout.write(self.style.SUCCESS(f"Movie '{outcome.movie.title}' added."))
             else:
-                self.stdout.write(self.style.NOTICE(f"Movie '{title}' already exists. Skipping."))
+                self.stdout.write(self.style.NOTICE(f"Movie '{record['title']}' already exists. Skipping."))
+
+        elapsed = time.perf_counter() - started
+        stats = client.stats
+        self.stdout.write(
+            f"Done in {elapsed:.1f}s: {stats['requests']} API requests, "
+            f"{stats['cache_hits']} cache hits, {stats['retries']} retries."
+        )
+
+    def _fetch_director(self, client, item):
+        try:
+            return director_from_credits(client.credits(item['id']))
+        except TMDbError as e:
+            self.stdout.write(self.style.WARNING(f"Failed to fetch director for {item.get('title')}: {e}"))
+            return 'Unknown'
@@ -0,0 +1,113 @@
+import base64
+import io
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand
+
+GENRES = [
+    {'id': 28, 'name': 'Action'}, {'id': 12, 'name': 'Adventure'}, {'id': 16, 'name': 'Animation'},
+    {'id': 35, 'name': 'Comedy'}, {'id': 80, 'name': 'Crime'}, {'id': 18, 'name': 'Drama'},
+    {'id': 14, 'name': 'Fantasy'}, {'id': 27, 'name': 'Horror'}, {'id': 10749, 'name': 'Romance'},
+    {'id': 878, 'name': 'Science Fiction'}, {'id': 53, 'name': 'Thriller'},
+]
+DIRECTORS = ['Christopher Nolan', 'Greta Gerwig', 'Denis Villeneuve', 'Sofia Coppola', 'Bong Joon-ho']
+# 1x1 grey JPEG, served for poster images when Pillow is not installed
+TINY_JPEG = base64.b64decode(
+    '/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDAP//////////////////////////////////////////////////////////////////////////'
+    '////////////wAALCAABAAEBAREA/8QAHwAAAQUBAQEBAQEAAAAAAAAAAAECAwQFBgcICQoL/8QAtRAAAgEDAwIEAwUFBAQAAAF9AQIDAAQR'
+    'BRIhMUEGE1FhByJxFDKBkaEII0KxwRVS0fAkM2JyggkKFhcYGRolJicoKSo0NTY3ODk6Q0RFRkdISUpTVFVWV1hZWmNkZWZnaGlqc3R1dnd4'
+    'eXqDhIWGh4iJipKTlJWWl5iZmqKjpKWmp6ipqrKztLW2t7i5usLDxMXGx8jJytLT1NXW19jZ2uHi4+Tl5ufo6erx8vP09fb3+Pn6/9oACAEB'
+    'AAA/ACv/2Q=='
+)
+WORDS = ['Dark', 'Night', 'Space', 'Love', 'War', 'City', 'Dream', 'Lost', 'King', 'Shadow', 'River', 'Star']
+
+
+def fake_movie(movie_id):
+    rng = random.Random(movie_id)
+    return {
+        'id': movie_id,
+        'title': f"{' '.join(rng.sample(WORDS, 2))} {movie_id}",
+        'release_date': f'{rng.randint(1960, 2025)}-01-01',
+        'overview': f'Synthetic movie number {movie_id}.',
+        'genre_ids': [g['id'] for g in rng.sample(GENRES, rng.randint(1, 3))],
+        'poster_path': f'/stub{movie_id}.jpg',
+    }
+
+
+def fake_poster():
+    """A full-size (500x750) poster if Pillow is available, else a 1x1 JPEG."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return TINY_JPEG
+    out = io.BytesIO()
+    Image.new('RGB', (500, 750), (40, 60, 90)).save(out, format='JPEG', quality=85)
+    return out.getvalue()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    poster = TINY_JPEG
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = url.path.removeprefix('/3')
+        time.sleep(self.latency)
+
+        if url.path.startswith('/t/p/'):
+            # Image CDN, e.g. /t/p/w500/stub1.jpg
+            return self._send(self.poster, 'image/jpeg')
+        if path == '/genre/movie/list':
+            return self._json({'genres': GENRES})
+        if path == '/movie/popular':
+            page = int(params.get('page', 1))
+            return self._json({'page': page, 'results': [fake_movie((page - 1) * 20 + i + 1) for i in range(20)]})
+        if path.startswith('/movie/') and path.endswith('/credits'):
+            movie_id = int(path.split('/')[2])
+            director = DIRECTORS[movie_id % len(DIRECTORS)]
+            return self._json({'id': movie_id, 'crew': [{'job': 'Director', 'name': director}]})
+        if path == '/search/movie':
+            movie_id = sum(map(ord, params.get('query', ''))) % 100000 + 1
+            return self._json({'results': [fake_movie(movie_id)]})
+        self.send_error(404)
+
+    def _json(self, data):
+        self._send(json.dumps(data).encode(), 'application/json')
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Run a local fake TMDb API and image host (deterministic fixtures) for offline benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=float, default=50, help='Artificial delay per request.')
+
+    def handle(self, *args, **options):
+        StubHandler.latency = options['latency_ms'] / 1000
+        StubHandler.poster = fake_poster()
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), StubHandler)
+        self.stdout.write(self.style.SUCCESS(
+            f"Stub TMDb API on http://127.0.0.1:{options['port']}/3, images under /t/p/ "
+            f"({options['latency_ms']:.0f} ms latency). Ctrl+C to stop."
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
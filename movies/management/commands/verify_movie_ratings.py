@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from movies.models import Movie
+from reviews.models import Review
+
+
+class Command(BaseCommand):
+    help = 'Check Movie.rating_sum/rating_count against the true review aggregates and optionally repair drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Repair movies whose counters have drifted.')
+
+    def handle(self, *args, **options):
+        # One GROUP BY for the truth, one streamed scan for the stored counters.
+        truth = {
+            row['movie_id']: (row['total'], row['count'])
+            for row in Review.objects.values('movie_id').annotate(total=Sum('rating'), count=Count('id')).iterator()
+        }
+        drifted = []
+        stored = Movie.objects.values_list('id', 'title', 'rating_sum', 'rating_count', 'rating')
+        for movie_id, title, rating_sum, rating_count, rating in stored.iterator(chunk_size=5000):
+            total, count = truth.get(movie_id, (0, 0))
+            expected_rating = total / count if count else 0.0
+            if (rating_sum, rating_count) != (total, count) or abs(rating - expected_rating) > 1e-6:
+                drifted.append(movie_id)
+                self.stdout.write(self.style.WARNING(
+                    f'{title}: stored {rating_sum}/{rating_count} ({rating:.2f}), actual {total}/{count} ({expected_rating:.2f})'
+                ))
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All movie rating counters are consistent.'))
+            return
+        self.stdout.write(f'{len(drifted)} movie(s) have drifted.')
+        if not options['fix']:
+            self.stdout.write('Run again with --fix to repair them.')
+            return
+
+        for movie_id in drifted:
+            # Lock the movie row and recompute under the lock so a review
+            # submitted meanwhile cannot be lost.
+            with transaction.atomic():
+                movie = Movie.objects.select_for_update().get(pk=movie_id)
+                agg = Review.objects.filter(movie_id=movie_id).aggregate(total=Sum('rating'), count=Count('id'))
+                movie.rating_sum = agg['total'] or 0
+                movie.rating_count = agg['count']
+                movie.rating = movie.rating_sum / movie.rating_count if movie.rating_count else 0.0
+                movie.rating_last_updated = timezone.now()
+                movie.save(update_fields=['rating_sum', 'rating_count', 'rating', 'rating_last_updated'])
+        self.stdout.write(self.style.SUCCESS(f'Repaired {len(drifted)} movie(s).'))
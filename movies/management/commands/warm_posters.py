@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.models import Movie
+from movies.posters import PosterUnavailable, is_proxyable, poster_sizes, poster_variant
+
+
+class Command(BaseCommand):
+    help = 'Pre-render cached poster variants (thumbnails etc.) for the whole catalog in parallel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', default=None,
+                            help='Variants to render (default: all of POSTER_SIZES).')
+        parser.add_argument('--workers', type=int, default=8)
+
+    def handle(self, *args, **options):
+        sizes = options['sizes'] or list(poster_sizes())
+        unknown = set(sizes) - set(poster_sizes())
+        if unknown:
+            raise CommandError(f"Unknown poster size(s): {', '.join(sorted(unknown))}")
+
+        movies = Movie.objects.exclude(poster__isnull=True).exclude(poster='').values_list('id', 'poster')
+        jobs = [
+            (movie_id, poster, size)
+            for movie_id, poster in movies.iterator(chunk_size=5000)
+            if is_proxyable(poster)
+            for size in sizes
+        ]
+        self.stdout.write(f"Rendering {len(jobs)} poster variants with {options['workers']} workers...")
+
+        started = time.perf_counter()
+        failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for i, ok in enumerate(pool.map(self._render, jobs), start=1):
+                failed += not ok
+                if i % 500 == 0:
+                    self.stdout.write(f'[{i}/{len(jobs)}] done')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Done in {elapsed:.1f}s: {len(jobs) - failed} ready, {failed} failed.'))
+
+    def _render(self, job):
+        movie_id, poster, size = job
+        try:
+            poster_variant(movie_id, poster, size)
+            return True
+        except PosterUnavailable as e:
+            self.stdout.write(self.style.WARNING(f'  > Movie {movie_id} ({size}): {e}'))
+            return False
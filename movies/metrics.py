@@ -0,0 +1,129 @@
+# movies/metrics.py
+"""
+In-process timing spans, latency histograms and counters.
+
+    with metrics.trace('chat_api'):          # one log line per request
+        with metrics.span('chat.query'):     # one histogram per stage
+            ...
+    metrics.incr('chat.intent.json_error')
+
+Every span records its duration in a histogram of the same name, which
+keeps the last METRICS_WINDOW samples and reports p50/p95/p99 over them.
+Spans that run inside a `trace` (including code called through
+sync_to_async, which copies the context) are also collected into a single
+structured log record on the "filmmate.metrics" logger when the trace
+ends. `snapshot()` is served as JSON by the internal metrics view.
+
+Numbers are per process: each worker reports its own traffic.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger('filmmate.metrics')
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_current_trace = contextvars.ContextVar('metrics_trace', default=None)
+
+
+class Histogram:
+    """Recent samples (milliseconds) plus lifetime count and sum."""
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def snapshot(self):
+        ordered = sorted(self.samples)
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 2) if self.count else 0.0,
+            'p50_ms': _percentile(ordered, 50),
+            'p95_ms': _percentile(ordered, 95),
+            'p99_ms': _percentile(ordered, 99),
+            'max_ms': round(ordered[-1], 2) if ordered else 0.0,
+        }
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 2)
+
+
+def observe(name, ms):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram(getattr(settings, 'METRICS_WINDOW', 1024))
+        histogram.observe(ms)
+
+
+def incr(name, n=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+@contextmanager
+def span(name):
+    """Time the block into the `name` histogram (and the current trace, if any)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - started) * 1000
+        observe(name, ms)
+        spans = _current_trace.get()
+        if spans is not None:
+            spans.append((name, ms))
+
+
+@contextmanager
+def trace(name, **fields):
+    """Like span, and logs every span inside it as one record when it ends."""
+    spans = []
+    token = _current_trace.set(spans)
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        ms = (time.perf_counter() - started) * 1000
+        _current_trace.reset(token)
+        observe(name, ms)
+        stages = ' '.join(f'{stage}={stage_ms:.1f}ms' for stage, stage_ms in spans)
+        logger.info(
+            '%s %.1fms%s %s', name, ms, ' FAILED' if failed else '', stages,
+            extra={'trace': name, 'duration_ms': ms, 'failed': failed,
+                   'spans': [{'name': stage, 'ms': stage_ms} for stage, stage_ms in spans], **fields},
+        )
+
+
+def snapshot():
+    with _lock:
+        return {
+            'histograms': {name: h.snapshot() for name, h in sorted(_histograms.items())},
+            'counters': dict(sorted(_counters.items())),
+        }
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
@@ -0,0 +1,77 @@
+from django.db import migrations
+
+# The SQL is spelled out here rather than imported from movies.search, so
+# later changes to that module cannot change what this migration did.
+# PG_SEARCH_VECTOR must stay identical to movies.search.PG_SEARCH_VECTOR,
+# otherwise Postgres will not use the index.
+PG_SEARCH_VECTOR = (
+    "to_tsvector('english', "
+    "coalesce(\"movies_movie\".\"title\", '') || ' ' || "
+    "coalesce(\"movies_movie\".\"director\", '') || ' ' || "
+    "coalesce(\"movies_movie\".\"description\", ''))"
+)
+
+SQLITE_FTS_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS movies_movie_fts USING fts5("
+    "title, director, description, content='movies_movie', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS movies_movie_fts_ai AFTER INSERT ON movies_movie BEGIN "
+    "INSERT INTO movies_movie_fts(rowid, title, director, description) "
+    "VALUES (new.id, new.title, new.director, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS movies_movie_fts_ad AFTER DELETE ON movies_movie BEGIN "
+    "INSERT INTO movies_movie_fts(movies_movie_fts, rowid, title, director, description) "
+    "VALUES ('delete', old.id, old.title, old.director, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS movies_movie_fts_au AFTER UPDATE OF title, director, description "
+    "ON movies_movie BEGIN "
+    "INSERT INTO movies_movie_fts(movies_movie_fts, rowid, title, director, description) "
+    "VALUES ('delete', old.id, old.title, old.director, old.description); "
+    "INSERT INTO movies_movie_fts(rowid, title, director, description) "
+    "VALUES (new.id, new.title, new.director, new.description); END",
+    "INSERT INTO movies_movie_fts(movies_movie_fts) VALUES ('rebuild')",
+]
+
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS movies_movie_fts_ai",
+    "DROP TRIGGER IF EXISTS movies_movie_fts_ad",
+    "DROP TRIGGER IF EXISTS movies_movie_fts_au",
+    "DROP TABLE IF EXISTS movies_movie_fts",
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS movies_movie_search_vector_idx "
+            f"ON movies_movie USING GIN ({PG_SEARCH_VECTOR})"
+        )
+        # Serves the title %% query / similarity() typo matching in search_movies
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS movies_movie_title_trgm_idx "
+            "ON movies_movie USING GIN (title gin_trgm_ops)"
+        )
+    elif vendor == 'sqlite':
+        for sql in SQLITE_FTS_INSTALL:
+            schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS movies_movie_search_vector_idx")
+        schema_editor.execute("DROP INDEX IF EXISTS movies_movie_title_trgm_idx")
+    elif vendor == 'sqlite':
+        for sql in SQLITE_FTS_DROP:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_watchedmovie'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
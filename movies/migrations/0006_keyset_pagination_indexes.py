@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('genres', '0002_initial'),
+        ('lists', '0004_alter_list_movies'),
+        ('movies', '0005_movie_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['title', 'id'], name='movie_title_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['year', 'id'], name='movie_year_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['director', 'id'], name='movie_director_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watchedmovie',
+            index=models.Index(fields=['-watched_at', '-id'], name='watched_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watchedmovie',
+            index=models.Index(fields=['user', '-watched_at'], name='watched_user_recent_idx'),
+        ),
+    ]
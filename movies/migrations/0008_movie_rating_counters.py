@@ -0,0 +1,70 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:09
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+# Copied from migration 0005 rather than imported, so it stays as it was
+SQLITE_FTS_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS movies_movie_fts USING fts5("
+    "title, director, description, content='movies_movie', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS movies_movie_fts_ai AFTER INSERT ON movies_movie BEGIN "
+    "INSERT INTO movies_movie_fts(rowid, title, director, description) "
+    "VALUES (new.id, new.title, new.director, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS movies_movie_fts_ad AFTER DELETE ON movies_movie BEGIN "
+    "INSERT INTO movies_movie_fts(movies_movie_fts, rowid, title, director, description) "
+    "VALUES ('delete', old.id, old.title, old.director, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS movies_movie_fts_au AFTER UPDATE OF title, director, description "
+    "ON movies_movie BEGIN "
+    "INSERT INTO movies_movie_fts(movies_movie_fts, rowid, title, director, description) "
+    "VALUES ('delete', old.id, old.title, old.director, old.description); "
+    "INSERT INTO movies_movie_fts(rowid, title, director, description) "
+    "VALUES (new.id, new.title, new.director, new.description); END",
+    "INSERT INTO movies_movie_fts(movies_movie_fts) VALUES ('rebuild')",
+]
+
+
+def backfill_rating_counters(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    Review = apps.get_model('reviews', 'Review')
+    totals = Review.objects.values('movie_id').annotate(total=Sum('rating'), count=Count('id'))
+    movies = []
+    for row in totals.iterator():
+        movies.append(Movie(
+            id=row['movie_id'],
+            rating_sum=row['total'],
+            rating_count=row['count'],
+            rating=row['total'] / row['count'],
+        ))
+    Movie.objects.bulk_update(movies, ['rating_sum', 'rating_count', 'rating'], batch_size=1000)
+
+
+def reinstall_sqlite_fts(apps, schema_editor):
+    # Adding the columns rebuilt movies_movie on SQLite, dropping the FTS
+    # triggers. Same statements as migration 0005, kept inline on purpose.
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in SQLITE_FTS_INSTALL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_moviepopularity'),
+        ('reviews', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='rating_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_counters, migrations.RunPython.noop),
+        migrations.RunPython(reinstall_sqlite_fts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:26
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('genres', '0002_initial'),
+        ('lists', '0004_alter_list_movies'),
+        ('movies', '0008_movie_rating_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-rating', '-year', 'id'], name='movie_rating_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['year', '-rating'], name='movie_year_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(django.db.models.functions.text.Lower('director'), models.OrderBy(models.F('rating'), descending=True), name='movie_director_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:09
+
+from django.db import migrations, models
+
+# Copied from migration 0005 rather than imported, so it stays as it was
+SQLITE_FTS_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS movies_movie_fts USING fts5("
+    "title, director, description, content='movies_movie', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS movies_movie_fts_ai AFTER INSERT ON movies_movie BEGIN "
+    "INSERT INTO movies_movie_fts(rowid, title, director, description) "
+    "VALUES (new.id, new.title, new.director, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS movies_movie_fts_ad AFTER DELETE ON movies_movie BEGIN "
+    "INSERT INTO movies_movie_fts(movies_movie_fts, rowid, title, director, description) "
+    "VALUES ('delete', old.id, old.title, old.director, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS movies_movie_fts_au AFTER UPDATE OF title, director, description "
+    "ON movies_movie BEGIN "
+    "INSERT INTO movies_movie_fts(movies_movie_fts, rowid, title, director, description) "
+    "VALUES ('delete', old.id, old.title, old.director, old.description); "
+    "INSERT INTO movies_movie_fts(rowid, title, director, description) "
+    "VALUES (new.id, new.title, new.director, new.description); END",
+    "INSERT INTO movies_movie_fts(movies_movie_fts) VALUES ('rebuild')",
+]
+
+
+def reinstall_sqlite_fts(apps, schema_editor):
+    # Adding the column rebuilt movies_movie on SQLite, dropping the FTS
+    # triggers (see migration 0008).
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in SQLITE_FTS_INSTALL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0012_movie_reviews_changed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='semantic_hash',
+            field=models.CharField(blank=True, db_default='', default='', editable=False, max_length=16),
+        ),
+        migrations.RunPython(reinstall_sqlite_fts, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Lower
 from django.utils import timezone
 from django.conf import settings
 
@@ -13,13 +15,47 @@ class Movie(models.Model):
     poster = models.URLField(max_length=255, blank=True, null=True)
     description = models.TextField()
     # Average rating computed from user reviews. Default 0.0 when no reviews.
+    # Derived from rating_sum / rating_count, which are kept up to date on
+    # every review create/edit/delete (see movies/ratings.py).
     rating = models.FloatField(default=0.0)
+    rating_sum = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
     # Timestamp when rating was last recalculated
     rating_last_updated = models.DateTimeField(null=True, blank=True)
+    # Last time one of its reviews was added, edited or deleted, including
+    # bulk updates that bypass the counters (see reviews/models.py); read by
+    # `recalculate_movie_ratings --since`
+    reviews_changed_at = models.DateTimeField(null=True, blank=True)
+    # Hash of the text last sent to the semantic index, so saves that do not
+    # change it are not re-embedded (see movies/signals.py)
+    semantic_hash = models.CharField(max_length=16, blank=True, default='', db_default='', editable=False)
+
+    class Meta:
+        # Keyset pagination on movies_all walks these (sort column, id) pairs.
+        indexes = [
+            models.Index(fields=['title', 'id'], name='movie_title_id_idx'),
+            models.Index(fields=['year', 'id'], name='movie_year_id_idx'),
+            models.Index(fields=['director', 'id'], name='movie_director_id_idx'),
+            # Structured filters (movies/filters.py) in "best first" order.
+            models.Index(fields=['-rating', '-year', 'id'], name='movie_rating_year_idx'),
+            models.Index(fields=['year', '-rating'], name='movie_year_rating_idx'),
+            models.Index(Lower('director'), F('rating').desc(), name='movie_director_rating_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.year})"
 
+    # Locally cached, resized posters for templates (see movies/posters.py)
+    @property
+    def poster_thumb(self):
+        from movies.posters import proxied_poster_url
+        return proxied_poster_url(self, 'thumb')
+
+    @property
+    def poster_detail(self):
+        from movies.posters import proxied_poster_url
+        return proxied_poster_url(self, 'detail')
+
 
 
 class WatchedMovie(models.Model):
@@ -29,6 +65,86 @@ class WatchedMovie(models.Model):
 
     class Meta:
         unique_together = ('user', 'movie')
+        # Keyset pagination on the friends feed walks (watched_at, id).
+        indexes = [
+            models.Index(fields=['-watched_at', '-id'], name='watched_recent_idx'),
+            models.Index(fields=['user', '-watched_at'], name='watched_user_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} watched {self.movie.title}"
+
+
+class MoviePopularity(models.Model):
+    """
+    Materialized popularity ranking, one row per movie with any activity.
+
+    `score` is the log2 of a forward-decayed sum of watch/review events
+    (see movies/popularity.py), so rows can be updated one event at a time
+    and still be compared directly: the homepage reads the top N off the index.
+    """
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True, related_name='popularity')
+    score = models.FloatField(default=0.0, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.movie.title}: {self.score:.2f}"
+
+
+class FriendWatchCount(models.Model):
+    """
+    How many of `user`'s friends have watched `movie`.
+
+    Kept up to date on every watch/unwatch and friend add/remove (see
+    movies/friend_watches.py), so "N friends watched this" is a single
+    unique-key lookup and the "Popular Among Friends" rail reads the top N
+    off the (user, -count) index. Rows whose count drops to zero are deleted.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'movie'], name='unique_friend_watch_count'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-count', 'movie'], name='friend_watch_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.count} friends of user {self.user_id} watched movie {self.movie_id}"
+
+
+class FeedEntry(models.Model):
+    """
+    One event (a friend watched or reviewed a movie) in one user's
+    friends feed, written when the event happens (see movies/feed.py), so
+    reading a page of the feed is one range scan of (owner, -created_at, -id).
+    Deleting the watch or review deletes its entries.
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='feed_entries')
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+    watched = models.ForeignKey(WatchedMovie, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    review = models.ForeignKey('reviews.Review', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    # When the event happened, not when the entry was written
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'watched'], condition=models.Q(watched__isnull=False),
+                                    name='unique_feed_watch'),
+            models.UniqueConstraint(fields=['owner', 'review'], condition=models.Q(review__isnull=False),
+                                    name='unique_feed_review'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-id'], name='feed_owner_recent_idx'),
+        ]
+
+    @property
+    def action(self):
+        return 'reviewed' if self.review_id else 'watched'
+
+    def __str__(self):
+        return f"{self.actor_id} {self.action} {self.movie_id} (feed of {self.owner_id})"
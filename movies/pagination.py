@@ -0,0 +1,123 @@
+# movies/pagination.py
+"""
+Keyset (cursor) pagination.
+
+Django's Paginator runs COUNT(*) and OFFSET on every page, so deep pages get
+slower the further you go. Here each page is fetched with a WHERE clause on
+the last row seen, keyed on (sort column, id), so every page costs one
+indexed range scan no matter how deep it is.
+"""
+import base64
+import json
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values, direction):
+    """Pack the boundary row's sort values into an opaque, URL-safe string."""
+    payload = json.dumps({'v': values, 'd': direction}, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction = payload['v'], payload['d']
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(str(e))
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        raise InvalidCursor('malformed cursor')
+    return values, direction
+
+
+class KeysetPage:
+    """One page of results plus opaque cursors for its neighbours."""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def _after(keys, values, reverse):
+    """
+    Build the "row comes after `values`" condition for a multi-column key,
+    e.g. for (title ASC, id ASC): title > v0 OR (title = v0 AND id > v1).
+    """
+    condition = Q()
+    for i, (field, descending) in enumerate(keys):
+        lookup = 'gt' if descending == reverse else 'lt'
+        ties = {prev_field: values[j] for j, (prev_field, _) in enumerate(keys[:i])}
+        condition |= Q(**ties, **{f'{field}__{lookup}': values[i]})
+    return condition
+
+
+def paginate_keyset(queryset, keys, cursor=None, per_page=20):
+    """
+    Return a KeysetPage of `queryset` ordered by `keys`, a list of
+    (field, descending) pairs that must end with a unique column (usually id).
+    """
+    values, direction = (None, 'next')
+    if cursor:
+        values, direction = decode_cursor(cursor)
+        if len(values) != len(keys):
+            raise InvalidCursor('cursor does not match this ordering')
+
+    reverse = direction == 'prev'
+    ordering = [
+        f'-{field}' if descending != reverse else field
+        for field, descending in keys
+    ]
+    qs = queryset.order_by(*ordering)
+    if values is not None:
+        qs = qs.filter(_after(keys, values, reverse))
+
+    # Fetch one extra row to learn whether there is another page this way.
+    rows = list(qs[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if reverse:
+        rows.reverse()
+
+    def boundary(row, way):
+        return encode_cursor([_key_value(row, field) for field, _ in keys], way)
+
+    next_cursor = previous_cursor = None
+    if rows:
+        if has_more or reverse:
+            next_cursor = boundary(rows[-1], 'next')
+        if (has_more and reverse) or (values is not None and not reverse):
+            previous_cursor = boundary(rows[0], 'prev')
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+def _key_value(row, field):
+    value = row
+    for part in field.split('__'):
+        value = getattr(value, part)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
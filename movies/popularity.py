@@ -0,0 +1,85 @@
+# movies/popularity.py
+"""
+Time-decayed popularity scores for the "Popular This Week" rail.
+
+Uses forward decay: an event at time t is worth weight * 2 ** ((t - EPOCH) / half_life),
+so newer events are worth exponentially more, and since every score shares
+the same epoch they can be compared (and ORDER BY'd) directly without ever
+re-decaying old rows.
+
+Those sums double every half-life and would overflow a float within a few
+decades, so MoviePopularity.score holds their log2 instead: an event adds
+log2(weight) + (t - EPOCH) / half_life, combined with the existing score as
+log2(2 ** a + 2 ** b) inside the UPDATE. Log scores only grow linearly with
+time and order the same way. If POPULARITY_EPOCH is ever changed, run
+`refresh_popularity`.
+"""
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least, Log, Power
+from django.utils import timezone
+
+from movies.models import MoviePopularity
+
+WATCH_WEIGHT = 1.0
+REVIEW_WEIGHT = 2.0
+
+DEFAULT_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+# A removal that leaves less than this (in log2 units) of the score empties the row
+EMPTY_EPSILON = 1e-9
+
+
+def _half_life_seconds():
+    return getattr(settings, 'POPULARITY_HALF_LIFE_DAYS', 7) * 24 * 3600
+
+
+def log_weight(weight, when):
+    """log2 of the contribution of an event of `weight` (> 0) that happened at `when`."""
+    epoch = getattr(settings, 'POPULARITY_EPOCH', DEFAULT_EPOCH)
+    return math.log2(weight) + (when - epoch).total_seconds() / _half_life_seconds()
+
+
+def log_add(a, b):
+    """log2(2 ** a + 2 ** b) without leaving log space."""
+    high, low = max(a, b), min(a, b)
+    if low == -math.inf:
+        return high
+    return high + math.log1p(2 ** (low - high)) / math.log(2)
+
+
+def _log_add_expression(delta):
+    high, low = Greatest(F('score'), Value(delta)), Least(F('score'), Value(delta))
+    return high + Log(2, 1 + Power(2, low - high))
+
+
+def _log_subtract_expression(delta):
+    # log2(2 ** score - 2 ** delta); only applied where score > delta
+    return F('score') + Log(2, 1 - Power(2, Value(delta) - F('score')))
+
+
+def record_activity(movie_id, weight, when=None):
+    """Add (or with a negative weight, remove) one event to a movie's score."""
+    delta = log_weight(abs(weight), when or timezone.now())
+    now = timezone.now()
+    rows = MoviePopularity.objects.filter(movie_id=movie_id)
+    if weight < 0:
+        # Removals never create a row (the movie itself may be mid-delete)
+        if not rows.filter(score__gt=delta + EMPTY_EPSILON).update(
+            score=_log_subtract_expression(delta), updated_at=now
+        ):
+            rows.filter(score__lte=delta + EMPTY_EPSILON).delete()
+        return
+    if not rows.update(score=_log_add_expression(delta), updated_at=now):
+        _, created = MoviePopularity.objects.get_or_create(movie_id=movie_id, defaults={'score': delta})
+        if not created:
+            # Lost a race with another writer creating the row; add on top of theirs.
+            rows.update(score=_log_add_expression(delta), updated_at=now)
+
+
+def top_movies(limit):
+    """The `limit` most popular movies, read straight off the score index."""
+    ranking = MoviePopularity.objects.select_related('movie').order_by('-score')[:limit]
+    return [entry.movie for entry in ranking]
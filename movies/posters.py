@@ -0,0 +1,170 @@
+# movies/posters.py
+"""
+Local poster cache and resizing proxy.
+
+Movie.poster points at a full-size (w500) TMDb image. Grids only need a small
+thumbnail, so `poster_variant` downloads the original once, renders the
+requested size into POSTER_CACHE_DIR and serves it from disk afterwards.
+
+Only posters on POSTER_ALLOWED_HOSTS are fetched, at most MAX_POSTER_BYTES
+each. A request for a variant that is not on disk yet is redirected to the
+original while a small background pool renders it (or run `warm_posters`),
+so a web worker never waits on TMDb.
+
+Variant URLs contain a hash of the source URL, so they never change content
+and can be cached by browsers forever; a new poster simply gets a new URL.
+"""
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.urls import reverse
+from requests.adapters import HTTPAdapter
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it variants are cached at original size
+    Image = None
+
+# Decoding failures; an oversized image is not an OSError but a DecompressionBombError
+IMAGE_ERRORS = (OSError,) if Image is None else (OSError, Image.DecompressionBombError)
+
+DEFAULT_SIZES = {'thumb': 185, 'detail': 500}
+DEFAULT_ALLOWED_HOSTS = ('image.tmdb.org',)
+FETCH_TIMEOUT = 10
+MAX_POSTER_BYTES = 5 * 1024 * 1024
+RENDER_WORKERS = 2
+
+_session = None
+_session_lock = threading.Lock()
+_pool = None
+_pending = set()  # variant paths queued or being rendered in the background
+_pending_lock = threading.Lock()
+
+
+class PosterUnavailable(Exception):
+    pass
+
+
+def poster_sizes():
+    return getattr(settings, 'POSTER_SIZES', DEFAULT_SIZES)
+
+
+def is_proxyable(poster):
+    """True for remote posters on one of POSTER_ALLOWED_HOSTS; anything else is never fetched."""
+    if not poster:
+        return False
+    url = urlsplit(poster)
+    allowed = getattr(settings, 'POSTER_ALLOWED_HOSTS', DEFAULT_ALLOWED_HOSTS)
+    return url.scheme in ('http', 'https') and url.hostname in allowed
+
+
+def poster_version(poster):
+    return hashlib.sha1(poster.encode()).hexdigest()[:12]
+
+
+def proxied_poster_url(movie, size):
+    """URL to use in templates: the cached variant for remote posters, else the poster as stored."""
+    if not is_proxyable(movie.poster):
+        return movie.poster or ''
+    return reverse('movies:poster', args=[movie.pk, size, poster_version(movie.poster)])
+
+
+def variant_path(movie_id, size, version):
+    return Path(settings.POSTER_CACHE_DIR) / size / f'{movie_id}-{version}.jpg'
+
+
+def _get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=32)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+def _fetch(poster):
+    """The original image's bytes, streamed so an oversized one is abandoned early."""
+    with _get_session().get(poster, timeout=FETCH_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        if int(response.headers.get('Content-Length') or 0) > MAX_POSTER_BYTES:
+            raise PosterUnavailable(f'{poster}: larger than {MAX_POSTER_BYTES} bytes')
+        data = bytearray()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            data += chunk
+            if len(data) > MAX_POSTER_BYTES:
+                raise PosterUnavailable(f'{poster}: larger than {MAX_POSTER_BYTES} bytes')
+        return bytes(data)
+
+
+def _render(data, width):
+    if Image is None:
+        return data
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGB')
+        if image.width > width:
+            height = round(image.height * width / image.width)
+            image = image.resize((width, height), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, format='JPEG', quality=82, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+def poster_variant(movie_id, poster, size):
+    """
+    Return the on-disk path of `poster` rendered at `size`, creating it on
+    first use. Raises PosterUnavailable if the original cannot be fetched.
+    """
+    width = poster_sizes()[size]
+    path = variant_path(movie_id, size, poster_version(poster))
+    if path.exists():
+        return path
+    if not is_proxyable(poster):
+        raise PosterUnavailable(f'{poster}: not an allowed poster host')
+
+    try:
+        data = _render(_fetch(poster), width)
+    except (requests.RequestException, *IMAGE_ERRORS) as e:
+        raise PosterUnavailable(f'{poster}: {e}') from e
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)  # atomic: concurrent requests never serve a partial file
+    return path
+
+
+def _render_in_background(movie_id, poster, size, path):
+    try:
+        poster_variant(movie_id, poster, size)
+    except PosterUnavailable:
+        pass  # the view keeps redirecting to the original
+    finally:
+        with _pending_lock:
+            _pending.discard(path)
+
+
+def cached_variant(movie_id, poster, size):
+    """
+    The on-disk path of the variant if it is ready. Otherwise None, and the
+    variant is queued for rendering in the background (once per variant).
+    """
+    global _pool
+    path = variant_path(movie_id, size, poster_version(poster))
+    if path.exists():
+        return path
+    with _pending_lock:
+        if path not in _pending:
+            _pending.add(path)
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix='poster')
+            _pool.submit(_render_in_background, movie_id, poster, size, path)
+    return None
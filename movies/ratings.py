@@ -0,0 +1,57 @@
+# movies/ratings.py
+"""
+Running rating counters on Movie.
+
+Each review create/edit/delete adjusts Movie.rating_sum and rating_count with
+a single UPDATE built from F() expressions, so concurrent submits cannot
+overwrite each other and the cost does not grow with the number of reviews.
+Movie.rating (the average) is derived from the counters in the same UPDATE,
+which also stamps rating_last_updated and reviews_changed_at.
+"""
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+from movies.models import Movie
+
+
+def average_expression(sum_expression, count_expression):
+    """SQL expression for sum / count that yields 0.0 when there are no reviews."""
+    return Case(
+        When(GreaterThan(count_expression, 0),
+             then=Cast(sum_expression, FloatField()) / count_expression),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def apply_rating_change(movie_id, sum_delta, count_delta):
+    """Atomically shift a movie's rating counters and re-derive its average."""
+    new_sum = F('rating_sum') + sum_delta
+    new_count = F('rating_count') + count_delta
+    now = timezone.now()
+    Movie.objects.filter(pk=movie_id).update(
+        rating_sum=new_sum,
+        rating_count=new_count,
+        # SET expressions see the pre-update column values, so this is the new average.
+        rating=average_expression(new_sum, new_count),
+        rating_last_updated=now,
+        reviews_changed_at=now,
+    )
+
+
+def review_added(movie_id, rating):
+    apply_rating_change(movie_id, rating, 1)
+
+
+def review_removed(movie_id, rating):
+    apply_rating_change(movie_id, -rating, -1)
+
+
+def review_changed(old_movie_id, old_rating, movie_id, rating):
+    if old_movie_id != movie_id:
+        review_removed(old_movie_id, old_rating)
+        review_added(movie_id, rating)
+    elif old_rating != rating:
+        apply_rating_change(movie_id, rating - old_rating, 0)
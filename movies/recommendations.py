@@ -0,0 +1,398 @@
+# movies/recommendations.py
+"""
+Item-item collaborative filtering for "Recommended for you".
+
+Watches and reviews form a sparse user x movie matrix X: a watch weighs
+WATCH_WEIGHT, a review rating / REVIEW_SCALE, and a movie both watched and
+reviewed keeps the larger weight. Two movies are similar when the same
+people interacted with them: the cosine of their columns of X, with
+NORM_SMOOTHING added to each norm so movies seen by one or two people do
+not score a perfect 1.0.
+
+Training keeps X as plain NumPy CSR (by user) and CSC (by movie) arrays and
+computes the nonzero entries of X^T X a block of movies at a time, sizing
+blocks so the expanded (movie, co-watched movie) pairs stay within a fixed
+budget; the work grows with co-watches, not with movies squared. Only the
+top RECOMMEND_NEIGHBORS neighbours of each movie are kept, in one
+structured array saved as .npy and memory-mapped by readers: for each
+movie id (sorted), its neighbour ids and scores.
+
+`refresh(since)` updates the store incrementally: movies with new or edited
+interactions get their rows recomputed, and because similarity is
+symmetric the new scores are also merged into their neighbours' rows. It
+loads only the interactions those rows depend on: the movies' users, and
+every movie those users interacted with.
+Deletions, and scores that drop enough to lose a neighbour slot, only
+take effect on the next full `build`.
+
+A user's recommendations are a lookup: gather the neighbour rows of the
+movies they interacted with recently, sum the weighted scores per
+candidate and drop what they have already seen.
+
+NumPy is optional; without it `available()` is False and the home page
+simply has no recommendations rail.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Q
+
+from movies.models import Movie, WatchedMovie
+from reviews.models import Review
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; recommendations are disabled without it
+    np = None
+
+STORE_FILE = 'neighbors.npy'
+META_FILE = 'meta.json'
+
+WATCH_WEIGHT = 1.0
+REVIEW_SCALE = 5.0  # a 10/10 review counts twice as much as a watch
+NORM_SMOOTHING = 2.0
+HISTORY_LIMIT = 50  # recent interactions used to recommend for a user
+
+# Co-watched pairs expanded at once while training; bounds its memory
+BLOCK_PAIRS = 1 << 23
+
+_store = None
+_store_stat = None
+_store_lock = threading.Lock()
+
+
+def available():
+    return np is not None and (store_dir() / STORE_FILE).exists()
+
+
+def store_dir():
+    return Path(getattr(settings, 'RECOMMENDATIONS_DIR', Path(settings.BASE_DIR) / '.cache' / 'recommendations'))
+
+
+def neighbors_per_movie():
+    return getattr(settings, 'RECOMMEND_NEIGHBORS', 30)
+
+
+# --- Interaction matrix ---
+
+class Interactions:
+    """A deduplicated sparse user x movie matrix in CSR and CSC form."""
+
+    def __init__(self, user_ids, movie_ids, weights):
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float32)
+        self.user_ids, users = np.unique(user_ids, return_inverse=True)
+        self.movie_ids, items = np.unique(movie_ids, return_inverse=True)
+        n_items = len(self.movie_ids)
+
+        # One entry per (user, movie), keeping the larger weight
+        keys = users.astype(np.int64) * n_items + items
+        order = np.lexsort((weights, keys))
+        keys, weights = keys[order], weights[order]
+        last = np.ones(len(keys), dtype=bool)
+        last[:-1] = keys[1:] != keys[:-1]
+        keys, weights = keys[last], weights[last]
+        users, items = keys // n_items, keys % n_items
+
+        self.nnz = len(keys)
+        # CSR: keys are sorted by user already
+        self.user_indptr = _indptr(users, len(self.user_ids))
+        self.user_items = items.astype(np.int32)
+        self.user_weights = weights
+        # CSC
+        by_item = np.argsort(items, kind='stable')
+        self.item_indptr = _indptr(items, n_items)
+        self.item_users = users[by_item].astype(np.int32)
+        self.item_weights = weights[by_item]
+
+        self.norms = np.sqrt(np.bincount(items, weights=weights.astype(np.float64) ** 2, minlength=n_items)
+                             + NORM_SMOOTHING)
+
+    @property
+    def n_items(self):
+        return len(self.movie_ids)
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (
+            self.user_ids, self.movie_ids, self.user_indptr, self.user_items, self.user_weights,
+            self.item_indptr, self.item_users, self.item_weights, self.norms,
+        ))
+
+
+def _indptr(sorted_rows, n_rows):
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sorted_rows, minlength=n_rows), out=indptr[1:])
+    return indptr
+
+
+def _ranges(starts, lengths):
+    """Concatenation of arange(start, start + length) for each pair."""
+    total = int(lengths.sum())
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return offsets + np.arange(total, dtype=np.int64)
+
+
+def load_interactions(where=Q()):
+    """Every watch and review (matching `where`), as an Interactions matrix."""
+    watches = WatchedMovie.objects.filter(where).values_list('user_id', 'movie_id')
+    reviews = Review.objects.filter(where).values_list('user_id', 'movie_id', 'rating')
+    watches = np.array(list(watches.iterator(chunk_size=20000)), dtype=np.int64).reshape(-1, 2)
+    reviews = np.array(list(reviews.iterator(chunk_size=20000)), dtype=np.int64).reshape(-1, 3)
+    return Interactions(
+        np.concatenate([watches[:, 0], reviews[:, 0]]),
+        np.concatenate([watches[:, 1], reviews[:, 1]]),
+        np.concatenate([np.full(len(watches), WATCH_WEIGHT), reviews[:, 2] / REVIEW_SCALE]),
+    )
+
+
+def _interacted(field, where):
+    """Q for rows whose `field` is the user/movie of a watch or review matching `where`."""
+    return (Q(**{f'{field}__in': WatchedMovie.objects.filter(where).values(field)})
+            | Q(**{f'{field}__in': Review.objects.filter(where).values(field)}))
+
+
+# --- Training ---
+
+def _blocks(m, items):
+    """Split `items` into blocks that expand to at most BLOCK_PAIRS pairs."""
+    degrees = np.diff(m.user_indptr)
+    # Pairs an item expands to: the sum of its users' degrees (every item has users)
+    cost = np.add.reduceat(degrees[m.item_users], m.item_indptr[:-1]) if m.nnz else np.zeros(0)
+    block, pairs = [], 0
+    for item in items:
+        if block and pairs + cost[item] > BLOCK_PAIRS:
+            yield np.array(block)
+            block, pairs = [], 0
+        block.append(item)
+        pairs += cost[item]
+    if block:
+        yield np.array(block)
+
+
+def _similarities(m, block):
+    """
+    Nonzero cosine similarities of the `block` items to every other item,
+    as (row in block, item, score) arrays sorted by row.
+    """
+    starts = m.item_indptr[block]
+    lengths = m.item_indptr[block + 1] - starts
+    pos = _ranges(starts, lengths)
+    rows = np.repeat(np.arange(len(block), dtype=np.int64), lengths)
+    users, weights = m.item_users[pos], m.item_weights[pos]
+
+    # Expand every (block item, user) to all of that user's items and sum per pair
+    ustarts = m.user_indptr[users]
+    ulengths = m.user_indptr[users + 1] - ustarts
+    upos = _ranges(ustarts, ulengths)
+    keys = np.repeat(rows, ulengths) * m.n_items + m.user_items[upos]
+    products = np.repeat(weights, ulengths) * m.user_weights[upos]
+    keys, inverse = np.unique(keys, return_inverse=True)
+    scores = np.bincount(inverse, weights=products)
+
+    rows, items = keys // m.n_items, keys % m.n_items
+    scores /= m.norms[block][rows] * m.norms[items]
+    other = items != block[rows]  # a movie is not its own neighbour
+    return rows[other], items[other], scores[other]
+
+
+def _top_k(m, n_rows, rows, items, scores, k):
+    """Neighbour movie ids (-1 for empty slots) and scores per row, best first."""
+    order = np.lexsort((-scores, rows))
+    rows, items, scores = rows[order], items[order], scores[order]
+    index = np.arange(len(rows))
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = rows[1:] != rows[:-1]
+    rank = index - np.maximum.accumulate(np.where(first, index, 0))
+    keep = rank < k
+
+    neighbors = np.full((n_rows, k), -1, dtype=np.int32)
+    top_scores = np.zeros((n_rows, k), dtype=np.float32)
+    neighbors[rows[keep], rank[keep]] = m.movie_ids[items[keep]]
+    top_scores[rows[keep], rank[keep]] = scores[keep]
+    return neighbors, top_scores
+
+
+def empty_store(movie_ids, k):
+    dtype = np.dtype([('movie_id', '<i4'), ('neighbors', '<i4', (k,)), ('scores', '<f4', (k,))])
+    store = np.zeros(len(movie_ids), dtype=dtype)
+    store['movie_id'] = movie_ids
+    store['neighbors'] = -1
+    return store
+
+
+def train(m, k=None):
+    """Top-k neighbours of every movie in `m`, as a store array."""
+    k = k or neighbors_per_movie()
+    store = empty_store(m.movie_ids, k)
+    for block in _blocks(m, np.arange(m.n_items)):
+        store['neighbors'][block], store['scores'][block] = _top_k(m, len(block), *_similarities(m, block), k)
+    return store
+
+
+def update(store, m, movie_ids):
+    """
+    Recompute the rows of `movie_ids` against `m` and merge their new
+    scores into every other row (similarity is symmetric).
+
+    `m` need not hold every interaction, only those of the users of
+    `movie_ids` and of every movie those users interacted with. Returns a
+    new store covering the movies of both `store` and `m`.
+    """
+    k = store['neighbors'].shape[1]
+    updated = empty_store(np.union1d(store['movie_id'], m.movie_ids), k)
+    updated[np.searchsorted(updated['movie_id'], store['movie_id'])] = store
+    at = np.searchsorted(updated['movie_id'], m.movie_ids)  # store row of each item of m
+
+    dirty = np.flatnonzero(np.isin(m.movie_ids, np.asarray(movie_ids, dtype=np.int64)))
+    neighbors, scores = updated['neighbors'], updated['scores']
+    for block in _blocks(m, dirty):
+        rows, items, similarities = _similarities(m, block)
+        neighbors[at[block]], scores[at[block]] = _top_k(m, len(block), rows, items, similarities, k)
+        bounds = np.searchsorted(rows, np.arange(len(block) + 1))
+        for row, item in enumerate(block):
+            lo, hi = bounds[row], bounds[row + 1]
+            _merge_into_neighbors(neighbors, scores, m.movie_ids[item], at[items[lo:hi]], similarities[lo:hi])
+
+    order = np.argsort(-scores, axis=1, kind='stable')
+    updated['neighbors'] = np.take_along_axis(neighbors, order, axis=1)
+    updated['scores'] = np.take_along_axis(scores, order, axis=1)
+    return updated
+
+
+def _merge_into_neighbors(neighbors, scores, movie_id, rows, similarities):
+    """Put `movie_id` with its new score into each of `rows` where it belongs."""
+    if not len(rows):
+        return
+    new = similarities.astype(np.float32)
+    row_neighbors, row_scores = neighbors[rows], scores[rows]
+    present = row_neighbors == movie_id
+    has = present.any(axis=1)
+    row_scores[present] = new[has]
+    # Elsewhere take the weakest slot if the new score beats it
+    weakest = np.argmin(row_scores, axis=1)
+    better = ~has & (new > row_scores[np.arange(len(rows)), weakest])
+    hit = np.flatnonzero(better)
+    row_neighbors[hit, weakest[hit]] = movie_id
+    row_scores[hit, weakest[hit]] = new[hit]
+    neighbors[rows], scores[rows] = row_neighbors, row_scores
+
+
+# --- Store ---
+
+def save(store, meta, directory=None):
+    directory = Path(directory or store_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / f'{STORE_FILE}.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, store)
+    os.replace(tmp, directory / STORE_FILE)
+    (directory / f'{META_FILE}.tmp').write_text(json.dumps(meta))
+    os.replace(directory / f'{META_FILE}.tmp', directory / META_FILE)
+
+
+def read_meta():
+    try:
+        return json.loads((store_dir() / META_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def get_store():
+    """The memory-mapped store, reopened whenever it has been rewritten."""
+    global _store, _store_stat
+    path = store_dir() / STORE_FILE
+    with _store_lock:
+        stat = os.stat(path)
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if _store is None or key != _store_stat:
+            _store, _store_stat = np.load(path, mmap_mode='r'), key
+        return _store
+
+
+def build():
+    started = time.time()
+    m = load_interactions()
+    store = train(m)
+    save(store, {'built_at': started, 'interactions': int(m.nnz), 'movies': int(m.n_items)})
+    return store, m
+
+
+def refresh(since):
+    """Incrementally apply interactions newer than `since` (a timestamp)."""
+    started = time.time()
+    when = datetime.fromtimestamp(since, tz=dt_timezone.utc)
+    changed = set(WatchedMovie.objects.filter(watched_at__gte=when).values_list('movie_id', flat=True))
+    changed |= set(Review.objects.filter(updated_at__gte=when).values_list('movie_id', flat=True))
+    if not changed:
+        return None, sorted(changed)
+    users = _interacted('user_id', Q(movie_id__in=changed))
+    m = load_interactions(_interacted('movie_id', users))
+    store = update(np.array(get_store()), m, sorted(changed))
+    meta = read_meta() or {}
+    meta.update({'refreshed_at': started, 'movies': len(store)})
+    meta.setdefault('built_at', started)
+    save(store, meta)
+    return store, sorted(changed)
+
+
+# --- Serving ---
+
+def recommend(history, limit=12, exclude=(), store=None):
+    """
+    Movie ids recommended from `history`, a list of (movie_id, weight),
+    best first, excluding the history itself and `exclude`.
+    """
+    store = get_store() if store is None else store
+    if not history or not len(store):
+        return []
+    movie_ids = np.array([movie_id for movie_id, _ in history], dtype=np.int64)
+    weights = np.array([weight for _, weight in history], dtype=np.float32)
+    seen = np.union1d(movie_ids, np.fromiter(exclude, dtype=np.int64))
+    rows = np.searchsorted(store['movie_id'], movie_ids)
+    rows = np.minimum(rows, len(store) - 1)
+    found = store['movie_id'][rows] == movie_ids
+    if not found.any():
+        return []
+    rows, weights = rows[found], weights[found]
+    candidates = np.asarray(store['neighbors'][rows]).ravel()
+    scores = (np.asarray(store['scores'][rows]) * weights[:, None]).ravel()
+    keep = (candidates >= 0) & ~np.isin(candidates, seen)
+    candidates, scores = candidates[keep], scores[keep]
+    if not len(candidates):
+        return []
+    ids, inverse = np.unique(candidates, return_inverse=True)
+    totals = np.bincount(inverse, weights=scores)
+    best = np.argsort(-totals, kind='stable')[:limit]
+    return [int(i) for i in ids[best]]
+
+
+def user_history(user):
+    """The user's recent (movie_id, weight) interactions, most recent first."""
+    weights = {}
+    for movie_id in WatchedMovie.objects.filter(user=user).order_by('-watched_at') \
+            .values_list('movie_id', flat=True)[:HISTORY_LIMIT]:
+        weights[movie_id] = WATCH_WEIGHT
+    for movie_id, rating in Review.objects.filter(user=user).order_by('-updated_at') \
+            .values_list('movie_id', 'rating')[:HISTORY_LIMIT]:
+        weights[movie_id] = max(weights.get(movie_id, 0), rating / REVIEW_SCALE)
+    return list(weights.items())
+
+
+def recommended_for(user, limit=12):
+    """Recommended Movie objects for `user`, best first ([] if none)."""
+    if not available():
+        return []
+    history = user_history(user)
+    if not history:
+        return []
+    seen = set(WatchedMovie.objects.filter(user=user).values_list('movie_id', flat=True))
+    seen |= set(Review.objects.filter(user=user).values_list('movie_id', flat=True))
+    ids = recommend(history, limit, exclude=seen)
+    movies = Movie.objects.in_bulk(ids)
+    return [movies[i] for i in ids if i in movies]
@@ -0,0 +1,85 @@
+# movies/replies.py
+"""
+Chat reply strategies (CHAT_REPLY_MODE):
+
+- "template": a templated sentence built from the parsed filters and the
+  top results. No LLM call, so the chat costs at most one model round trip
+  (intent parsing) and often none.
+- "llm": the model writes the reply from a compact, token-budgeted
+  listing of the results.
+- "hybrid" (default): answer with the template instantly; the streaming
+  endpoint then asks the model for a richer reply and swaps it in as it
+  arrives, but only when a model slot is free, so enrichment never queues
+  behind (or adds to) real work.
+"""
+import zlib
+
+from django.conf import settings
+
+REPLY_MODES = ('template', 'llm', 'hybrid')
+CHARS_PER_TOKEN = 4  # rough estimate for English text
+
+
+def reply_mode():
+    mode = getattr(settings, 'CHAT_REPLY_MODE', 'hybrid')
+    return mode if mode in REPLY_MODES else 'hybrid'
+
+
+def describe_filters(filters):
+    """e.g. "comedy movies by Greta Gerwig from the 2010s rated 7+"."""
+    filters = filters or {}
+    words = []
+    if filters.get('genre'):
+        words.append(str(filters['genre']).lower())
+    words.append('movies')
+    if filters.get('director'):
+        words.append(f"by {filters['director']}")
+    if filters.get('year'):
+        words.append(f"from {filters['year']}")
+    elif filters.get('decade'):
+        words.append(f"from the {filters['decade']}s")
+    if filters.get('rating_gte'):
+        try:
+            words.append(f"rated {float(filters['rating_gte']):g}+")
+        except (TypeError, ValueError):
+            pass
+    return ' '.join(words)
+
+
+def template_reply(movies_list, filters=None):
+    """A friendly one- or two-sentence reply without calling the model."""
+    what = describe_filters(filters)
+    if not movies_list:
+        return f"Sorry, I couldn't find any {what} matching that. Try a different genre, director or year."
+
+    first = movies_list[0]
+    pick = f"{first['title']} ({first['year']})"
+    if len(movies_list) == 1:
+        return f"How about {pick}? It's directed by {first['director']}."
+
+    # Vary the wording a little, deterministically per result set
+    openers = [
+        f"I found some great {what} — {pick} is a good place to start.",
+        f"Here are a few {what} you might like, starting with {pick}.",
+        f"Good choice! {pick}, directed by {first['director']}, leads this list of {what}.",
+    ]
+    return openers[zlib.crc32(pick.encode()) % len(openers)]
+
+
+def compact_results(movies_list, token_budget=None):
+    """
+    The results as short numbered lines for the reply prompt, stopping at
+    roughly `token_budget` tokens (CHAT_REPLY_TOKEN_BUDGET). Much smaller
+    than a pretty-printed JSON dump of every field.
+    """
+    if token_budget is None:
+        token_budget = getattr(settings, 'CHAT_REPLY_TOKEN_BUDGET', 60)
+    budget = token_budget * CHARS_PER_TOKEN
+    lines = []
+    for i, m in enumerate(movies_list, start=1):
+        line = f"{i}. {m['title']} ({m['year']}), dir. {m['director']}, {m['rating']:.1f}/10"
+        if lines and sum(len(l) + 1 for l in lines) + len(line) > budget:
+            lines.append(f"(+{len(movies_list) - i + 1} more)")
+            break
+        lines.append(line)
+    return '\n'.join(lines)
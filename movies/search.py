@@ -0,0 +1,133 @@
+# movies/search.py
+"""
+Ranked full-text search over the movie catalog.
+
+On Postgres the query is matched against a GIN-indexed tsvector over
+title/director/description, with a pg_trgm index on title so typos and
+partial words still match. Local SQLite runs use an FTS5 table kept in sync
+by triggers. Any other backend falls back to plain icontains matching.
+
+The indexes, FTS table and triggers are created by migration 0005. SQLite
+drops the triggers whenever a migration rebuilds movies_movie, so such
+migrations must run the same statements again (as 0008 does).
+"""
+import re
+
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.fields import BooleanField
+
+# Must match the expression used by the GIN index in migration 0005,
+# otherwise Postgres will not use the index.
+PG_SEARCH_VECTOR = (
+    "to_tsvector('english', "
+    "coalesce(\"movies_movie\".\"title\", '') || ' ' || "
+    "coalesce(\"movies_movie\".\"director\", '') || ' ' || "
+    "coalesce(\"movies_movie\".\"description\", ''))"
+)
+
+SQLITE_FTS_TABLE = 'movies_movie_fts'
+# Local SQLite runs only rank (and return) the best N matches.
+SQLITE_MAX_RESULTS = 500
+
+_sqlite_fts_ready = None
+
+
+def search_movies(queryset, query):
+    """
+    Filter `queryset` down to movies matching `query` and annotate each
+    with a `search_rank` (higher is better). Callers decide the ordering.
+    """
+    query = (query or '').strip()
+    if not query:
+        return _no_results(queryset)
+
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        return _search_postgres(queryset, query)
+    if vendor == 'sqlite' and sqlite_fts_ready():
+        return _search_sqlite(queryset, query)
+    return _search_fallback(queryset, query)
+
+
+def _no_results(queryset):
+    # Still annotated, so callers can order by search_rank unconditionally
+    return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def _search_postgres(queryset, query):
+    tsquery = "websearch_to_tsquery('english', %s)"
+    matches = RawSQL(
+        f"({PG_SEARCH_VECTOR} @@ {tsquery} OR \"movies_movie\".\"title\" %% %s)",
+        [query, query],
+        output_field=BooleanField(),
+    )
+    # Full-text rank dominates; trigram similarity lifts near-miss titles.
+    rank = RawSQL(
+        f"ts_rank_cd({PG_SEARCH_VECTOR}, {tsquery}) + similarity(\"movies_movie\".\"title\", %s)",
+        [query, query],
+        output_field=FloatField(),
+    )
+    return queryset.filter(matches).annotate(search_rank=rank)
+
+
+def _fts5_query(query):
+    """Turn free text into a safe FTS5 MATCH expression (prefix match on every word)."""
+    words = re.findall(r'\w+', query, flags=re.UNICODE)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _search_sqlite(queryset, query):
+    match = _fts5_query(query)
+    if not match:
+        return _no_results(queryset)
+    # Rank inside FTS5 in a single pass (bm25() is lower-is-better; title hits
+    # weigh more than director/description), then carry the scores over to the
+    # ORM queryset for the best SQLITE_MAX_RESULTS matches.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, -bm25({SQLITE_FTS_TABLE}, 10.0, 4.0, 1.0) AS score "
+            f"FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s "
+            f"ORDER BY score DESC LIMIT %s",
+            [match, SQLITE_MAX_RESULTS],
+        )
+        scores = cursor.fetchall()
+    if not scores:
+        return _no_results(queryset)
+    rank = Case(
+        *[When(id=movie_id, then=Value(score)) for movie_id, score in scores],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    return queryset.filter(id__in=[movie_id for movie_id, _ in scores]).annotate(search_rank=rank)
+
+
+def _search_fallback(queryset, query):
+    matches = (
+        Q(title__icontains=query)
+        | Q(director__icontains=query)
+        | Q(description__icontains=query)
+    )
+    rank = Case(
+        When(title__iexact=query, then=Value(3.0)),
+        When(title__istartswith=query, then=Value(2.0)),
+        When(title__icontains=query, then=Value(1.5)),
+        When(director__icontains=query, then=Value(1.0)),
+        default=Value(0.5),
+        output_field=FloatField(),
+    )
+    return queryset.filter(matches).annotate(search_rank=rank)
+
+
+def sqlite_fts_ready():
+    """True when the FTS5 table and its sync triggers exist (checked once per process)."""
+    global _sqlite_fts_ready
+    if _sqlite_fts_ready is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE name IN (%s, %s)",
+                [SQLITE_FTS_TABLE, f'{SQLITE_FTS_TABLE}_au'],
+            )
+            _sqlite_fts_ready = cursor.fetchone()[0] == 2
+    return _sqlite_fts_ready
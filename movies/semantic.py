@@ -0,0 +1,315 @@
+# movies/semantic.py
+"""
+Semantic search over movie titles and descriptions.
+
+Every movie gets an embedding vector; all vectors live in one float32 file
+under SEMANTIC_INDEX_DIR that is memory-mapped, so searching 100k+ movies
+is a single NumPy matrix-vector product (cosine similarity on normalized
+vectors) plus a partial sort, without loading the file into Python objects.
+
+File layout: one row per movie, [id as two float32 words, vector...]. Rows
+are only ever appended (one write per batch), so new or edited movies are
+indexed incrementally; a movie indexed twice keeps its newest row.
+`build_embeddings` (re)builds the file, and movies saved through the ORM
+are appended automatically (see movies/signals.py). Appends and the swap
+at the end of a rebuild hold the same lock (an flock on LOCK_FILE where
+available), and rows appended while a rebuild ran are carried over into
+the new file.
+
+Embeddings come from SEMANTIC_EMBEDDER:
+- "hashing" (default): signed feature hashing of words and word pairs.
+  Needs no model and matches descriptions by shared vocabulary.
+- "ollama": SEMANTIC_EMBED_MODEL (e.g. nomic-embed-text) via Ollama, for
+  true semantic similarity.
+
+NumPy is optional; without it `available()` is False and callers use the
+regular full-text search.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Case, FloatField, Value, When
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; semantic search is disabled without it
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: the lock then only covers this process
+    fcntl = None
+
+VECTORS_FILE = 'vectors.f32'
+META_FILE = 'meta.json'
+LOCK_FILE = 'index.lock'
+ID_WORDS = 2  # an int64 movie id stored as two float32 words
+MAX_RESULTS = 500
+
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'his', 'her', 'their', 'from', 'into', 'that', 'this', 'who', 'when',
+    'are', 'was', 'has', 'have', 'but', 'not', 'all', 'they', 'them', 'its', 'after', 'about', 'movie',
+    'film', 'one', 'out', 'two', 'where', 'while', 'what', 'will', 'can', 'must', 'been', 'which',
+}
+_WORD = re.compile(r'[a-z0-9]+')
+
+_index = None
+_index_lock = threading.Lock()
+_write_lock = threading.Lock()
+_embedder = None
+
+
+def available():
+    return np is not None and (index_dir() / VECTORS_FILE).exists()
+
+
+def index_dir():
+    return Path(getattr(settings, 'SEMANTIC_INDEX_DIR', Path(settings.BASE_DIR) / '.cache' / 'embeddings'))
+
+
+def movie_text(movie):
+    return f"{movie.title}. {movie.description or ''}"
+
+
+def text_hash(text):
+    """Short digest of an indexed text, stored as Movie.semantic_hash."""
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+# --- Embedders ---
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embedding (no model, same in every process)."""
+    name = 'hashing'
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def _features(self, text):
+        words = [w.removesuffix('s') for w in _WORD.findall(text.lower()) if len(w) > 2 and w not in STOPWORDS]
+        return words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+
+    def embed(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode())
+                key = (h % self.dim, 1.0 if h & 0x80000000 else -1.0)
+                counts[key] = counts.get(key, 0) + 1
+            for (col, sign), n in counts.items():
+                out[row, col] += sign * (1 + math.log(n))
+        return _normalize(out)
+
+
+class OllamaEmbedder:
+    name = 'ollama'
+
+    def __init__(self, model):
+        import ollama
+
+        self.model = model
+        self.client = ollama.Client(host=getattr(settings, 'OLLAMA_HOST', None))
+        self.dim = None
+
+    def embed(self, texts):
+        response = self.client.embed(model=self.model, input=list(texts))
+        vectors = np.asarray(response['embeddings'], dtype=np.float32)
+        self.dim = vectors.shape[1]
+        return _normalize(vectors)
+
+
+def embedder():
+    global _embedder
+    if _embedder is None:
+        if getattr(settings, 'SEMANTIC_EMBEDDER', 'hashing') == 'ollama':
+            _embedder = OllamaEmbedder(getattr(settings, 'SEMANTIC_EMBED_MODEL', 'nomic-embed-text'))
+        else:
+            _embedder = HashingEmbedder(getattr(settings, 'SEMANTIC_DIM', 256))
+    return _embedder
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+# --- Writing ---
+
+def _rows(movie_ids, vectors):
+    rows = np.empty((len(movie_ids), ID_WORDS + vectors.shape[1]), dtype=np.float32)
+    rows[:, :ID_WORDS] = np.asarray(movie_ids, dtype=np.int64).view(np.float32).reshape(-1, ID_WORDS)
+    rows[:, ID_WORDS:] = vectors
+    return rows
+
+
+@contextmanager
+def locked(directory=None):
+    """Exclusive lock over the index files in `directory`, across threads and (with flock) processes."""
+    directory = Path(directory or index_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    with _write_lock, open(directory / LOCK_FILE, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)  # released when the file is closed
+        yield
+
+
+def append(movie_ids, texts, directory=None):
+    """Embed `texts` and append them to the index for `movie_ids`."""
+    if not movie_ids:
+        return
+    directory = Path(directory or index_dir())
+    vectors = embedder().embed(texts)
+    with locked(directory):
+        meta = read_meta(directory)
+        if meta and meta['dim'] != vectors.shape[1]:
+            raise ValueError(f"index has dim {meta['dim']}, embedder produced {vectors.shape[1]}; rebuild it")
+        with open(directory / VECTORS_FILE, 'ab') as f:
+            f.write(_rows(movie_ids, vectors).tobytes())  # one write per batch keeps rows whole
+
+
+def indexed_bytes():
+    """Current size of the live vectors file; a rebuild notes it before reading the movies."""
+    with locked():
+        try:
+            return os.stat(index_dir() / VECTORS_FILE).st_size
+        except FileNotFoundError:
+            return 0
+
+
+def replace_index(built, dim, since):
+    """
+    Make the vectors file `built` (rows of `dim`) the live index. Rows
+    appended to the live file past byte `since` were saved while it was
+    being built, so they are copied onto its end first. The vectors are
+    swapped in before the meta is written, both under the lock.
+    """
+    directory = index_dir()
+    live = directory / VECTORS_FILE
+    with locked():
+        if (read_meta(directory) or {}).get('dim') == dim and live.exists():
+            width = (ID_WORDS + dim) * 4
+            with open(live, 'rb') as src, open(built, 'ab') as dst:
+                src.seek(since)
+                tail = src.read()
+                dst.write(tail[:len(tail) // width * width])
+        os.replace(built, live)
+        write_meta(directory, dim)
+
+
+def write_meta(directory, dim):
+    meta = {'dim': dim, 'embedder': embedder().name}
+    tmp = Path(directory) / f'{META_FILE}.tmp'
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, Path(directory) / META_FILE)
+
+
+def read_meta(directory=None):
+    try:
+        return json.loads((Path(directory or index_dir()) / META_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+# --- Searching ---
+
+class SemanticIndex:
+    """A memory-mapped view of the vectors file, with the latest row per movie."""
+
+    def __init__(self, directory):
+        path = Path(directory) / VECTORS_FILE
+        meta = read_meta(directory)
+        self.dim = meta['dim']
+        self.stat = os.stat(path)
+        width = ID_WORDS + self.dim
+        count = self.stat.st_size // (width * 4)  # ignore a partially written tail
+        if count:
+            rows = np.memmap(path, dtype=np.float32, mode='r', shape=(count, width))
+            self.ids = np.ascontiguousarray(rows[:, :ID_WORDS]).view(np.int64).ravel()
+            self.vectors = rows[:, ID_WORDS:]  # strided view, still BLAS-friendly, no copy
+        else:
+            self.ids = np.zeros(0, dtype=np.int64)
+            self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+        # Only the newest row of a re-indexed movie counts
+        _, last_from_end = np.unique(self.ids[::-1], return_index=True)
+        self.stale = None
+        if len(last_from_end) < len(self.ids):
+            self.stale = np.ones(len(self.ids), dtype=bool)
+            self.stale[len(self.ids) - 1 - last_from_end] = False
+
+    def __len__(self):
+        return len(self.ids) if self.stale is None else int((~self.stale).sum())
+
+    def search(self, vector, k=10, among=None):
+        """Top-k (movie_id, cosine similarity) pairs, best first, optionally only of the ids `among`."""
+        if not len(self.ids):
+            return []
+        scores = self.vectors @ vector
+        if self.stale is not None:
+            scores[self.stale] = -np.inf
+        if among is not None:
+            scores[~np.isin(self.ids, among)] = -np.inf
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+def get_index():
+    """The shared index, reopened whenever the file has grown or been rebuilt."""
+    global _index
+    path = index_dir() / VECTORS_FILE
+    with _index_lock:
+        stat = os.stat(path)
+        if _index is None or (stat.st_size, stat.st_ino, stat.st_mtime_ns) != (
+            _index.stat.st_size, _index.stat.st_ino, _index.stat.st_mtime_ns
+        ):
+            with locked():  # never between a rebuild's vectors and its meta
+                _index = SemanticIndex(index_dir())
+        return _index
+
+
+def search(query, k=10, among=None):
+    return get_index().search(embedder().embed([query])[0], k, among)
+
+
+def semantic_search_movies(queryset, query):
+    """
+    Like movies.search.search_movies, but ranks by embedding similarity:
+    filters to the closest movies and annotates `search_rank`.
+
+    The closest movies overall are tried first. If other filters on
+    `queryset` rule all of them out, the ranking is redone over just the
+    movies `queryset` matches.
+    """
+    min_score = getattr(settings, 'SEMANTIC_MIN_SCORE', 0.05)
+    vector = embedder().embed([query])[0]
+    index = get_index()
+    hits = [(movie_id, score) for movie_id, score in index.search(vector, MAX_RESULTS) if score >= min_score]
+    if hits:
+        kept = set(queryset.filter(id__in=[movie_id for movie_id, _ in hits]).values_list('id', flat=True))
+        if kept:
+            hits = [(movie_id, score) for movie_id, score in hits if movie_id in kept]
+        else:
+            candidates = np.fromiter(queryset.order_by().values_list('id', flat=True).iterator(), dtype=np.int64)
+            hits = [
+                (movie_id, score) for movie_id, score in index.search(vector, MAX_RESULTS, among=candidates)
+                if score >= min_score
+            ]
+    if not hits:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+    rank = Case(
+        *[When(id=movie_id, then=Value(score)) for movie_id, score in hits],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    return queryset.filter(id__in=[movie_id for movie_id, _ in hits]).annotate(search_rank=rank)
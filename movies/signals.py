@@ -0,0 +1,104 @@
+# movies/signals.py
+import logging
+
+from django.db import transaction
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from movies import feed, friend_watches, popularity, ratings, semantic
+from movies.models import Movie, WatchedMovie
+from reviews.models import Review
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=WatchedMovie)
+def watched_movie_saved(sender, instance, created, **kwargs):
+    if created:
+        popularity.record_activity(instance.movie_id, popularity.WATCH_WEIGHT, instance.watched_at)
+        friend_watches.watched(instance.user_id, instance.movie_id)
+        feed.publish(instance)
+
+
+@receiver(post_delete, sender=WatchedMovie)
+def watched_movie_deleted(sender, instance, **kwargs):
+    popularity.record_activity(instance.movie_id, -popularity.WATCH_WEIGHT, instance.watched_at)
+    friend_watches.unwatched(instance.user_id, instance.movie_id)
+
+
+@receiver(m2m_changed, sender=get_user_model().friends.through)
+def friends_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Forward rows are (user, friend); from the reverse side `instance` is the friend
+    if action == 'pre_clear':
+        field = 'from_customuser_id' if reverse else 'to_customuser_id'
+        owner = 'to_customuser_id' if reverse else 'from_customuser_id'
+        instance._cleared_friends = set(sender.objects.filter(**{owner: instance.pk}).values_list(field, flat=True))
+        return
+    if action == 'post_clear':
+        action, pk_set = 'post_remove', getattr(instance, '_cleared_friends', set())
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    for module in (friend_watches, feed):
+        change = module.friends_added if action == 'post_add' else module.friends_removed
+        if reverse:
+            for user_id in pk_set:
+                change(user_id, [instance.pk])
+        else:
+            change(instance.pk, pk_set)
+
+
+@receiver(post_init, sender=Review)
+def review_loaded(sender, instance, **kwargs):
+    # Remember what the row held so an edit can be applied as a delta.
+    # Read __dict__ directly so deferred fields are not fetched one by one.
+    values = instance.__dict__
+    if instance.pk and 'rating' in values and 'movie_id' in values:
+        instance._stored_rating = (values['movie_id'], values['rating'])
+    else:
+        instance._stored_rating = None
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    stored = getattr(instance, '_stored_rating', None)
+    if created:
+        ratings.review_added(instance.movie_id, instance.rating)
+    elif stored is not None:
+        ratings.review_changed(stored[0], stored[1], instance.movie_id, instance.rating)
+    instance._stored_rating = (instance.movie_id, instance.rating)
+
+    if created:
+        popularity.record_activity(instance.movie_id, popularity.REVIEW_WEIGHT, instance.date)
+        feed.publish(instance)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    stored = getattr(instance, '_stored_rating', None) or (instance.movie_id, instance.rating)
+    ratings.review_removed(*stored)
+    popularity.record_activity(instance.movie_id, -popularity.REVIEW_WEIGHT, instance.date)
+
+
+@receiver(post_save, sender=Movie)
+def movie_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Append new or re-described movies to the semantic index, once committed.
+    # Saves that leave the text alone (including deferred loads, which Django
+    # saves with update_fields) skip it; otherwise the stored hash decides.
+    if not semantic.available():
+        return
+    if not created and update_fields is not None and not {'title', 'description'} & set(update_fields):
+        return
+    movie_id, body = instance.pk, semantic.movie_text(instance)
+    digest = semantic.text_hash(body)
+    if not Movie.objects.filter(pk=movie_id).exclude(semantic_hash=digest).update(semantic_hash=digest):
+        return
+    instance.semantic_hash = digest
+
+    def index():
+        try:
+            semantic.append([movie_id], [body])
+        except Exception as e:
+            logger.warning('Semantic index append failed for movie %s: %s', movie_id, e)
+
+    transaction.on_commit(index)
@@ -1,3 +1,465 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import time
+import unittest
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Avg, Count
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from movies import feed, friend_watches, recommendations, semantic
+from movies.management.commands.import_movies import Command as ImportMoviesCommand
+from movies.models import FeedEntry, FriendWatchCount, Movie, WatchedMovie
+from movies.pagination import InvalidCursor, encode_cursor, paginate_keyset
+from reviews.models import Review
+
+TITLE_KEYS = [('title', False), ('id', False)]
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Only six distinct titles and years, so most pages split runs of equal sort keys
+        Movie.objects.bulk_create([
+            Movie(title=f'Title {i % 6}', year=1990 + i % 6, director='Someone', description='')
+            for i in range(60)
+        ])
+        cls.by_title = list(Movie.objects.order_by('title', 'id').values_list('id', flat=True))
+
+    def _walk_forward(self, per_page):
+        pages, cursor = [], None
+        while True:
+            page = paginate_keyset(Movie.objects.all(), TITLE_KEYS, cursor, per_page=per_page)
+            pages.append([m.id for m in page])
+            if not page.has_next():
+                return pages, page
+            cursor = page.next_cursor
+
+    def test_next_visits_every_row_once_in_order(self):
+        pages, _ = self._walk_forward(per_page=7)
+        self.assertEqual([pk for page in pages for pk in page], self.by_title)
+        self.assertEqual(len(pages), 9)
+
+    def test_prev_walks_back_over_the_same_pages(self):
+        pages, page = self._walk_forward(per_page=7)
+        back = [[m.id for m in page]]
+        while page.has_previous():
+            page = paginate_keyset(Movie.objects.all(), TITLE_KEYS, page.previous_cursor, per_page=7)
+            back.append([m.id for m in page])
+        self.assertEqual(back[::-1], pages)
+
+    def test_first_page_has_no_previous(self):
+        page = paginate_keyset(Movie.objects.all(), TITLE_KEYS, per_page=7)
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_ties_on_sort_key_are_broken_by_id(self):
+        # Ten movies share each title; a page boundary inside a run must not skip or repeat any
+        first = paginate_keyset(Movie.objects.all(), TITLE_KEYS, per_page=4)
+        second = paginate_keyset(Movie.objects.all(), TITLE_KEYS, first.next_cursor, per_page=4)
+        self.assertEqual([m.id for m in first] + [m.id for m in second], self.by_title[:8])
+        self.assertEqual({m.title for m in list(first) + list(second)}, {'Title 0'})
+
+    def test_malformed_cursors_are_rejected(self):
+        for cursor in ('garbage', encode_cursor(['Title 0'], 'next'), encode_cursor(['Title 0', 1], 'sideways')):
+            with self.assertRaises(InvalidCursor):
+                paginate_keyset(Movie.objects.all(), TITLE_KEYS, cursor)
+
+    def test_views_return_400_for_bad_cursor(self):
+        self.assertEqual(self.client.get(reverse('movies:movies_all'), {'cursor': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('movies:movies_all_api'), {'cursor': 'garbage'}).status_code, 400)
+
+    def test_api_pages_visit_every_row_once(self):
+        seen, cursor = [], None
+        while True:
+            params = {'sort': 'year', **({'cursor': cursor} if cursor else {})}
+            data = self.client.get(reverse('movies:movies_all_api'), params).json()
+            seen += [row['id'] for row in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, list(Movie.objects.order_by('year', 'id').values_list('id', flat=True)))
+
+
+class RatingCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = [User.objects.create(username=f'user{i}') for i in range(3)]
+        cls.movie = Movie.objects.create(title='Rated', year=2000, director='Someone', description='')
+        cls.other = Movie.objects.create(title='Other', year=2001, director='Someone', description='')
+
+    def _review(self, user, rating, movie=None):
+        return Review.objects.create(user=user, movie=movie or self.movie, text='', rating=rating)
+
+    def assertCountersMatch(self, movie):
+        movie.refresh_from_db()
+        fresh = Review.objects.filter(movie=movie).aggregate(avg=Avg('rating'), count=Count('id'))
+        self.assertEqual(movie.rating_count, fresh['count'])
+        self.assertAlmostEqual(movie.rating, fresh['avg'] or 0.0)
+
+    def test_create(self):
+        self._review(self.users[0], 7)
+        self._review(self.users[1], 4)
+        self.assertCountersMatch(self.movie)
+        self.assertEqual(self.movie.rating_sum, 11)
+
+    def test_edit(self):
+        review = self._review(self.users[0], 7)
+        self._review(self.users[1], 4)
+        review.rating = 10
+        review.save()
+        self.assertCountersMatch(self.movie)
+        # Edits of a reloaded (and partially deferred) review apply the stored rating too
+        review = Review.objects.only('id', 'rating', 'movie_id').get(pk=review.pk)
+        review.rating = 1
+        review.save()
+        self.assertCountersMatch(self.movie)
+
+    def test_edit_moving_review_to_another_movie(self):
+        review = self._review(self.users[0], 8)
+        review.movie = self.other
+        review.save()
+        self.assertCountersMatch(self.movie)
+        self.assertCountersMatch(self.other)
+
+    def test_delete(self):
+        self._review(self.users[0], 9)
+        review = self._review(self.users[1], 2)
+        Review.objects.get(pk=review.pk).delete()
+        self.assertCountersMatch(self.movie)
+
+    def test_deleting_last_review_resets_to_zero(self):
+        review = self._review(self.users[0], 6)
+        review.delete()
+        self.assertCountersMatch(self.movie)
+        self.assertEqual((self.movie.rating, self.movie.rating_count, self.movie.rating_sum), (0.0, 0, 0))
+
+    def test_queryset_delete(self):
+        for user, rating in zip(self.users, (3, 5, 10)):
+            self._review(user, rating)
+        Review.objects.filter(rating__gt=4).delete()
+        self.assertCountersMatch(self.movie)
+
+
+class RecalculateSinceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username='critic')
+        cls.movies = [
+            Movie.objects.create(title=f'Movie {i}', year=2000, director='Someone', description='')
+            for i in range(3)
+        ]
+
+    def _recalculate(self, since):
+        out = StringIO()
+        call_command('recalculate_movie_ratings', bulk=True, since=since, stdout=out)
+        return int(out.getvalue().split('Recalculating ratings for ')[1].split()[0])
+
+    def test_auto_picks_up_only_bulk_updates(self):
+        reviews = [Review.objects.create(user=self.user, movie=movie, text='', rating=5) for movie in self.movies]
+        reviews[1].rating = 9
+        reviews[1].save()
+        reviews[2].delete()
+        # Saves and deletes already applied their deltas to the counters
+        self.assertEqual(self._recalculate('auto'), 0)
+
+        Review.objects.filter(pk=reviews[0].pk).update(rating=1)
+        self.assertEqual(self._recalculate('auto'), 1)
+        self.movies[0].refresh_from_db()
+        self.assertEqual((self.movies[0].rating, self.movies[0].rating_count), (1.0, 1))
+        self.assertEqual(self._recalculate('auto'), 0)
+
+    def test_bulk_move_to_another_movie_marks_both(self):
+        review = Review.objects.create(user=self.user, movie=self.movies[0], text='', rating=7)
+        Review.objects.filter(pk=review.pk).update(movie=self.movies[1])
+        self.assertEqual(self._recalculate('auto'), 2)
+        for movie, count in zip(self.movies, (0, 1, 0)):
+            movie.refresh_from_db()
+            self.assertEqual(movie.rating_count, count)
+
+    def test_datetime_picks_up_saves_deletes_and_bulk_updates(self):
+        review = Review.objects.create(user=self.user, movie=self.movies[0], text='', rating=4)
+        gone = Review.objects.create(user=self.user, movie=self.movies[1], text='', rating=4)
+        cutoff = timezone.now()
+        self.assertEqual(self._recalculate(cutoff.isoformat()), 0)
+        review.rating = 6
+        review.save()
+        gone.delete()
+        Review.objects.create(user=self.user, movie=self.movies[2], text='', rating=2)
+        self.assertEqual(self._recalculate(cutoff.isoformat()), 3)
+
+
+class FriendWatchCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.ann, cls.bob, cls.cat, cls.dan = (User.objects.create(username=name) for name in ('ann', 'bob', 'cat', 'dan'))
+        cls.movies = [
+            Movie.objects.create(title=f'Movie {i}', year=2000, director='Someone', description='')
+            for i in range(4)
+        ]
+
+    def _befriend(self, a, b):
+        a.friends.add(b)
+        b.friends.add(a)
+
+    def _unfriend(self, a, b):
+        a.friends.remove(b)
+        b.friends.remove(a)
+
+    def assertMatchesRebuild(self):
+        incremental = set(FriendWatchCount.objects.values_list('user_id', 'movie_id', 'count'))
+        call_command('rebuild_friend_watches', stdout=StringIO())
+        rebuilt = set(FriendWatchCount.objects.values_list('user_id', 'movie_id', 'count'))
+        self.assertEqual(incremental, rebuilt)
+        return incremental
+
+    def test_watch_and_unwatch(self):
+        self._befriend(self.ann, self.bob)
+        self._befriend(self.ann, self.cat)
+        WatchedMovie.objects.create(user=self.bob, movie=self.movies[0])
+        WatchedMovie.objects.create(user=self.cat, movie=self.movies[0])
+        WatchedMovie.objects.create(user=self.ann, movie=self.movies[1])
+        self.assertIn((self.ann.id, self.movies[0].id, 2), self.assertMatchesRebuild())
+
+        WatchedMovie.objects.get(user=self.bob, movie=self.movies[0]).delete()
+        self.assertIn((self.ann.id, self.movies[0].id, 1), self.assertMatchesRebuild())
+        WatchedMovie.objects.filter(movie=self.movies[0]).delete()
+        self.assertFalse(FriendWatchCount.objects.filter(movie=self.movies[0]).exists())
+        self.assertMatchesRebuild()
+
+    def test_friend_add_and_unfriend(self):
+        for user in (self.bob, self.cat):
+            for movie in self.movies[:3]:
+                WatchedMovie.objects.create(user=user, movie=movie)
+        self._befriend(self.ann, self.bob)
+        self._befriend(self.ann, self.cat)
+        self._befriend(self.bob, self.dan)
+        self.assertMatchesRebuild()
+
+        self._unfriend(self.ann, self.bob)
+        self.assertEqual(set(FriendWatchCount.objects.filter(user=self.ann).values_list('count', flat=True)), {1})
+        self.assertMatchesRebuild()
+        self.ann.friends.clear()
+        self.assertFalse(FriendWatchCount.objects.filter(user=self.ann).exists())
+        self.assertMatchesRebuild()
+
+    def test_decrement_of_drifted_row_stops_at_zero(self):
+        self._befriend(self.ann, self.bob)
+        WatchedMovie.objects.create(user=self.bob, movie=self.movies[0])
+        FriendWatchCount.objects.filter(user=self.ann).delete()  # drift: the row went missing
+        FriendWatchCount.objects.create(user=self.ann, movie=self.movies[1], count=0)
+        WatchedMovie.objects.get(user=self.bob, movie=self.movies[0]).delete()
+        friend_watches.unwatched(self.bob.id, self.movies[1].id)
+        self.assertFalse(FriendWatchCount.objects.filter(user=self.ann).exists())
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.ann, cls.bob, cls.cat, cls.hub = (User.objects.create(username=name) for name in ('ann', 'bob', 'cat', 'hub'))
+        cls.movies = [
+            Movie.objects.create(title=f'Movie {i}', year=2000, director='Someone', description='')
+            for i in range(8)
+        ]
+
+    def setUp(self):
+        # feed.PULLED_KEY and friend caches must not leak in from other tests
+        cache.clear()
+
+    def _befriend(self, a, b):
+        a.friends.add(b)
+        b.friends.add(a)
+
+    def _feed(self, user):
+        return list(feed.feed_for(user).order_by('-created_at', '-id').values_list('actor_id', 'movie_id'))
+
+    def test_watch_and_review_fan_out_to_friends(self):
+        self._befriend(self.ann, self.bob)
+        self._befriend(self.cat, self.bob)
+        WatchedMovie.objects.create(user=self.bob, movie=self.movies[0])
+        review = Review.objects.create(user=self.bob, movie=self.movies[1], text='', rating=8)
+        for reader in (self.ann, self.cat):
+            entries = FeedEntry.objects.filter(owner=reader)
+            self.assertEqual(set(entries.values_list('actor_id', 'movie_id')),
+                             {(self.bob.id, self.movies[0].id), (self.bob.id, self.movies[1].id)})
+            self.assertEqual(entries.get(review__isnull=False).review_id, review.id)
+        self.assertFalse(FeedEntry.objects.filter(owner=self.bob).exists())
+
+    def test_unfriend_removes_their_entries(self):
+        self._befriend(self.ann, self.bob)
+        self._befriend(self.ann, self.cat)
+        WatchedMovie.objects.create(user=self.bob, movie=self.movies[0])
+        WatchedMovie.objects.create(user=self.cat, movie=self.movies[1])
+        self.ann.friends.remove(self.bob)
+        self.assertEqual(self._feed(self.ann), [(self.cat.id, self.movies[1].id)])
+
+    def test_friend_add_backfills_recent_activity(self):
+        WatchedMovie.objects.create(user=self.bob, movie=self.movies[0])
+        Review.objects.create(user=self.bob, movie=self.movies[1], text='', rating=6)
+        self.ann.friends.add(self.bob)
+        self.assertEqual(set(self._feed(self.ann)), {(self.bob.id, self.movies[0].id), (self.bob.id, self.movies[1].id)})
+
+    @override_settings(FEED_FANOUT_LIMIT=2)
+    def test_high_fanout_users_are_pulled_on_read(self):
+        for reader in (self.ann, self.bob, self.cat):
+            reader.friends.add(self.hub)
+        cache.delete(feed.HIGH_FANOUT_KEY)
+        WatchedMovie.objects.create(user=self.hub, movie=self.movies[0])
+        self.assertFalse(FeedEntry.objects.filter(actor=self.hub).exists())  # not fanned out
+        self.assertEqual(self._feed(self.ann), [(self.hub.id, self.movies[0].id)])
+
+        # Reads within FEED_PULL_INTERVAL do not pull again
+        WatchedMovie.objects.create(user=self.hub, movie=self.movies[1])
+        self.assertEqual(len(self._feed(self.ann)), 1)
+        cache.delete(feed.PULLED_KEY.format(self.ann.pk))
+        self.assertEqual(len(self._feed(self.ann)), 2)
+
+    @override_settings(FEED_MAX_ENTRIES=3, FEED_TRIM_SLACK=2)
+    def test_feeds_are_trimmed_once_past_the_slack(self):
+        self._befriend(self.ann, self.bob)
+        for movie in self.movies[:6]:
+            WatchedMovie.objects.create(user=self.bob, movie=movie)
+            self.assertLessEqual(FeedEntry.objects.filter(owner=self.ann).count(), 5)
+        # The sixth entry passed 3 + 2, so the feed was cut back to the newest 3
+        self.assertEqual([movie_id for _, movie_id in self._feed(self.ann)],
+                         [movie.id for movie in self.movies[5:2:-1]])
+
+
+class ImportMoviesTests(TestCase):
+    ROWS = [
+        {'title': 'Silent One', 'year': 1999, 'director': '', 'description': '', 'genres': ['Drama']},
+        {'title': 'Talkie', 'year': 2001, 'director': 'Someone', 'overview': 'Words.', 'genres': [{'name': 'Comedy'}]},
+    ]
+
+    def _dump(self, rows):
+        f = tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False, encoding='utf-8')
+        with f:
+            f.write('\n'.join(json.dumps(row) for row in rows))
+        self.addCleanup(os.unlink, f.name)
+        return f.name
+
+    def assertImported(self):
+        silent = Movie.objects.get(title='Silent One', year=1999)
+        self.assertEqual((silent.director, silent.description), ('Unknown', ''))
+        self.assertEqual(list(silent.genres.values_list('name', flat=True)), ['Drama'])
+        talkie = Movie.objects.get(title='Talkie', year=2001)
+        self.assertEqual(talkie.description, 'Words.')
+        self.assertEqual(list(talkie.genres.values_list('name', flat=True)), ['Comedy'])
+
+    def test_import_with_empty_description(self):
+        call_command('import_movies', self._dump(self.ROWS), stdout=StringIO())
+        self.assertImported()
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'COPY is Postgres only')
+    def test_copy_path_inserts_and_updates(self):
+        command = ImportMoviesCommand(stdout=StringIO())
+        command.skipped = 0
+        rows = [command._normalize(row) for row in self.ROWS]
+        with transaction.atomic():
+            command._upsert_copy(rows)
+        self.assertImported()
+        rows[1]['description'] = ''
+        with transaction.atomic():
+            command._upsert_copy(rows)
+        self.assertEqual(Movie.objects.get(title='Talkie').description, '')
+        self.assertEqual(Movie.objects.filter(title__in=['Silent One', 'Talkie']).count(), 2)
+
+
+@unittest.skipIf(semantic.np is None, 'NumPy is not installed')
+class SemanticSearchTests(TestCase):
+    query = 'astronauts drift through deep space on a broken station'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(SEMANTIC_INDEX_DIR=directory.name, SEMANTIC_EMBEDDER='hashing')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for i in range(3):
+            Movie.objects.create(title=f'Space {i}', year=2000 + i, director='Someone',
+                                 description='Astronauts drift through deep space on a broken station.')
+        self.old = Movie.objects.create(title='Old space', year=1950, director='Someone',
+                                        description='A rocket leaves for space.')
+        Movie.objects.create(title='Cooking', year=1950, director='Someone', description='A chef bakes bread.')
+        call_command('build_embeddings', rebuild=True, stdout=StringIO())
+
+    def test_ranks_within_filtered_movies_when_top_hits_are_filtered_out(self):
+        with mock.patch.object(semantic, 'MAX_RESULTS', 2):
+            found = semantic.semantic_search_movies(Movie.objects.filter(year=1950), self.query)
+            self.assertEqual([m.id for m in found], [self.old.id])
+            found = semantic.semantic_search_movies(Movie.objects.all(), self.query)
+            self.assertEqual(len(found), 2)
+            self.assertNotIn(self.old.id, [m.id for m in found])
+
+    def test_rebuild_leaves_only_index_files(self):
+        self.assertEqual(sorted(os.listdir(semantic.index_dir())),
+                         sorted([semantic.LOCK_FILE, semantic.META_FILE, semantic.VECTORS_FILE]))
+
+
+def _neighbor_scores(store):
+    """{movie id: {neighbour id: score}} of a recommendations store."""
+    return {
+        int(row['movie_id']): {int(n): round(float(v), 5) for n, v in zip(row['neighbors'], row['scores']) if n >= 0}
+        for row in store
+    }
+
+
+@unittest.skipIf(recommendations.np is None, 'NumPy is not installed')
+class RecommendationsUpdateTests(TestCase):
+    def test_update_from_touched_interactions_matches_train(self):
+        np = recommendations.np
+        rng = np.random.default_rng(7)
+        # Two groups of users and movies that never meet, and new interactions in the first
+        users = rng.integers(0, 30, 200)
+        old = np.column_stack([users, users // 15 * 10 + rng.integers(0, 10, 200), rng.integers(1, 11, 200)])
+        new = np.array([[3, 4, 10], [40, 4, 7], [40, 21, 5], [7, 21, 9], [8, 2, 2]])
+        both = np.concatenate([old, new])
+        full = recommendations.Interactions(both[:, 0], both[:, 1], both[:, 2] / recommendations.REVIEW_SCALE)
+        k = full.n_items  # no neighbour slot is ever lost
+
+        store = recommendations.train(
+            recommendations.Interactions(old[:, 0], old[:, 1], old[:, 2] / recommendations.REVIEW_SCALE), k)
+        changed = np.unique(new[:, 1])
+        users = np.unique(both[np.isin(both[:, 1], changed), 0])
+        touched = both[np.isin(both[:, 1], both[np.isin(both[:, 0], users), 1])]
+        self.assertLess(len(touched), len(both))
+        m = recommendations.Interactions(touched[:, 0], touched[:, 1], touched[:, 2] / recommendations.REVIEW_SCALE)
+
+        self.assertEqual(_neighbor_scores(recommendations.update(store, m, changed)),
+                         _neighbor_scores(recommendations.train(full, k)))
+
+    def test_refresh_matches_full_build(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        User = get_user_model()
+        users = [User.objects.create(username=f'user{i}') for i in range(6)]
+        movies = [
+            Movie.objects.create(title=f'Movie {i}', year=2000, director='Someone', description='')
+            for i in range(8)
+        ]
+        for user, movie in [(0, 0), (0, 1), (1, 1), (1, 2), (2, 2), (2, 3), (3, 6), (4, 6), (4, 7)]:
+            WatchedMovie.objects.create(user=users[user], movie=movies[movie])
+        Review.objects.create(user=users[0], movie=movies[2], text='', rating=9)
+
+        with override_settings(RECOMMENDATIONS_DIR=directory.name, RECOMMEND_NEIGHBORS=8):
+            recommendations.build()
+            since = time.time()
+            WatchedMovie.objects.create(user=users[5], movie=movies[0])
+            WatchedMovie.objects.create(user=users[5], movie=movies[4])
+            Review.objects.create(user=users[1], movie=movies[0], text='', rating=3)
+            store, changed = recommendations.refresh(since)
+            expected = recommendations.train(recommendations.load_interactions())
+
+        self.assertEqual(changed, [movies[0].id, movies[4].id])
+        self.assertEqual(_neighbor_scores(store), _neighbor_scores(expected))
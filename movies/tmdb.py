@@ -0,0 +1,163 @@
+# movies/tmdb.py
+"""
+Small TMDb API client shared by the ingestion commands.
+
+- one pooled requests.Session (safe to share between worker threads)
+- a global rate limiter so a thread pool cannot exceed TMDb's request budget
+- an on-disk JSON cache, so re-running a seed costs no network at all
+- configurable base URL, so commands can be pointed at a local stub server
+  (see the `tmdb_stub_server` command) and benchmarked offline
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+DEFAULT_API_BASE = 'https://api.themoviedb.org/3'
+
+
+class TMDbError(Exception):
+    pass
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ResponseCache:
+    """One JSON file per (base URL, path, params) request, sharded by hash prefix."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return self.directory / digest[:2] / f'{digest}.json'
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, data):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)  # atomic, so concurrent readers never see half a file
+
+
+class TMDbClient:
+    def __init__(self, api_key=None, base_url=None, cache_dir=None, rate=40, timeout=10,
+                 max_retries=3, pool_size=16, refresh_cache=False):
+        self.api_key = api_key if api_key is not None else getattr(settings, 'TMDB_API_KEY', None)
+        self.base_url = (base_url or getattr(settings, 'TMDB_API_BASE', DEFAULT_API_BASE)).rstrip('/')
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.refresh_cache = refresh_cache
+        self.limiter = RateLimiter(rate)
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'cache_hits': 0, 'retries': 0}
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def get(self, path, **params):
+        """GET `path` (e.g. '/movie/550/credits') and return the decoded JSON."""
+        # Keyed on the host too, so a stub server's answers never stand in for TMDb's
+        cache_key = f"{self.base_url}{path}?{json.dumps(params, sort_keys=True)}"
+        if self.cache and not self.refresh_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self._count('cache_hits')
+                return cached
+
+        query = dict(params)
+        if self.api_key:
+            query['api_key'] = self.api_key
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.wait()
+            self._count('requests')
+            try:
+                response = self.session.get(f'{self.base_url}{path}', params=query, timeout=self.timeout)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise TMDbError(f'{path}: {e}') from e
+                self._count('retries')
+                time.sleep(0.5 * 2 ** attempt)
+                continue
+
+            if response.status_code == 429 or response.status_code >= 500:
+                if attempt == self.max_retries:
+                    raise TMDbError(f'{path}: HTTP {response.status_code}')
+                self._count('retries')
+                retry_after = response.headers.get('Retry-After', '')
+                time.sleep(float(retry_after) if retry_after.isdigit() else 0.5 * 2 ** attempt)
+                continue
+            if response.status_code >= 400:
+                raise TMDbError(f'{path}: HTTP {response.status_code}')
+
+            try:
+                data = response.json()
+            except ValueError as e:
+                raise TMDbError(f'{path}: invalid JSON ({e})') from e
+            if self.cache:
+                self.cache.set(cache_key, data)
+            return data
+
+    # --- Endpoints used by FilmMate ---
+
+    def movie_genres(self):
+        return self.get('/genre/movie/list').get('genres', [])
+
+    def popular_movies(self, page=1):
+        return self.get('/movie/popular', page=page).get('results', [])
+
+    def credits(self, movie_id):
+        return self.get(f'/movie/{movie_id}/credits')
+
+    def search_movie(self, title, year=None):
+        params = {'query': title}
+        if year:
+            params['year'] = year
+        return self.get('/search/movie', **params).get('results', [])
+
+
+def director_from_credits(credits):
+    for member in credits.get('crew', []):
+        if member.get('job') == 'Director':
+            return member.get('name') or 'Unknown'
+    return 'Unknown'
@@ -6,11 +6,16 @@ app_name = 'movies'
 urlpatterns = [
     path('', views.movie_home, name='home'),      
     path('friends-activity/', views.friends_activity, name='friends_activity'),
+    path('friends-activity/api/', views.friends_activity_api, name='friends_activity_api'),
     path('list/', views.movie_list, name='movie_list'), 
     path('search/', views.movie_search, name='movie_search'), 
     path('<int:pk>/', views.movie_detail, name='movie_detail'),
     path('all/', views.movies_all, name='movies_all'),
+    path('all/api/', views.movies_all_api, name='movies_all_api'),
     path('movie/<int:movie_id>/watched/', views.toggle_watched, name='toggle_watched'),
     path("my-films/", views.my_films, name="my_films"),
     path('chat/api/', views.chat_api, name='chat_api'),
+    path('chat/stream/', views.chat_stream, name='chat_stream'),
+    path('internal/metrics/', views.metrics_view, name='metrics'),
+    path('posters/<int:movie_id>/<str:size>/<str:version>.jpg', views.poster, name='poster'),
 ]
@@ -1,30 +1,54 @@
-import json, re
-
-import ollama
-
-from django.core.paginator import Paginator
-from django.db.models import Avg
-from django.http import JsonResponse, HttpResponseBadRequest
+import json, logging, re
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import (
+    FileResponse, Http404, HttpResponseBadRequest, HttpResponseNotModified, JsonResponse, StreamingHttpResponse,
+)
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import reverse
 from django.views.decorators.http import require_POST
 
+from movies import feed, friend_watches, intent_cache, llm, metrics, recommendations, semantic
+from movies.filters import BEST_FIRST, apply_filters, filters_from_params
+from movies.intent_parser import parse_intent
 from movies.models import WatchedMovie, Movie 
+from movies.pagination import InvalidCursor, paginate_keyset
+from movies.popularity import top_movies
+from movies.posters import (
+    cached_variant, is_proxyable, poster_sizes, poster_version, proxied_poster_url,
+)
+from movies.replies import compact_results, reply_mode, template_reply
+from movies.search import search_movies
 from genres.models import Genre
 from lists.models import List
 from reviews.forms import ReviewForm
 from users.models import FriendRequest
 
+logger = logging.getLogger(__name__)
+
 
 
 def movie_home(request):
     """Homepage showing popular films and recent friend activity."""
-    popular_films = Movie.objects.all()[7:14]
+    # Precomputed, time-decayed ranking (see movies/popularity.py)
+    popular_films = top_movies(7)
+    if not popular_films:
+        # No activity recorded yet: fall back to the best-rated films
+        popular_films = Movie.objects.order_by('-rating', '-year')[:7]
     friend_activities = []
+    recommended = []
+    popular_with_friends = []
 
     pending_requests = []
     if request.user.is_authenticated:
+        # Precomputed item-item neighbours; empty until build_recommendations has run
+        recommended = recommendations.recommended_for(request.user, 12)
+        # Precomputed per-user counts; one query for the whole rail
+        popular_with_friends = friend_watches.popular_among_friends(request.user, 12)
+
         # Friend requests
         pending_requests = (
             FriendRequest.objects.filter(to_user=request.user)
@@ -33,36 +57,64 @@ def movie_home(request):
         )
 
         # ✅ NEW FROM FRIENDS
-        friends = request.user.friends.all()
-
-        # Get up to 7 most recent movies watched by friends
-        friend_activities = (
-            WatchedMovie.objects.filter(user__in=friends)
-            .select_related('user', 'movie')
-            .order_by('-watched_at')[:7]
-        )
+        # Up to 7 most recent friend watches/reviews, from the materialized feed
+        friend_activities = feed.feed_for(request.user).order_by('-created_at', '-id')[:7]
 
     context = {
         'popular_films': popular_films,
+        'recommended': recommended,
+        'popular_with_friends': popular_with_friends,
         'friend_activities': friend_activities,
         'pending_requests': pending_requests,
     }
     return render(request, 'movies/home.html', context)
 
+FRIENDS_ACTIVITY_KEYS = [('created_at', True), ('id', True)]
+
+
+def _friends_activity_page(request):
+    # One range scan of the user's materialized feed (see movies/feed.py)
+    return paginate_keyset(feed.feed_for(request.user), FRIENDS_ACTIVITY_KEYS,
+                           request.GET.get('cursor'), per_page=20)
+
+
 @login_required
 def friends_activity(request):
-    friends = request.user.friends.all()
-    activities = (
-        WatchedMovie.objects.filter(user__in=friends)
-        .select_related('user', 'movie')
-        .order_by('-watched_at')
-    )
-    paginator = Paginator(activities, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    try:
+        page_obj = _friends_activity_page(request)
+    except InvalidCursor:
+        return HttpResponseBadRequest('Invalid cursor')
 
     return render(request, 'movies/friends_activity.html', {'page_obj': page_obj})
 
+
+@login_required
+def friends_activity_api(request):
+    """JSON variant of friends_activity, paged with the same opaque cursors."""
+    try:
+        page_obj = _friends_activity_page(request)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    results = [{
+        'id': activity.id,
+        'action': activity.action,
+        'user': {'id': activity.actor.id, 'username': activity.actor.username},
+        'movie': {
+            'id': activity.movie.id,
+            'title': activity.movie.title,
+            'poster_url': activity.movie.poster or '',
+            'detail_url': reverse('movies:movie_detail', args=[activity.movie.id]),
+        },
+        'rating': activity.review.rating if activity.review_id else None,
+        'created_at': activity.created_at.isoformat(),
+    } for activity in page_obj]
+    return JsonResponse({
+        'results': results,
+        'next_cursor': page_obj.next_cursor,
+        'previous_cursor': page_obj.previous_cursor,
+    })
+
 def movie_list(request):
     movies = Movie.objects.all()
     context = {
@@ -73,7 +125,10 @@ def movie_list(request):
 def movie_search(request):
     query = request.GET.get('q', '').strip()
     if query:
-        results = Movie.objects.filter(title__icontains=query)
+        results = search_movies(Movie.objects.all(), query).order_by('-search_rank', 'title')[:50]
+        if not results and semantic.available():
+            # Nothing matched the words themselves; try descriptions by meaning
+            results = semantic.semantic_search_movies(Movie.objects.all(), query).order_by('-search_rank')[:50]
     else:
         results = Movie.objects.none() 
 
@@ -98,6 +153,8 @@ def movie_detail(request, pk):
 
     # Check if the movie is already watched
     watched = WatchedMovie.objects.filter(user=request.user, movie=movie).exists()
+    # Precomputed count, one indexed lookup (see movies/friend_watches.py)
+    friends_watched = friend_watches.count_for(request.user, movie)
 
     form = ReviewForm()
 
@@ -126,13 +183,9 @@ def movie_detail(request, pk):
                 review = form.save(commit=False)
                 review.user = request.user
                 review.movie = movie
+                # Saving updates the movie's rating counters (movies/signals.py)
                 review.save()
 
-                # Recalculate and update the movie's average rating
-                avg_rating = movie.review_set.aggregate(Avg("rating"))["rating__avg"] or 0
-                movie.rating = round(avg_rating, 1)
-                movie.save(update_fields=["rating"])
-
                 return redirect('movies:movie_detail', pk=pk)
 
     context = {
@@ -140,6 +193,7 @@ def movie_detail(request, pk):
         'reviews': reviews,
         'in_watchlist': in_watchlist,
         'watched': watched,
+        'friends_watched': friends_watched,
         'form': form,
     }
     return render(request, 'movies/movie_detail.html', context)
@@ -177,45 +231,126 @@ def my_films(request):
     return render(request, "movies/my_films.html", context)
 
 
-def movies_all(request):
-    query = request.GET.get('q', '')
-    genre_filter = request.GET.get('genre', '')
-    sort = request.GET.get('sort', 'title')
-
-    movies = Movie.objects.all()
+# Keyset orderings for movies_all; each ends with id so the key is unique.
+MOVIES_ALL_KEYS = {
+    'title': [('title', False), ('id', False)],
+    'year': [('year', False), ('id', False)],
+    'director': [('director', False), ('id', False)],
+    'rating': [('rating', True), ('year', True), ('id', False)],
+    'relevance': [('search_rank', True), ('id', False)],
+}
 
-    # Search
-    if query:
-        movies = movies.filter(title__icontains=query)
 
-    # Filter by genre
-    if genre_filter:
-        movies = movies.filter(genres__name__iexact=genre_filter).distinct()
+def _movies_all_page(request):
+    query = request.GET.get('q', '')
+    sort = request.GET.get('sort', 'relevance' if query else 'title')
+    if sort == 'relevance' and not query:
+        sort = 'title'
+
+    # Search, genre, director, year and rating filters (see movies/filters.py)
+    filters = filters_from_params(request.GET)
+    movies = apply_filters(Movie.objects.all(), filters)
+
+    # Sorting + keyset pagination
+    if sort not in MOVIES_ALL_KEYS:
+        sort = 'title'
+    page_obj = paginate_keyset(movies, MOVIES_ALL_KEYS[sort], request.GET.get('cursor'), per_page=12)
+
+    # Current filters, for the form and the pagination links
+    params = {
+        'q': query,
+        'genre': filters['genre'],
+        'director': filters['director'],
+        'year': filters['year'],
+        'min_rating': filters['rating_gte'],
+        'sort': sort,
+    }
+    return page_obj, {
+        'query': query,
+        'genre_filter': filters['genre'],
+        'director_filter': filters['director'],
+        'year_filter': filters['year'],
+        'min_rating': filters['rating_gte'],
+        'sort': sort,
+        'filter_query': urlencode({k: v for k, v in params.items() if v}),
+    }
 
-    # Sorting
-    if sort in ['title', 'year', 'director']:
-        movies = movies.order_by(sort)
 
-    # Pagination
-    paginator = Paginator(movies, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def movies_all(request):
+    try:
+        page_obj, filters = _movies_all_page(request)
+    except InvalidCursor:
+        return HttpResponseBadRequest('Invalid cursor')
 
     genres = Genre.objects.all()
 
     return render(request, 'movies/movies_all.html', {
         'page_obj': page_obj,
         'genres': genres,
-        'query': query,
-        'genre_filter': genre_filter,
-        'sort': sort,
+        **filters,
     })
 
-def get_search_filters_from_ollama(message, genres_list):
+
+def movies_all_api(request):
+    """JSON variant of movies_all, paged with the same opaque cursors."""
+    try:
+        page_obj, filters = _movies_all_page(request)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    results = [{
+        'id': m.id,
+        'title': m.title,
+        'year': m.year,
+        'director': m.director,
+        'rating': float(m.rating) if m.rating is not None else 0.0,
+        'poster_url': m.poster or '',
+        'detail_url': reverse('movies:movie_detail', args=[m.id]),
+    } for m in page_obj]
+    return JsonResponse({
+        'results': results,
+        'next_cursor': page_obj.next_cursor,
+        'previous_cursor': page_obj.previous_cursor,
+        **filters,
+    })
+
+def poster(request, movie_id, size, version):
+    """Serve a cached, resized poster variant (see movies/posters.py)."""
+    if size not in poster_sizes():
+        raise Http404('Unknown poster size')
+    movie = get_object_or_404(Movie.objects.only('id', 'poster'), pk=movie_id)
+    if not is_proxyable(movie.poster):
+        return redirect(movie.poster or settings.DEFAULT_POSTER_URL)
+    if version != poster_version(movie.poster):
+        # Poster changed since this URL was rendered
+        return redirect(proxied_poster_url(movie, size))
+
+    # Variant content is fully determined by (source URL, size), so the ETag is too
+    etag = f'"{version}-{size}"'
+    cache_headers = {'ETag': etag, 'Cache-Control': 'public, max-age=31536000, immutable'}
+    if request.headers.get('If-None-Match') == etag:
+        return HttpResponseNotModified(headers=cache_headers)
+
+    path = cached_variant(movie.id, movie.poster, size)
+    if path is None:
+        # Not rendered yet (it is being queued now); let the browser load the original meanwhile
+        return redirect(movie.poster)
+
+    return FileResponse(open(path, 'rb'), content_type='image/jpeg', headers=cache_headers)
+
+async def get_search_filters_from_ollama(message, genres_list, use_cache=True):
     """
     Uses Ollama to parse a natural language message into a structured
     JSON object of search filters.
+    Results are cached, so repeated questions skip the LLM entirely.
     """
+    if use_cache:
+        with metrics.span('chat.intent_cache'):
+            cached = await sync_to_async(intent_cache.get_filters)(message, genres_list)
+        if cached is not None:
+            metrics.incr('chat.intent.cached')
+            return cached
+
     # Convert the list of genre names into a string for the prompt
     genres_str = ", ".join(genres_list)
 
@@ -231,7 +366,10 @@ def get_search_filters_from_ollama(message, genres_list):
     The JSON object should have the following possible keys:
     - "genre": string (must be one of: {genres_str})
     - "director": string
-    - "year": integer
+    - "year": integer (only for one exact year, e.g. "from 1994" -> 1994)
+    - "decade": integer (the first year of a decade, e.g. "the 90s" -> 1990)
+    - "year_gte": integer (e.g. "after 2010" -> 2011, "since 2010" -> 2010)
+    - "year_lte": integer (e.g. "before 1980" -> 1979)
     - "rating_gte": float (a number from 0-10, e.g., "8 stars" -> 8.0)
     - "keywords": string (for general title/description search)
 
@@ -240,7 +378,11 @@ def get_search_filters_from_ollama(message, genres_list):
     
     Example user message: "show me some good sci-fi movies from the 90s"
     Example JSON response:
-    {{"genre": "Sci-Fi", "year": 1990}}
+    {{"genre": "Sci-Fi", "decade": 1990}}
+    
+    Example user message: "dramas made between 2000 and 2005"
+    Example JSON response:
+    {{"genre": "Drama", "year_gte": 2000, "year_lte": 2005}}
     
     Example user message: "anything by Christopher Nolan with a 4-star rating"
     Example JSON response:
@@ -252,33 +394,41 @@ def get_search_filters_from_ollama(message, genres_list):
     """
 
     try:
-        response = ollama.chat(
-            model='qwen3:4b',  # Your local model
-            messages=[
-                {'role': 'system', 'content': system_prompt},
-                {'role': 'user', 'content': message}
-            ],
-            options={
-                'temperature': 0.0  # We want deterministic JSON, not creativity
-            }
-        )
+        with metrics.span('chat.intent_llm'):
+            llm_reply_content = await llm.achat(
+                [
+                    {'role': 'system', 'content': system_prompt},
+                    {'role': 'user', 'content': message}
+                ],
+                options={
+                    'temperature': 0.0  # We want deterministic JSON, not creativity
+                },
+                timeout=settings.CHAT_LLM_PARSE_TIMEOUT,
+                json_mode=True,
+            )
         
         # Parse the LLM's JSON response
-        llm_reply_content = response['message']['content']
         filters = json.loads(llm_reply_content)
+        if not isinstance(filters, dict):
+            raise ValueError(f'expected a JSON object, got {type(filters).__name__}')
+        metrics.incr('chat.intent.llm')
+        # Only successful parses are cached; the fallback below is not.
+        await sync_to_async(intent_cache.set_filters)(message, genres_list, filters)
         return filters
 
-    except Exception as e:
-        # If Ollama fails or returns bad JSON, fall back to simple keywords
-        print(f"Ollama parsing failed: {e}")
+    except (llm.LLMUnavailable, ValueError) as e:
+        # If Ollama fails, is overloaded or returns bad JSON, fall back to simple keywords
+        if isinstance(e, ValueError):
+            metrics.incr('chat.intent.json_error')
+        else:
+            metrics.incr('chat.intent.llm_unavailable')
+        metrics.incr('chat.intent.fallback')
+        logger.warning('Ollama parsing failed: %s', e)
         # Fallback: treat the whole message as keywords
         return {"keywords": message}
     
-def generate_natural_reply(original_message, movies_list):
-    """
-    Uses Ollama to generate a conversational reply based on the 
-    movies found in the database.
-    """
+def _reply_prompt(original_message, movies_list):
+    """System prompt and user turn for the reply-generation call."""
     if not movies_list:
         
         system_prompt = f"""
@@ -296,7 +446,8 @@ def generate_natural_reply(original_message, movies_list):
         user_content = "No movies found matching that query."
         
     else:  
-        movies_json = json.dumps(movies_list, indent=2)
+        # Compact, token-budgeted listing instead of pretty-printed JSON
+        movies_text = compact_results(movies_list)
         
         system_prompt = f"""
         You are FilmMate's assistant, a friendly and helpful movie expert.
@@ -304,8 +455,8 @@ def generate_natural_reply(original_message, movies_list):
         
         The user originally asked: "{original_message}"
         
-        Your database search found the following movies (in JSON format):
-        {movies_json}
+        Your database search found the following movies (best first):
+        {movies_text}
         
         Your task:
         1. Write a 1-2 sentence conversational reply.
@@ -319,55 +470,85 @@ def generate_natural_reply(original_message, movies_list):
         
         user_content = f"Found {len(movies_list)} movies. Please generate a reply."
 
+    return [
+        {'role': 'system', 'content': system_prompt},
+        {'role': 'user', 'content': user_content}
+    ]
+
+
+async def generate_natural_reply(original_message, movies_list, filters=None):
+    """
+    Uses Ollama to generate a conversational reply based on the 
+    movies found in the database. In "template" and "hybrid" reply modes
+    (see movies/replies.py) the templated reply is returned instead.
+    """
+    if reply_mode() != 'llm':
+        metrics.incr('chat.reply.template')
+        return template_reply(movies_list, filters)
     try:
-        response = ollama.chat(
-            model='qwen3:4b',  
-            messages=[
-                {'role': 'system', 'content': system_prompt},
-                {'role': 'user', 'content': user_content}
-            ],
-            options={
-                'temperature': 0.7  
-            }
-        )
-        return response['message']['content'].strip()
+        with metrics.span('chat.reply_llm'):
+            reply = await llm.achat(
+                _reply_prompt(original_message, movies_list),
+                options={
+                    'temperature': 0.7  
+                },
+                timeout=settings.CHAT_LLM_REPLY_TIMEOUT,
+            )
+        metrics.incr('chat.reply.llm')
+        return reply.strip()
     
-    except Exception as e:
-        print(f"Ollama reply generation failed: {e}")
-        
-        if movies_list:
-            return f"I found {len(movies_list)} movie(s) matching your request. Here are the top results."
-        else:
-            return "Sorry, I couldn't find any movies matching that. Try a different genre, director or year."
-        
-@require_POST
-def chat_api(request):
+    except llm.LLMUnavailable as e:
+        metrics.incr('chat.reply.fallback')
+        logger.warning('Ollama reply generation failed: %s', e)
+        return template_reply(movies_list, filters)
+
+
+async def stream_natural_reply(original_message, movies_list, filters=None):
     """
-    Hybrid chat endpoint. Uses Ollama to parse intent (Call 1) and 
-    Django ORM to fetch. Then uses Ollama to generate a reply (Call 2).
+    Same reply as generate_natural_reply, yielded chunk by chunk as
+    Ollama produces it.
     """
+    sent_any = False
+    try:
+        async for text in llm.astream(
+            _reply_prompt(original_message, movies_list),
+            options={'temperature': 0.7},
+            timeout=settings.CHAT_LLM_REPLY_TIMEOUT,
+        ):
+            if text:
+                sent_any = True
+                yield text
+    except llm.LLMUnavailable as e:
+        metrics.incr('chat.reply.fallback')
+        logger.warning('Ollama reply streaming failed: %s', e)
+        if not sent_any:
+            yield template_reply(movies_list, filters)
+
+
+def _parse_chat_message(request):
+    """The stripped chat message from a JSON body, or None if the body is invalid."""
     try:
         payload = json.loads(request.body.decode('utf-8'))
-        message = payload.get('message', '').strip()
+        return payload.get('message', '').strip()
     except Exception:
-        return HttpResponseBadRequest('Invalid JSON')
+        return None
 
-    if not message:
-        
-        reply = "Hi — I'm FilmMate's assistant. Ask me for movie recommendations (genre, director, year, or keywords)."
-        return JsonResponse({'reply': reply, 'movies': []})
 
-    genres_list = list(Genre.objects.values_list('name', flat=True))
-    filters = get_search_filters_from_ollama(message, genres_list)
-    
-    qs = Movie.objects.all()
-    
-    
-    if filters.get('genre'):
-        qs = qs.filter(genres__name__iexact=filters['genre']).distinct()
-        
-    
-    qs = qs.order_by('-rating', '-year')[:12]
+def _rule_filters(message):
+    with metrics.span('chat.genres'):
+        genres_list = list(Genre.objects.values_list('name', flat=True))
+    with metrics.span('chat.rules'):
+        return genres_list, parse_intent(message, genres_list)
+
+
+def _query_movies(filters):
+    """Movies matching the parsed filters, as dicts for the chat widget."""
+    semantic_keywords = getattr(settings, 'CHAT_SEMANTIC_SEARCH', True)
+    qs = apply_filters(Movie.objects.all(), filters, semantic_keywords=semantic_keywords)
+    if filters.get('keywords'):
+        qs = qs.order_by('-search_rank', *BEST_FIRST)[:12]
+    else:
+        qs = qs.order_by(*BEST_FIRST)[:12]
 
     movies_list = []
     for m in qs:
@@ -382,7 +563,111 @@ def chat_api(request):
             'detail_url': detail_url,
             'poster_url': poster,
         })
+    return movies_list
+
+
+async def _chat_movies(message):
+    """Parse the message into filters; returns (filters, matching movies as dicts)."""
+    # Plain requests ("comedy from 2010") are parsed by rules; only the rest go to the LLM
+    genres_list, filters = await sync_to_async(_rule_filters)(message)
+    if filters is None:
+        filters = await get_search_filters_from_ollama(message, genres_list)
+    else:
+        metrics.incr('chat.intent.rules')
+    with metrics.span('chat.query'):
+        movies_list = await sync_to_async(_query_movies)(filters)
+    return filters, movies_list
+
+
+CHAT_GREETING = "Hi — I'm FilmMate's assistant. Ask me for movie recommendations (genre, director, year, or keywords)."
 
-    reply = generate_natural_reply(message, movies_list)
 
-    return JsonResponse({'reply': reply, 'movies': movies_list})
\ No newline at end of file
+@require_POST
+async def chat_api(request):
+    """
+    Hybrid chat endpoint. Uses Ollama to parse intent (Call 1) and 
+    Django ORM to fetch. Then uses Ollama to generate a reply (Call 2).
+    Async, so waiting on the model does not hold a worker; see movies/llm.py
+    for the concurrency limit, deadlines and load shedding.
+    """
+    message = _parse_chat_message(request)
+    if message is None:
+        return HttpResponseBadRequest('Invalid JSON')
+
+    if not message:
+        return JsonResponse({'reply': CHAT_GREETING, 'movies': []})
+
+    with metrics.trace('chat_api'):
+        filters, movies_list = await _chat_movies(message)
+        with metrics.span('chat.reply'):
+            reply = await generate_natural_reply(message, movies_list, filters)
+
+    return JsonResponse({'reply': reply, 'movies': movies_list})
+
+
+def metrics_view(request):
+    """
+    Chat stage latencies and counters for this process, as JSON (see
+    movies/metrics.py). Staff only, or send the METRICS_TOKEN setting in
+    the X-Metrics-Token header for scrapers.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not (request.user.is_staff or (token and request.headers.get('X-Metrics-Token') == token)):
+        raise Http404
+    return JsonResponse(metrics.snapshot())
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@require_POST
+async def chat_stream(request):
+    """
+    Streaming variant of chat_api, as Server-Sent Events: a `movies` event
+    as soon as the DB query is done, then `token` events as the reply is
+    generated, then `done`.
+
+    In "hybrid" reply mode the templated reply is sent as one `token`, and
+    if a model slot is free the LLM reply follows as `enrich` events that
+    replace it (or `enrich_abort` if the model fails part way).
+    """
+    message = _parse_chat_message(request)
+    if message is None:
+        return HttpResponseBadRequest('Invalid JSON')
+
+    async def events():
+        if not message:
+            yield _sse('movies', {'movies': []})
+            yield _sse('token', {'text': CHAT_GREETING})
+            yield _sse('done', {})
+            return
+        with metrics.span('chat_stream.movies'):
+            filters, movies_list = await _chat_movies(message)
+        yield _sse('movies', {'movies': movies_list})
+        mode = reply_mode()
+        if mode == 'llm':
+            async for text in stream_natural_reply(message, movies_list, filters):
+                yield _sse('token', {'text': text})
+        else:
+            yield _sse('token', {'text': template_reply(movies_list, filters)})
+            if mode == 'hybrid' and llm.gate.has_capacity():
+                try:
+                    async for text in llm.astream(
+                        _reply_prompt(message, movies_list),
+                        options={'temperature': 0.7},
+                        timeout=settings.CHAT_LLM_REPLY_TIMEOUT,
+                    ):
+                        yield _sse('enrich', {'text': text})
+                except llm.LLMUnavailable as e:
+                    metrics.incr('chat.enrich.aborted')
+                    logger.warning('Ollama reply enrichment failed: %s', e)
+                    yield _sse('enrich_abort', {})
+            elif mode == 'hybrid':
+                metrics.incr('chat.enrich.skipped')
+        yield _sse('done', {})
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+    return response
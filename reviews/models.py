@@ -1,13 +1,39 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
 from movies.models import Movie
 
+
+class ReviewQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # Bulk updates (and bulk_update) skip the signals that keep the movie
+        # rating counters exact, so stamp the affected movies for
+        # `recalculate_movie_ratings --since`.
+        now = timezone.now()
+        kwargs.setdefault('updated_at', now)
+        with transaction.atomic(using=self.db):
+            rows = list(self.values_list('pk', 'movie_id'))
+            updated = super().update(**kwargs)
+            movie_ids = {movie_id for _, movie_id in rows}
+            if 'movie' in kwargs or 'movie_id' in kwargs:
+                moved = Review.objects.filter(pk__in=[pk for pk, _ in rows])
+                movie_ids.update(moved.values_list('movie_id', flat=True))
+            Movie.objects.filter(pk__in=movie_ids).update(reviews_changed_at=now)
+        return updated
+
+    update.alters_data = True
+
+
 class Review(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
     text = models.TextField()
     rating = models.IntegerField(choices=[(i, i) for i in range(1, 11)])
     date = models.DateTimeField(auto_now_add=True)
+    # Last create/edit, bulk updates included (see ReviewQuerySet.update)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ReviewQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.movie.title} - {self.user.username} ({self.rating}/10)"
@@ -0,0 +1,179 @@
+# users/autocomplete.py
+"""
+Username autocomplete for the friend request form.
+
+Suggestions come from indexes instead of a scan of the users table:
+- prefix matches are a range scan over an expression index on
+  lower(username) (in the "C" collation on Postgres);
+- when a prefix finds too few users, a trigram index finds usernames
+  containing the query anywhere (pg_trgm on Postgres, which also tolerates
+  typos; an FTS5 trigram table kept in sync by triggers on SQLite).
+
+Friends are ranked first, then friends of friends, then everyone else.
+The shared index lookup is cached per prefix for AUTOCOMPLETE_CACHE_TTL
+seconds; each user's circle (friends and friends of friends) and ranked
+lists for AUTOCOMPLETE_USER_CACHE_TTL, so a typeahead mostly reads the
+cache.
+
+Users migration 0005 creates the indexes, trigram table and triggers.
+SQLite drops the triggers whenever a migration rebuilds users_customuser,
+so such migrations must run the same statements again.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Collate, Lower
+
+from users import friend_cache
+
+KEY_PREFIX = 'users:autocomplete:v1'
+MIN_QUERY_LENGTH = 2
+MIN_TRIGRAM_LENGTH = 3
+# Global matches kept per prefix; the ranking picks from these and the user's circle
+CANDIDATES = 20
+# Friends plus friends of friends considered per user
+CIRCLE_LIMIT = 2000
+SQLITE_TRIGRAM_TABLE = 'users_customuser_trigram'
+
+# Characters Django allows in usernames; anything else cannot match
+_USERNAME = re.compile(r'^[\w.@+-]+$')
+_sqlite_trigram_ready = None
+
+
+def normalize(query):
+    query = (query or '').strip().lower()[:150]
+    return query if _USERNAME.match(query) else ''
+
+
+def suggest(user, query, limit=5, use_cache=True):
+    """Up to `limit` usernames for `query`, friends and friends of friends first."""
+    query = normalize(query)
+    if len(query) < MIN_QUERY_LENGTH:
+        return []
+    key = f'{KEY_PREFIX}:user:{user.pk}:{limit}:{query}'
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    circle = _circle(user.pk, use_cache)
+    rows = {(pk, username) for pk, (_, username) in circle.items() if query in username.lower()}
+    rows.update(shared_matches(query, use_cache))
+
+    def rank(row):
+        pk, username = row
+        name = username.lower()
+        return circle[pk][0] if pk in circle else 2, not name.startswith(query), len(name), name
+
+    results = [username for pk, username in sorted(rows, key=rank) if pk != user.pk][:limit]
+    if use_cache:
+        cache.set(key, results, getattr(settings, 'AUTOCOMPLETE_USER_CACHE_TTL', 30))
+    return results
+
+
+def _circle(user_id, use_cache=True):
+    """
+    {id: (tier, username)} for the user's friends (tier 0) and friends of
+    friends (tier 1), at most CIRCLE_LIMIT of them. Cached per user, so a
+    typing session loads it once and then matches it in memory.
+    """
+    key = f'{KEY_PREFIX}:circle:{user_id}'
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    friends = friend_cache.friend_ids(user_id)
+    tiers = dict.fromkeys(list(friends)[:CIRCLE_LIMIT], 0)
+    if friends and len(tiers) < CIRCLE_LIMIT:
+        for ids in friend_cache.friend_ids_many(tiers).values():
+            for friend_of_friend in ids:
+                tiers.setdefault(friend_of_friend, 1)
+            if len(tiers) >= CIRCLE_LIMIT:
+                break
+    tiers.pop(user_id, None)
+    circle = {}
+    if tiers:
+        users = get_user_model().objects.filter(pk__in=list(tiers)).values_list('pk', 'username')
+        circle = {pk: (tiers[pk], username) for pk, username in users}
+    if use_cache:
+        cache.set(key, circle, getattr(settings, 'AUTOCOMPLETE_USER_CACHE_TTL', 30))
+    return circle
+
+
+def shared_matches(query, use_cache=True):
+    """(id, username) pairs for `query` from the indexes, the same for every user."""
+    key = f'{KEY_PREFIX}:{query}'
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    rows = prefix_matches(query, CANDIDATES)
+    if len(rows) < CANDIDATES and len(query) >= MIN_TRIGRAM_LENGTH:
+        seen = {pk for pk, _ in rows}
+        rows += [row for row in trigram_matches(query, CANDIDATES) if row[0] not in seen][:CANDIDATES - len(rows)]
+    if use_cache:
+        cache.set(key, rows, getattr(settings, 'AUTOCOMPLETE_CACHE_TTL', 60))
+    return rows
+
+
+def _prefix_key():
+    # Must match the prefix index expression in users migration 0005, otherwise the index is not used
+    key = Lower('username')
+    return Collate(key, 'C') if connection.vendor == 'postgresql' else key
+
+
+def prefix_matches(query, limit):
+    """Usernames starting with `query` (already normalized), alphabetically."""
+    users = get_user_model().objects.all()
+    if connection.vendor in ('postgresql', 'sqlite'):
+        # lower(username) >= 'ab' AND < 'ab' + the highest code point is a prefix range
+        users = users.alias(username_key=_prefix_key()).filter(
+            username_key__gte=query, username_key__lt=query + '\U0010ffff',
+        ).order_by('username_key')
+    else:
+        users = users.filter(username__istartswith=query).order_by('username')
+    return list(users.values_list('pk', 'username')[:limit])
+
+
+def trigram_matches(query, limit):
+    """Usernames containing (or on Postgres, resembling) `query`."""
+    vendor = connection.vendor
+    users = get_user_model().objects.all()
+    if vendor == 'postgresql':
+        username = 'lower("users_customuser"."username")'
+        users = users.filter(
+            RawSQL(f'{username} %% %s', [query], output_field=BooleanField())
+        ).annotate(
+            similarity=RawSQL(f'similarity({username}, %s)', [query], output_field=FloatField())
+        ).order_by('-similarity', 'username')
+        return list(users.values_list('pk', 'username')[:limit])
+    if vendor == 'sqlite' and sqlite_trigram_ready():
+        # The trigram tokenizer matches any substring of three or more characters.
+        # Unordered, so FTS5 stops at the limit; suggest() does the ranking.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, username FROM {SQLITE_TRIGRAM_TABLE} "
+                f"WHERE {SQLITE_TRIGRAM_TABLE} MATCH %s LIMIT %s",
+                ['"{}"'.format(query.replace('"', '""')), limit],
+            )
+            return cursor.fetchall()
+    return list(users.filter(username__icontains=query).order_by('username').values_list('pk', 'username')[:limit])
+
+
+def sqlite_trigram_ready():
+    """True when the FTS5 trigram table and its sync triggers exist (checked once per process)."""
+    global _sqlite_trigram_ready
+    if _sqlite_trigram_ready is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE name IN (%s, %s)",
+                [SQLITE_TRIGRAM_TABLE, f'{SQLITE_TRIGRAM_TABLE}_au'],
+            )
+            _sqlite_trigram_ready = cursor.fetchone()[0] == 2
+    return _sqlite_trigram_ready
+
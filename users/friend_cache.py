@@ -0,0 +1,95 @@
+# users/friend_cache.py
+"""
+Cached friend sets, so friendship checks do not query the graph each time.
+
+Each user's friend ids (the forward rows of CustomUser.friends) are cached
+as a frozenset in the shared Django cache under a versioned key:
+
+    users:friends:v1:<user_id>:<version>
+
+Any change to a user's friendships bumps their version (see
+users/signals.py), so readers move to a fresh key immediately, and a slow
+reader that loaded the old set can only write it under the old, now
+unused key. Versions start from the clock (time.time_ns()) rather than 0,
+so a version key the cache evicted is re-seeded past every version it
+ever held and a stale set can never be read back. Lookups for many users
+are batched into one get_many and at most one query for the misses.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+KEY_PREFIX = 'users:friends:v1'
+
+
+def _version_key(user_id):
+    return f'{KEY_PREFIX}:{user_id}:version'
+
+
+def _set_key(user_id, version):
+    return f'{KEY_PREFIX}:{user_id}:{version}'
+
+
+def _ttl():
+    return getattr(settings, 'FRIEND_CACHE_TTL', 60 * 60 * 24)
+
+
+def _versions(user_ids):
+    """{user_id: current version}, seeding missing (never set or evicted) versions."""
+    versions = cache.get_many([_version_key(u) for u in user_ids])
+    unseeded = [_version_key(u) for u in user_ids if _version_key(u) not in versions]
+    if unseeded:
+        for key in unseeded:
+            cache.add(key, time.time_ns(), None)
+        versions.update(cache.get_many(unseeded))
+    # None only if the cache dropped a fresh key straight away; those sets are not cached
+    return {u: versions.get(_version_key(u)) for u in user_ids}
+
+
+def friend_ids_many(user_ids):
+    """{user_id: frozenset of friend ids} for every id in `user_ids`."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    versions = _versions(user_ids)
+    keys = {u: _set_key(u, version) for u, version in versions.items() if version is not None}
+    cached = cache.get_many(list(keys.values()))
+    result = {u: cached[key] for u, key in keys.items() if key in cached}
+
+    missing = user_ids - result.keys()
+    if missing:
+        loaded = {u: set() for u in missing}
+        rows = get_user_model().friends.through.objects.filter(from_customuser_id__in=missing)
+        for user_id, friend_id in rows.values_list('from_customuser_id', 'to_customuser_id'):
+            loaded[user_id].add(friend_id)
+        loaded = {u: frozenset(ids) for u, ids in loaded.items()}
+        cache.set_many({keys[u]: ids for u, ids in loaded.items() if u in keys}, _ttl())
+        result.update(loaded)
+    return result
+
+
+def friend_ids(user_id):
+    return friend_ids_many([user_id])[user_id]
+
+
+def are_friends(user_id, other_id):
+    """True if `other_id` is among `user_id`'s friends."""
+    return other_id in friend_ids(user_id)
+
+
+def friends_among(user_id, candidate_ids):
+    """The subset of `candidate_ids` that are `user_id`'s friends (one lookup)."""
+    return friend_ids(user_id).intersection(candidate_ids)
+
+
+def invalidate(user_ids):
+    """Move each user to a new version key, after their friendships change."""
+    for user_id in set(user_ids):
+        key = _version_key(user_id)
+        if not cache.add(key, time.time_ns(), None):
+            try:
+                cache.incr(key)
+            except ValueError:  # evicted between add and incr
+                cache.set(key, time.time_ns(), None)
@@ -0,0 +1,116 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from users import autocomplete
+
+FIRST = [
+    'james', 'mary', 'john', 'patricia', 'robert', 'jennifer', 'michael', 'linda', 'david', 'sarah',
+    'maria', 'daniel', 'laura', 'kevin', 'emma', 'noah', 'olivia', 'liam', 'ava', 'lucas',
+    'sofia', 'mateo', 'yuki', 'chen', 'amir', 'fatima', 'ivan', 'anna', 'omar', 'zoe',
+]
+LAST = [
+    'smith', 'johnson', 'garcia', 'miller', 'davis', 'lopez', 'wilson', 'moore', 'taylor', 'lee',
+    'walker', 'young', 'king', 'wright', 'scott', 'green', 'baker', 'adams', 'nelson', 'hill',
+    'tanaka', 'wang', 'khan', 'petrov', 'rossi', 'muller', 'silva', 'novak', 'kim', 'nguyen',
+]
+SEPARATORS = ['', '_', '.', '']
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark username autocomplete (indexed, friends first) against the old '
+        'username__icontains scan on synthetic users. Rolled back unless --keep.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000, help='Synthetic users to insert.')
+        parser.add_argument('--queries', type=int, default=2000, help='Keystrokes to replay.')
+        parser.add_argument('--friends', type=int, default=150, help='Friends of each benchmark user.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the synthetic users instead of rolling them back.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        User = get_user_model()
+        self.stdout.write(f'Database backend: {connection.vendor}')
+
+        with transaction.atomic():
+            users = self._insert_users(rng, options['users'])
+            names = [name for _, name in users]
+            searchers = list(User.objects.filter(pk__in=[pk for pk, _ in users[:10]]))
+            friendships = User.friends.through
+            friendships.objects.bulk_create(
+                friendships(from_customuser_id=searcher.pk, to_customuser_id=pk)
+                for searcher in searchers
+                for pk, _ in rng.sample(users, options['friends'])
+                if pk != searcher.pk
+            )
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE users_customuser')
+
+            # Each keystroke of a username typed by a searcher: 'jo', 'joh', 'john', ...
+            keystrokes = []
+            while len(keystrokes) < options['queries']:
+                name = rng.choice(names)
+                searcher = rng.choice(searchers)
+                keystrokes += [(searcher, name[:n]) for n in range(2, min(len(name), 8) + 1)]
+            keystrokes = keystrokes[:options['queries']]
+
+            index = self._measure(keystrokes, lambda user, q: autocomplete.shared_matches(q, use_cache=False))
+            cold = self._measure(keystrokes, lambda user, q: autocomplete.suggest(user, q, use_cache=False))
+            self._measure(keystrokes, lambda user, q: autocomplete.suggest(user, q))  # fills the cache
+            warm = self._measure(keystrokes, lambda user, q: autocomplete.suggest(user, q))
+            scan = self._measure(keystrokes[:200], lambda user, q: list(
+                User.objects.filter(username__icontains=q).values_list('username', flat=True)[:5]
+            ))
+            for label, timings in (
+                ('prefix/trigram index lookup', index),
+                ('suggest, nothing cached', cold),
+                ('suggest, cached', warm),
+                ('old icontains (200 queries)', scan),
+            ):
+                self.stdout.write(f'{len(names):>9,} users | {label:<28} ' + self._summary(timings))
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Done.'))
+
+    def _insert_users(self, rng, count, batch_size=10_000):
+        """Insert `count` users with realistic usernames; returns their (id, username)."""
+        self.stdout.write(f'Inserting {count:,} synthetic users...')
+        User = get_user_model()
+        users = []
+        seen = set(User.objects.values_list('username', flat=True))
+        batch = []
+        while len(users) + len(batch) < count:
+            name = f'{rng.choice(FIRST)}{rng.choice(SEPARATORS)}{rng.choice(LAST)}{rng.randrange(10_000)}'
+            if rng.random() < 0.3:
+                name = name.title()
+            if name in seen:
+                continue
+            seen.add(name)
+            batch.append(User(username=name, password='!'))
+            if len(batch) >= batch_size:
+                users += [(user.pk, user.username) for user in User.objects.bulk_create(batch)]
+                batch = []
+        if batch:
+            users += [(user.pk, user.username) for user in User.objects.bulk_create(batch)]
+        return users
+
+    def _measure(self, keystrokes, lookup):
+        timings = []
+        for user, query in keystrokes:
+            start = time.perf_counter()
+            lookup(user, query)
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)
+
+    def _summary(self, timings):
+        def pct(p):
+            return timings[min(len(timings) - 1, int(len(timings) * p / 100))]
+        return f'p50 {pct(50):7.2f} ms  p95 {pct(95):7.2f} ms  p99 {pct(99):7.2f} ms'
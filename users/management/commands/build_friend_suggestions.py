@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users import suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute "People you may know" for every user from the friendship graph and watch history. '
+        'Friendship changes refresh the affected users as they happen; run this nightly so watch '
+        'overlap and anything the refresh skipped catch up.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', nargs='+', type=int,
+                            help='Only refresh these user ids (and not their followers).')
+
+    def handle(self, *args, **options):
+        if not suggestions.available():
+            raise CommandError('NumPy is not installed; friend suggestions are unavailable.')
+
+        started = time.perf_counter()
+        if options['users']:
+            suggestions.refresh(options['users'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Refreshed {len(options['users'])} users in {time.perf_counter() - started:.1f}s."
+            ))
+            return
+        written = suggestions.build()
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {written} friend suggestions in {time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,69 @@
+from django.db import migrations
+
+# The SQL is spelled out here rather than imported from users.autocomplete,
+# so later changes to that module cannot change what this migration did.
+# The prefix index expressions must stay identical to
+# users.autocomplete._prefix_key(), otherwise the index is not used.
+SQLITE_TRIGRAM_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_customuser_trigram USING fts5("
+    "username, content='users_customuser', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_customuser_trigram_ai AFTER INSERT ON users_customuser BEGIN "
+    "INSERT INTO users_customuser_trigram(rowid, username) VALUES (new.id, new.username); END",
+    "CREATE TRIGGER IF NOT EXISTS users_customuser_trigram_ad AFTER DELETE ON users_customuser BEGIN "
+    "INSERT INTO users_customuser_trigram(users_customuser_trigram, rowid, username) "
+    "VALUES ('delete', old.id, old.username); END",
+    "CREATE TRIGGER IF NOT EXISTS users_customuser_trigram_au AFTER UPDATE OF username ON users_customuser BEGIN "
+    "INSERT INTO users_customuser_trigram(users_customuser_trigram, rowid, username) "
+    "VALUES ('delete', old.id, old.username); "
+    "INSERT INTO users_customuser_trigram(rowid, username) VALUES (new.id, new.username); END",
+    "INSERT INTO users_customuser_trigram(users_customuser_trigram) VALUES ('rebuild')",
+]
+
+SQLITE_TRIGRAM_DROP = [
+    "DROP TRIGGER IF EXISTS users_customuser_trigram_ai",
+    "DROP TRIGGER IF EXISTS users_customuser_trigram_ad",
+    "DROP TRIGGER IF EXISTS users_customuser_trigram_au",
+    "DROP TABLE IF EXISTS users_customuser_trigram",
+]
+
+
+def create_autocomplete_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS users_customuser_username_prefix_idx "
+            "ON users_customuser ((lower(username) COLLATE \"C\"))"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS users_customuser_username_trgm_idx "
+            "ON users_customuser USING GIN (lower(username) gin_trgm_ops)"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS users_customuser_username_prefix_idx ON users_customuser (lower(username))"
+        )
+        for sql in SQLITE_TRIGRAM_INSTALL:
+            schema_editor.execute(sql)
+
+
+def drop_autocomplete_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute("DROP INDEX IF EXISTS users_customuser_username_prefix_idx")
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS users_customuser_username_trgm_idx")
+    elif vendor == 'sqlite':
+        for sql in SQLITE_TRIGRAM_DROP:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_alter_friendrequest_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_autocomplete_indexes, drop_autocomplete_indexes),
+    ]
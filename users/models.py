@@ -27,4 +27,30 @@ class FriendRequest(models.Model):
         ]
 
     def __str__(self):
-        return f"FriendRequest(from={self.from_user_id}, to={self.to_user_id})"
\ No newline at end of file
+        return f"FriendRequest(from={self.from_user_id}, to={self.to_user_id})"
+
+class FriendSuggestion(models.Model):
+    """
+    A "People you may know" entry: `suggested` is a friend of `user`'s
+    friends, scored by mutual friends and movies both have watched.
+
+    Computed in bulk by `build_friend_suggestions` and refreshed for the
+    affected users whenever friendships change (see users/suggestions.py),
+    so pages read the top N off the (user, -score) index.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='friend_suggestions')
+    suggested = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    mutual_friends = models.PositiveIntegerField(default=0)
+    shared_movies = models.PositiveIntegerField(default=0)
+    score = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'suggested'], name='unique_friend_suggestion'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score'], name='friend_suggestion_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"Suggest user {self.suggested_id} to user {self.user_id} ({self.mutual_friends} mutual friends)"
@@ -0,0 +1,49 @@
+# users/signals.py
+import logging
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from users import friend_cache, suggestions
+from users.models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(m2m_changed, sender=CustomUser.friends.through)
+def friends_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Rows change on both ends, so drop the cached sets of everyone involved
+    if action == 'pre_clear':
+        field, other = ('to_customuser_id', 'from_customuser_id') if reverse else ('from_customuser_id', 'to_customuser_id')
+        instance._friend_cache_cleared = set(
+            sender.objects.filter(**{field: instance.pk}).values_list(other, flat=True)
+        )
+    elif action == 'post_clear':
+        cleared = getattr(instance, '_friend_cache_cleared', set())
+        _invalidate({instance.pk, *cleared})
+        _refresh_suggestions(cleared if reverse else {instance.pk})
+    elif action in ('post_add', 'post_remove'):
+        _invalidate({instance.pk, *(pk_set or ())})
+        # Forward rows are (user, friend): only the owners' friend lists changed
+        _refresh_suggestions(set(pk_set or ()) if reverse else {instance.pk})
+
+
+def _invalidate(user_ids):
+    # Again once committed, in case another request cached the old rows meanwhile
+    friend_cache.invalidate(user_ids)
+    transaction.on_commit(lambda: friend_cache.invalidate(user_ids))
+
+
+def _refresh_suggestions(user_ids):
+    if not user_ids or not suggestions.available():
+        return
+
+    def refresh():
+        try:
+            suggestions.friends_changed(user_ids)
+        except Exception as e:
+            # Best effort; build_friend_suggestions catches up
+            logger.warning('Friend suggestion refresh failed for users %s: %s', sorted(user_ids), e)
+
+    transaction.on_commit(refresh)
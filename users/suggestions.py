@@ -0,0 +1,229 @@
+# users/suggestions.py
+"""
+"People you may know": friend suggestions from the friendship graph.
+
+A user's candidates are the friends of their friends who are not already
+friends. Each is scored by
+
+    mutual friends + WATCH_WEIGHT * shared / (shared + WATCH_SMOOTHING)
+
+where `shared` counts movies both have watched, so watch overlap orders
+candidates with the same mutual friends and lifts one by at most
+WATCH_WEIGHT. Only the MAX_CANDIDATES candidates with the most mutual
+friends get their overlap computed. The top FRIEND_SUGGESTIONS are stored
+as FriendSuggestion rows, so pages only read them back.
+
+The graph is held as NumPy CSR arrays over dense int32 user indices:
+friend lists and watched movies per user. The mutual counts for a user
+are one np.unique over their friends' friend lists. The overlap looks up
+each candidate's movies in a boolean mask (one flag per movie) of the
+user's own movies.
+
+`build()` computes everyone from the full graph (`build_friend_suggestions`).
+`refresh(user_ids)` recomputes a few users from their two-hop neighbourhood
+only. Friendship changes call it on commit for the user whose friends
+changed and for everyone who has them as a friend (see users/signals.py).
+New watches only shift the overlap, so they wait for the next build.
+
+NumPy is optional; without it nothing is computed and the pages show no
+suggestions.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+
+from movies.models import WatchedMovie
+from users.models import FriendRequest, FriendSuggestion
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; friend suggestions are disabled without it
+    np = None
+
+WATCH_WEIGHT = 1.0
+WATCH_SMOOTHING = 10.0
+MAX_CANDIDATES = 100
+# Users refreshed on commit after a friendship change; the rest wait for the next build
+REFRESH_LIMIT = 500
+CHUNK = 1000  # ids per IN (...) list
+
+
+def available():
+    return np is not None
+
+
+def _limit():
+    return getattr(settings, 'FRIEND_SUGGESTIONS', 10)
+
+
+def _friendships():
+    return get_user_model().friends.through.objects
+
+
+def _pairs(queryset, fields):
+    """An (n, 2) int64 array of `fields` from `queryset`."""
+    rows = np.fromiter(
+        (value for row in queryset.values_list(*fields).iterator(chunk_size=10_000) for value in row),
+        dtype=np.int64,
+    )
+    return rows.reshape(-1, 2)
+
+
+def _csr(rows, cols, n):
+    order = np.lexsort((cols, rows))
+    ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=ptr[1:])
+    return ptr, cols[order].astype(np.int32)
+
+
+def _gather(ptr, values, rows):
+    """The values of every row in `rows` concatenated, and which position of `rows` each came from."""
+    starts = ptr[rows]
+    lengths = ptr[rows + 1] - starts
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.arange(len(owner)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return values[np.repeat(starts, lengths) + offsets], owner
+
+
+class Graph:
+    """
+    Friendships and watch history as CSR arrays over dense user indices:
+    the friends of user index i are friends[friend_ptr[i]:friend_ptr[i + 1]]
+    and their movies movies[movie_ptr[i]:movie_ptr[i + 1]].
+    """
+
+    def __init__(self, edges, watches=None):
+        self.user_ids = np.unique(edges.ravel())
+        self.friend_ptr, self.friends = _csr(self._index(edges[:, 0]), self._index(edges[:, 1]), len(self.user_ids))
+        self.set_watches(np.zeros((0, 2), dtype=np.int64) if watches is None else watches)
+
+    def _index(self, user_ids):
+        return np.searchsorted(self.user_ids, user_ids)
+
+    def set_watches(self, watches):
+        # Watches by users outside the graph cannot matter
+        index = self._index(watches[:, 0]).clip(max=max(len(self.user_ids) - 1, 0))
+        known = self.user_ids[index] == watches[:, 0] if len(self.user_ids) else np.zeros(len(watches), dtype=bool)
+        movie_ids, movies = np.unique(watches[known, 1], return_inverse=True)
+        self.movie_ptr, self.movies = _csr(index[known], movies, len(self.user_ids))
+        self.n_movies = len(movie_ids)
+
+    def indices(self, user_ids):
+        """Dense indices of the `user_ids` that are in the graph."""
+        user_ids = np.asarray(list(user_ids), dtype=np.int64)
+        index = self._index(user_ids).clip(max=max(len(self.user_ids) - 1, 0))
+        return index[self.user_ids[index] == user_ids] if len(self.user_ids) else index[:0]
+
+    def candidates(self, i):
+        """Friends of friends of user index i who are not friends yet, with their mutual friend counts."""
+        friends = self.friends[self.friend_ptr[i]:self.friend_ptr[i + 1]]
+        if not len(friends):
+            return friends, friends
+        friends_of_friends, _ = _gather(self.friend_ptr, self.friends, friends)
+        candidates, mutual = np.unique(friends_of_friends, return_counts=True)
+        keep = (candidates != i) & ~np.isin(candidates, friends, assume_unique=True)
+        candidates, mutual = candidates[keep], mutual[keep]
+        if len(candidates) > MAX_CANDIDATES:
+            top = np.argpartition(-mutual, MAX_CANDIDATES - 1)[:MAX_CANDIDATES]
+            candidates, mutual = candidates[top], mutual[top]
+        return candidates, mutual
+
+    def rank(self, i, candidates, mutual, limit, mask=None):
+        """[(suggested user id, mutual, shared movies, score)] for user index i, best first."""
+        mask = np.zeros(self.n_movies, dtype=bool) if mask is None else mask
+        mine = self.movies[self.movie_ptr[i]:self.movie_ptr[i + 1]]
+        shared = np.zeros(len(candidates))
+        if len(mine) and len(candidates):
+            mask[mine] = True
+            theirs, owner = _gather(self.movie_ptr, self.movies, candidates)
+            shared = np.bincount(owner, weights=mask[theirs], minlength=len(candidates))
+            mask[mine] = False  # reused for the next user
+        score = mutual + WATCH_WEIGHT * shared / (shared + WATCH_SMOOTHING)
+        order = np.lexsort((self.user_ids[candidates], -score))[:limit]
+        return [
+            (int(self.user_ids[candidates[j]]), int(mutual[j]), int(shared[j]), float(score[j]))
+            for j in order
+        ]
+
+
+def _rows(user_id, suggestions):
+    return [
+        FriendSuggestion(user_id=user_id, suggested_id=suggested_id, mutual_friends=mutual,
+                         shared_movies=shared, score=score)
+        for suggested_id, mutual, shared, score in suggestions
+    ]
+
+
+def build(batch_size=5000):
+    """Recompute every user's suggestions from the full graph. Returns the rows written."""
+    if np is None:
+        return 0
+    graph = Graph(
+        _pairs(_friendships().all(), ('from_customuser_id', 'to_customuser_id')),
+        _pairs(WatchedMovie.objects.all(), ('user_id', 'movie_id')),
+    )
+    mask = np.zeros(graph.n_movies, dtype=bool)
+    limit = _limit()
+    written = 0
+    with transaction.atomic():
+        FriendSuggestion.objects.all().delete()
+        batch = []
+        for i in range(len(graph.user_ids)):
+            candidates, mutual = graph.candidates(i)
+            batch += _rows(int(graph.user_ids[i]), graph.rank(i, candidates, mutual, limit, mask))
+            if len(batch) >= batch_size:
+                FriendSuggestion.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        FriendSuggestion.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def refresh(user_ids):
+    """Recompute the suggestions of `user_ids` from their two-hop neighbourhood."""
+    if np is None:
+        return
+    user_ids = sorted(set(user_ids))
+    friendships = _friendships()
+    for start in range(0, len(user_ids), CHUNK):
+        chunk = user_ids[start:start + CHUNK]
+        friends = friendships.filter(from_customuser_id__in=chunk)
+        two_hops = friendships.filter(Q(from_customuser_id__in=chunk) | Q(from_customuser_id__in=friends.values('to_customuser_id')))
+        graph = Graph(_pairs(two_hops, ('from_customuser_id', 'to_customuser_id')))
+        dirty = graph.indices(chunk)
+        found = {i: graph.candidates(i) for i in dirty}
+        # Watches are only needed for these users and their top candidates
+        needed = np.unique(np.concatenate([dirty, *(candidates for candidates, _ in found.values())])).astype(np.int64)
+        needed_ids = graph.user_ids[needed].tolist()
+        graph.set_watches(np.concatenate([
+            _pairs(WatchedMovie.objects.filter(user_id__in=needed_ids[j:j + CHUNK]), ('user_id', 'movie_id'))
+            for j in range(0, len(needed_ids), CHUNK)
+        ] or [np.zeros((0, 2), dtype=np.int64)]))
+        rows = []
+        for i, (candidates, mutual) in found.items():
+            rows += _rows(int(graph.user_ids[i]), graph.rank(i, candidates, mutual, _limit()))
+        with transaction.atomic():
+            FriendSuggestion.objects.filter(user_id__in=chunk).delete()
+            FriendSuggestion.objects.bulk_create(rows)
+
+
+def friends_changed(user_ids):
+    """`user_ids` gained or lost friends: refresh them and whoever has them as a friend."""
+    followers = _friendships().filter(to_customuser_id__in=list(user_ids)).values_list('from_customuser_id', flat=True)
+    refresh(set(user_ids) | set(followers[:REFRESH_LIMIT]))
+
+
+def suggestions_for(user, limit=None):
+    """Stored suggestions for `user`, best first, without anyone a request is pending with."""
+    if not user.is_authenticated:
+        return []
+    pending = (
+        Q(suggested__in=FriendRequest.objects.filter(from_user=user).values('to_user'))
+        | Q(suggested__in=FriendRequest.objects.filter(to_user=user).values('from_user'))
+    )
+    return list(
+        FriendSuggestion.objects.filter(user=user).exclude(pending)
+        .select_related('suggested').order_by('-score', 'suggested_id')[:limit or _limit()]
+    )
@@ -5,6 +5,7 @@ from django.views.decorators.http import require_POST
 from django.http import HttpResponseForbidden
 from django.urls import reverse
 from django.contrib import messages
+from users import autocomplete, friend_cache, suggestions
 from users.forms import CustomUserCreationForm, CustomAuthenticationForm
 from users.models import FriendRequest, CustomUser
 from filmmate.settings import LOGIN_REDIRECT_URL
@@ -44,7 +45,11 @@ def friend_requests_view(request):
     """Show incoming and outgoing friend requests for the current user."""
     incoming = FriendRequest.objects.filter(to_user=request.user).select_related('from_user')
     outgoing = FriendRequest.objects.filter(from_user=request.user).select_related('to_user')
-    return render(request, 'users/friend_requests.html', {'incoming': incoming, 'outgoing': outgoing})
+    # Precomputed "People you may know" (see users/suggestions.py)
+    people_you_may_know = suggestions.suggestions_for(request.user)
+    return render(request, 'users/friend_requests.html', {
+        'incoming': incoming, 'outgoing': outgoing, 'people_you_may_know': people_you_may_know,
+    })
 
 @login_required
 @require_POST
@@ -56,7 +61,7 @@ def send_friend_request(request, user_id):
     to_user = get_object_or_404(CustomUser, pk=user_id)
     
     # prevent duplicate requests or if already friends
-    if FriendRequest.objects.filter(from_user=request.user, to_user=to_user).exists() or request.user.friends.filter(pk=to_user.pk).exists():
+    if friend_cache.are_friends(request.user.id, to_user.pk) or FriendRequest.objects.filter(from_user=request.user, to_user=to_user).exists():
         messages.info(request, 'Friend request already sent or you are already friends.')
         # Redirect back to the user's profile instead of general friend requests page
         return redirect('users:profile_other', user_id=to_user.id)
@@ -84,7 +89,7 @@ def send_friend_request_by_username(request):
         messages.error(request, "You can't friend yourself.")
         return redirect(reverse('users:friend_requests'))
 
-    if FriendRequest.objects.filter(from_user=request.user, to_user=to_user).exists() or request.user.friends.filter(pk=to_user.pk).exists():
+    if friend_cache.are_friends(request.user.id, to_user.pk) or FriendRequest.objects.filter(from_user=request.user, to_user=to_user).exists():
         messages.info(request, 'Friend request already sent or you are already friends.')
         return redirect(reverse('users:friend_requests'))
 
@@ -129,7 +134,7 @@ def remove_friend(request, user_id):
 
     friend_user = get_object_or_404(CustomUser, pk=user_id)
 
-    if not request.user.friends.filter(pk=friend_user.pk).exists():
+    if not friend_cache.are_friends(request.user.id, friend_user.pk):
         messages.info(request, f"{friend_user.username} is not in your friends list.")
         return redirect('users:profile_other', user_id=friend_user.id)
 
@@ -165,11 +170,12 @@ def profile_view(request, user_id=None):
         .order_by('-watched_at')[:4]
     )
 
-    friends = profile_user.friends.all()
+    # Friend ids come from the friend-set cache; only the profiles are queried
+    friends = User.objects.filter(pk__in=friend_cache.friend_ids(profile_user.pk))
     seen_movies_count = recent_watched_movies.count()
 
     is_own_profile = (profile_user == request.user)
-    is_friend = request.user.friends.filter(pk=profile_user.pk).exists() if not is_own_profile else False
+    is_friend = friend_cache.are_friends(request.user.id, profile_user.pk) if not is_own_profile else False
 
     # Check if the current user has already sent a friend request
     friend_request_sent = False
@@ -179,6 +185,8 @@ def profile_view(request, user_id=None):
             to_user=profile_user
         ).exists()
 
+    people_you_may_know = suggestions.suggestions_for(request.user, limit=5) if is_own_profile else []
+
     context = {
         'profile_user': profile_user,
         'is_own_profile': is_own_profile,
@@ -188,15 +196,13 @@ def profile_view(request, user_id=None):
         'recent_watched_movies': recent_watched_movies,
         'friends': friends,
         'seen_movies_count': seen_movies_count,
+        'people_you_may_know': people_you_may_know,
     }
     return render(request, 'users/profile.html', context)
 
 
 @login_required
 def username_autocomplete(request):
-    query = request.GET.get('q', '')
-    if len(query) < 2:
-        return JsonResponse([], safe=False)
-    users = User.objects.filter(username__icontains=query)[:5]  
-    results = list(users.values_list('username', flat=True))
+    # Indexed prefix/trigram lookup, friends first, cached per prefix (see users/autocomplete.py)
+    results = autocomplete.suggest(request.user, request.GET.get('q', ''))
     return JsonResponse(results, safe=False)
\ No newline at end of file